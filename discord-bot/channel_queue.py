@@ -0,0 +1,185 @@
+"""
+Per-channel Send Queues for the Discord Bot
+Every channel gets its own bounded queue drained by its own task, so a slow
+or rate-limited channel only delays itself. When a channel falls too far
+behind, new log batches for it are dropped and replaced by a single
+"N log lines dropped" notice.
+
+DeliveryTracker follows each log batch through every queue it went to, so
+the log read position is only saved once all of them have sent (or dropped)
+it.
+"""
+
+from collections import deque
+from datetime import datetime
+import asyncio
+
+import discord
+
+# Log batches waiting per channel before new ones are dropped
+MAX_PENDING = 20
+
+
+def dropped_embed(count):
+    """Notice posted in place of log lines a channel could not keep up with"""
+    return discord.Embed(
+        title="⚠️ Log Lines Dropped",
+        description=f"{count} log line{'s' if count != 1 else ''} dropped - Discord is rate limiting this channel. "
+                    f"Use `!werebot tail` to see recent logs.",
+        color=discord.Color.orange(),
+        timestamp=datetime.utcnow()
+    )
+
+
+class ChannelQueue:
+    """Messages waiting for one channel, sent in order by a single task"""
+
+    def __init__(self, channel, max_pending=MAX_PENDING):
+        self.channel = channel
+        self.max_pending = max_pending
+        self.pending = deque()  # (message, batch), or an int counting dropped lines
+        self.task = None
+
+    def submit(self, message, lines=0, batch=None):
+        """
+        Queue a message for sending.
+
+        Args:
+            message: Embed, or anything with send_kwargs() (a PackedMessage)
+            lines: Number of log lines in the message; log batches are dropped
+                   (and counted) when the queue is full, other messages never are
+            batch: LogBatch released once the message is sent or dropped (optional)
+
+        Returns:
+            True if queued, False if dropped
+        """
+        if lines and len(self.pending) >= self.max_pending:
+            if batch:
+                batch.hold()
+                batch.release()
+            # Consecutive drops collapse into one notice
+            if self.pending and isinstance(self.pending[-1], int):
+                self.pending[-1] += lines
+            else:
+                self.pending.append(lines)
+            return False
+
+        if batch:
+            batch.hold()
+        self.pending.append((message, batch))
+        if self.task is None:
+            self.task = asyncio.create_task(self._drain())
+        return True
+
+    async def _drain(self):
+        while self.pending:
+            item = self.pending.popleft()
+            batch = None
+            if isinstance(item, int):
+                kwargs = {'embed': dropped_embed(item)}
+            else:
+                message, batch = item
+                kwargs = {'embed': message} if isinstance(message, discord.Embed) else message.send_kwargs()
+            try:
+                # discord.py waits out 429s itself; meanwhile this queue fills up
+                await self.channel.send(**kwargs)
+            except discord.HTTPException as e:
+                print(f"Error sending to #{self.channel}: {e}")
+            except Exception as e:
+                print(f"Unexpected error sending to #{self.channel}: {e}")
+            finally:
+                # Failed sends are not retried, so they count as done too
+                if batch:
+                    batch.release()
+        self.task = None
+
+
+class ChannelFanout:
+    """Sends messages to many channels at once through cached per-channel queues"""
+
+    def __init__(self, bot, max_pending=MAX_PENDING):
+        self.bot = bot
+        self.max_pending = max_pending
+        self.queues = {}  # channel ID -> ChannelQueue
+        self.missing = set()  # channel IDs already warned about
+
+    def queue_for(self, channel_id):
+        """Queue for a channel, resolving the channel on first use (None if not visible yet)"""
+        queue = self.queues.get(channel_id)
+        if queue is None:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                return None
+            queue = self.queues[channel_id] = ChannelQueue(channel, self.max_pending)
+        return queue
+
+    def send(self, channel_ids, message, lines=0, batch=None):
+        """
+        Queue a message for every channel without waiting for any of them.
+
+        Args:
+            channel_ids: Channel IDs to send to
+            message: Embed or PackedMessage to send
+            lines: Log lines in the message (see ChannelQueue.submit)
+            batch: LogBatch the message belongs to (see ChannelQueue.submit)
+        """
+        for channel_id in channel_ids:
+            queue = self.queue_for(channel_id)
+            if queue is None:
+                if channel_id not in self.missing:
+                    self.missing.add(channel_id)
+                    print(f"Warning: Could not find channel {channel_id}")
+                continue
+            queue.submit(message, lines, batch)
+
+
+class LogBatch:
+    """Sends of one log batch still outstanding; see DeliveryTracker"""
+
+    __slots__ = ('position', 'pending', 'tracker')
+
+    def __init__(self, position, tracker):
+        self.position = position
+        self.pending = 1  # held by the caller until everything is queued
+        self.tracker = tracker
+
+    def hold(self):
+        self.pending += 1
+
+    def release(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.tracker._flush()
+
+
+class DeliveryTracker:
+    """
+    Commits a read position once every batch read up to it has been sent or
+    dropped by every channel it was queued for, in read order.
+
+    Usage:
+        batch = tracker.batch(position)
+        fanout.send(channel_ids, message, lines, batch)
+        batch.release()  # everything for this batch is queued
+    """
+
+    def __init__(self, commit):
+        """
+        Args:
+            commit: Called with the newest position whose batches are all done
+        """
+        self.commit = commit
+        self.batches = deque()
+
+    def batch(self, position):
+        """Start tracking the batch that ends at this read position"""
+        batch = LogBatch(position, self)
+        self.batches.append(batch)
+        return batch
+
+    def _flush(self):
+        position = None
+        while self.batches and self.batches[0].pending == 0:
+            position = self.batches.popleft().position
+        if position is not None:
+            self.commit(position)
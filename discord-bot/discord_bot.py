@@ -15,17 +15,25 @@ Configuration via environment variables:
 - GUILD_CONFIGS: "guild_id:log_channel_id:alert_channel_id,..." format
 - MOD_ROLE_NAMES: Comma-separated role names (must exist in all servers)
 - WEREBOT_CONTAINER_NAME: Docker container name
+- DOCKER_SOCKET: Docker daemon socket (default /var/run/docker.sock)
 - WEREBOT_LOG_FILE: Path to Werebot log file
+- LOG_CURSOR_FILE: Where the log read position is kept between restarts
 - WEREBOT_FEATURES_FILE: Path to feature flags JSON
 """
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import os
 import asyncio
 from datetime import datetime
 import json
 
+from channel_queue import ChannelFanout, DeliveryTracker
+from docker_client import DOCKER_SOCKET, ContainerNotFound, DockerClient, DockerError
+from log_packer import ERROR, LINE_LIMIT, pack_log_lines
+from log_search import LEVELS, search_logs
+from log_tailer import LogTailer
+
 # Configuration from environment variables
 DISCORD_TOKEN = os.environ.get('DISCORD_BOT_TOKEN')
 
@@ -48,11 +56,17 @@ if GUILD_CONFIGS_STR:
             }
 
 WEREBOT_CONTAINER_NAME = os.environ.get('WEREBOT_CONTAINER_NAME', 'werebot')
+
+# Docker daemon socket (mounted from the host)
+DOCKER_SOCKET_PATH = os.environ.get('DOCKER_SOCKET', DOCKER_SOCKET)
 MOD_ROLE_NAMES = os.environ.get('MOD_ROLE_NAMES', 'PermaMods,AlumniMods').split(',')  # Multiple mod roles
 
 # Werebot log file path (mounted volume)
 WEREBOT_LOG_FILE = os.environ.get('WEREBOT_LOG_FILE', '/shared/werebot/data/werebot.log')
 
+# Read position in the Werebot log, so restarts neither repost nor skip lines
+LOG_CURSOR_FILE = os.environ.get('LOG_CURSOR_FILE', 'log_cursor.json')
+
 # Werebot feature flags file (shared volume)
 WEREBOT_FEATURES_FILE = os.environ.get('WEREBOT_FEATURES_FILE', '/shared/werebot/data/feature_flags.json')
 
@@ -64,8 +78,11 @@ intents.members = True
 
 bot = commands.Bot(command_prefix='!werebot ', intents=intents)
 
-# Track last log position
-last_log_position = 0
+# Log following
+log_tailer = LogTailer(WEREBOT_LOG_FILE, LOG_CURSOR_FILE)
+fanout = ChannelFanout(bot)
+delivery = DeliveryTracker(log_tailer.commit)
+log_task = None
 last_error_time = None
 
 
@@ -84,106 +101,71 @@ def is_mod():
 
 
 class DockerManager:
-    """Helper class for Docker command interactions"""
-    
-    async def run_command(self, command):
-        """Run a shell command and return output"""
-        proc = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await proc.communicate()
-        return proc.returncode, stdout.decode(), stderr.decode()
+    """Helper class for Docker interactions (Engine API over the mounted socket)"""
     
-    async def get_container_id(self, container_name):
-        """Get container ID by name"""
-        returncode, stdout, stderr = await self.run_command(
-            f"docker ps -a --filter name={container_name} --format '{{{{.ID}}}}'"
-        )
-        
-        if returncode != 0 or not stdout.strip():
-            return None
-        
-        # Return first matching container ID
-        return stdout.strip().split('\n')[0]
+    def __init__(self, socket_path=DOCKER_SOCKET):
+        self.client = DockerClient(socket_path)
     
     async def restart_container(self, container_name):
         """Restart a container by name"""
-        # First check if container exists
-        container_id = await self.get_container_id(container_name)
-        if not container_id:
-            return False, "Container not found"
-        
-        # Restart the container
-        returncode, stdout, stderr = await self.run_command(f"docker restart {container_name}")
-        
-        if returncode == 0:
+        try:
+            await self.client.restart(container_name)
             return True, "Container restarted successfully"
-        else:
-            return False, f"Restart failed: {stderr}"
+        except ContainerNotFound:
+            return False, "Container not found"
+        except DockerError as e:
+            return False, f"Restart failed: {e}"
     
     async def stop_container(self, container_name):
         """Stop a container by name"""
-        # First check if container exists
-        container_id = await self.get_container_id(container_name)
-        if not container_id:
+        try:
+            if await self.client.stop(container_name):
+                return True, "Container stopped successfully"
+            return True, "Container was already stopped"
+        except ContainerNotFound:
             return False, "Container not found"
-        
-        # Stop the container
-        returncode, stdout, stderr = await self.run_command(f"docker stop {container_name}")
-        
-        if returncode == 0:
-            return True, "Container stopped successfully"
-        else:
-            return False, f"Stop failed: {stderr}"
+        except DockerError as e:
+            return False, f"Stop failed: {e}"
     
     async def start_container(self, container_name):
         """Start a container by name"""
-        # First check if container exists
-        container_id = await self.get_container_id(container_name)
-        if not container_id:
+        try:
+            if await self.client.start(container_name):
+                return True, "Container started successfully"
+            return True, "Container was already running"
+        except ContainerNotFound:
             return False, "Container not found"
-        
-        # Start the container
-        returncode, stdout, stderr = await self.run_command(f"docker start {container_name}")
-        
-        if returncode == 0:
-            return True, "Container started successfully"
-        else:
-            return False, f"Start failed: {stderr}"
+        except DockerError as e:
+            return False, f"Start failed: {e}"
     
     async def get_container_status(self, container_name):
         """Get container status"""
-        container_id = await self.get_container_id(container_name)
-        if not container_id:
+        try:
+            data = await self.client.inspect(container_name)
+        except ContainerNotFound:
             return None, "Container not found"
+        except (DockerError, ValueError) as e:
+            return None, f"Failed to get status: {e}"
         
-        # Get container inspect data
-        returncode, stdout, stderr = await self.run_command(
-            f"docker inspect {container_name}"
-        )
-        
-        if returncode != 0:
-            return None, f"Failed to get status: {stderr}"
-        
+        state = data.get('State', {})
+        return {
+            'status': state.get('Status'),
+            'running': state.get('Running', False),
+            'started_at': state.get('StartedAt'),
+            'finished_at': state.get('FinishedAt'),
+            'exit_code': state.get('ExitCode'),
+        }, None
+    
+    async def get_container_stats(self, container_name):
+        """Get CPU and memory usage (None if unavailable)"""
         try:
-            import json
-            data = json.loads(stdout)[0]
-            state = data.get('State', {})
-            
-            return {
-                'status': state.get('Status'),
-                'running': state.get('Running', False),
-                'started_at': state.get('StartedAt'),
-                'finished_at': state.get('FinishedAt'),
-                'exit_code': state.get('ExitCode'),
-            }, None
-        except (json.JSONDecodeError, IndexError, KeyError) as e:
-            return None, f"Failed to parse status: {e}"
+            return await self.client.stats(container_name)
+        except (DockerError, ValueError) as e:
+            print(f"Failed to get container stats: {e}")
+            return None
 
 
-docker_manager = DockerManager()
+docker_manager = DockerManager(DOCKER_SOCKET_PATH)
 
 
 class FeatureManager:
@@ -247,159 +229,93 @@ class FeatureManager:
 feature_manager = FeatureManager()
 
 
+def configured_channels(kind):
+    """IDs of every guild's 'log_channel' or 'alert_channel'"""
+    return [config[kind] for config in GUILD_CONFIGS.values() if config.get(kind)]
+
+
 async def send_to_all_log_channels(embed):
-    """Send an embed to all configured log channels"""
-    for guild_id, config in GUILD_CONFIGS.items():
-        log_channel_id = config.get('log_channel')
-        if log_channel_id:
-            channel = bot.get_channel(log_channel_id)
-            if channel:
-                await channel.send(embed=embed)
+    """Send an embed to all configured log channels (queued, returns immediately)"""
+    fanout.send(configured_channels('log_channel'), embed)
 
 
 @bot.event
 async def on_ready():
-    global last_log_position
+    global log_task
     
     print(f'{bot.user} has connected to Discord!')
     print(f'Monitoring Werebot logs at: {WEREBOT_LOG_FILE}')
     
-    # Seek to end of log file so we don't repost old logs
-    if os.path.exists(WEREBOT_LOG_FILE):
-        with open(WEREBOT_LOG_FILE, 'r') as f:
-            f.seek(0, 2)  # Seek to end
-            last_log_position = f.tell()
-        print(f'Starting log monitoring from position: {last_log_position}')
-    
-    # Start background tasks
-    check_logs.start()
+    # Start background tasks (on_ready runs again after every reconnect)
+    if GUILD_CONFIGS and (log_task is None or log_task.done()):
+        log_task = asyncio.create_task(follow_logs())
     
     # Send startup message to all configured guilds
     for guild_id, config in GUILD_CONFIGS.items():
         log_channel_id = config.get('log_channel')
         if log_channel_id:
-            channel = bot.get_channel(log_channel_id)
-            if channel:
+            queue = fanout.queue_for(log_channel_id)
+            if queue:
                 embed = discord.Embed(
                     title="Discord Bot Online",
                     description="Werebot monitoring active (monitoring new logs only)",
                     color=discord.Color.green(),
                     timestamp=datetime.utcnow()
                 )
-                await channel.send(embed=embed)
+                queue.submit(embed)
             else:
                 print(f'Warning: Could not find log channel {log_channel_id} for guild {guild_id}')
         else:
             print(f'Warning: No log channel configured for guild {guild_id}')
 
 
-@tasks.loop(seconds=10)
-async def check_logs():
-    """Check Were-Bot logs and post new entries to Discord"""
-    global last_log_position
-    
-    if not GUILD_CONFIGS:
-        return
-    
-    try:
-        # Check if log file exists
-        if not os.path.exists(WEREBOT_LOG_FILE):
-            return
-        
-        # Read new log entries
-        with open(WEREBOT_LOG_FILE, 'r') as f:
-            f.seek(last_log_position)
-            new_lines = f.readlines()
-            last_log_position = f.tell()
-        
-        if not new_lines:
-            return
+async def follow_logs():
+    """Post new Were-Bot log lines to Discord as soon as they are written"""
+    async for new_lines in log_tailer.batches():
+        # The read position is saved once every log channel has sent (or
+        # dropped) these lines, so a restart reposts whatever was still queued
+        batch = delivery.batch(log_tailer.position())
+        try:
+            lines = [line.strip() for line in new_lines if line.strip()]
+            if lines:
+                await send_log_batch_to_all_guilds(lines, batch)
         
-        # Group lines and send to all guilds
-        batch = []
-        for line in new_lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            batch.append(line)
-            
-            # Send batch if it's getting large
-            if len(batch) >= 10:
-                await send_log_batch_to_all_guilds(batch)
-                batch = []
+        except Exception as e:
+            print(f"Error posting logs: {e}")
         
-        # Send remaining
-        if batch:
-            await send_log_batch_to_all_guilds(batch)
-    
-    except Exception as e:
-        print(f"Error checking logs: {e}")
+        finally:
+            batch.release()
 
 
-async def send_log_batch_to_all_guilds(lines):
-    """Send a batch of log lines to all configured guilds"""
-    for guild_id, config in GUILD_CONFIGS.items():
-        log_channel_id = config.get('log_channel')
-        alert_channel_id = config.get('alert_channel')
-        
-        if log_channel_id:
-            channel = bot.get_channel(log_channel_id)
-            if channel:
-                await send_log_batch(channel, lines, alert_channel_id)
-
-
-async def send_log_batch(channel, lines, alert_channel_id=None):
-    """Send a batch of log lines to Discord"""
-    global last_error_time
-    
-    # Check for errors
-    has_error = any('ERROR' in line or 'CRITICAL' in line for line in lines)
-    has_warning = any('WARNING' in line for line in lines)
-    
-    # Combine lines
-    log_text = '\n'.join(lines)
-    
-    # Truncate if too long
-    if len(log_text) > 1900:
-        log_text = log_text[:1900] + '\n... (truncated)'
+async def send_log_batch_to_all_guilds(lines, batch=None):
+    """
+    Send a batch of log lines to all configured guilds (packed into few messages, queued per channel)
     
-    # Color based on severity
-    if has_error:
-        color = discord.Color.red()
-        title = "🔴 Werebot Error"
-    elif has_warning:
-        color = discord.Color.orange()
-        title = "⚠️ Werebot Warning"
-    else:
-        color = discord.Color.blue()
-        title = "Werebot Logs"
-    
-    embed = discord.Embed(
-        title=title,
-        description=f"```\n{log_text}\n```",
-        color=color,
-        timestamp=datetime.utcnow()
-    )
+    Args:
+        lines: Log lines
+        batch: LogBatch tracking delivery of these lines (optional)
+    """
+    global last_error_time
     
-    await channel.send(embed=embed)
-    
-    # Send alert for errors
-    if has_error and alert_channel_id:
-        alert_channel = bot.get_channel(alert_channel_id)
-        if alert_channel:
-            # Rate limit alerts (don't spam)
-            now = datetime.utcnow()
-            if last_error_time is None or (now - last_error_time).total_seconds() > 300:
-                last_error_time = now
-                
-                alert_embed = discord.Embed(
-                    title="Werebot Error Alert",
-                    description="An error was detected in Werebot logs. Check the log channel for details.",
-                    color=discord.Color.red(),
-                    timestamp=datetime.utcnow()
-                )
-                await alert_channel.send(embed=alert_embed)
+    # Packed once, shared by every guild
+    messages = pack_log_lines(lines)
+    log_channels = configured_channels('log_channel')
+    for message in messages:
+        fanout.send(log_channels, message, lines=message.line_count, batch=batch)
+    
+    # Send alert for errors, rate limited across all guilds (don't spam)
+    if any(message.level == ERROR for message in messages):
+        now = datetime.utcnow()
+        if last_error_time is None or (now - last_error_time).total_seconds() > 300:
+            last_error_time = now
+            
+            alert_embed = discord.Embed(
+                title="Werebot Error Alert",
+                description="An error was detected in Werebot logs. Check the log channel for details.",
+                color=discord.Color.red(),
+                timestamp=datetime.utcnow()
+            )
+            fanout.send(configured_channels('alert_channel'), alert_embed)
 
 
 @bot.command(name='status')
@@ -439,6 +355,15 @@ async def bot_status(ctx):
     if status.get('started_at'):
         embed.add_field(name="Started At", value=status['started_at'], inline=False)
     
+    if running:
+        stats = await docker_manager.get_container_stats(WEREBOT_CONTAINER_NAME)
+        if stats:
+            embed.add_field(name="CPU", value=f"{stats['cpu_percent']:.1f}%", inline=True)
+            memory = f"{stats['memory_bytes'] / 2**20:.0f} MiB"
+            if stats['memory_limit']:
+                memory += f" / {stats['memory_limit'] / 2**20:.0f} MiB"
+            embed.add_field(name="Memory", value=memory, inline=True)
+    
     await ctx.send(embed=embed)
 
 
@@ -559,36 +484,81 @@ async def start_bot(ctx):
         await send_to_all_log_channels(log_embed)
 
 
+def parse_tail_args(args):
+    """
+    Parse `!werebot tail` arguments: [lines] [error|warning|info] [skip N] [keyword...]
+    
+    Returns:
+        (lines, skip, level, keyword)
+    """
+    lines, skip, level = None, 0, None
+    words = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg.lower() == 'skip' and args and args[0].isdigit():
+            skip = int(args.pop(0))
+        elif arg.isdigit() and lines is None and level is None and not words:
+            lines = int(arg)
+        elif arg.lower() in LEVELS and level is None and not words:
+            level = arg.lower()
+        else:
+            words.append(arg)
+    return max(1, min(lines or 20, 50)), skip, level, ' '.join(words) or None
+
+
 @bot.command(name='tail')
 @is_mod()
-async def tail_logs(ctx, lines: int = 20):
-    """Show last N lines of Werebot logs (Mods only)"""
-    if lines > 50:
-        lines = 50
+async def tail_logs(ctx, *args):
+    """Show last N lines of Werebot logs, optionally filtered, going back with skip (Mods only)"""
+    lines, skip, level, keyword = parse_tail_args(args)
     
     try:
         if not os.path.exists(WEREBOT_LOG_FILE):
             await ctx.send("Log file not found")
             return
         
-        # Read last N lines
-        with open(WEREBOT_LOG_FILE, 'r') as f:
-            all_lines = f.readlines()
-            recent_lines = all_lines[-lines:]
+        # Reads backwards from the end of the log; kept off the event loop
+        recent_lines, has_more = await asyncio.to_thread(
+            search_logs, WEREBOT_LOG_FILE, lines, skip, level, keyword
+        )
+        
+        if not recent_lines:
+            await ctx.send(f"No matching log lines{f' before the newest {skip}' if skip else ''}")
+            return
         
-        log_text = ''.join(recent_lines)
+        # Keep the newest lines that fit in one embed; the rest start the next page
+        shown = []
+        size = 0
+        for line in reversed(recent_lines):
+            line = line.replace('```', '`\u200b``')
+            if len(line) > 1000:
+                line = line[:1000] + '... (truncated)'
+            if shown and size + len(line) + 1 > LINE_LIMIT:
+                break
+            shown.append(line)
+            size += len(line) + 1
+        shown.reverse()
+        log_text = '\n'.join(shown)
+        has_more = has_more or len(shown) < len(recent_lines)
         
-        # Truncate if needed
-        if len(log_text) > 1900:
-            log_text = log_text[-1900:]
-            log_text = "... (truncated)\n" + log_text
+        filters = ' '.join(part for part in (level, f'"{keyword}"' if keyword else None) if part)
+        title = f"Last {len(shown)} Log Lines"
+        if filters:
+            title += f" ({filters})"
+        if skip:
+            title += f" - skipping the newest {skip}"
         
         embed = discord.Embed(
-            title=f"Last {lines} Log Lines",
+            title=title,
             description=f"```\n{log_text}\n```",
             color=discord.Color.blue(),
             timestamp=datetime.utcnow()
         )
+        if has_more:
+            # Lines is always given, so a numeric keyword can't be taken for it
+            older = ' '.join(str(arg) for arg in (lines, level, keyword) if arg)
+            embed.set_footer(text=f"Older lines: !werebot tail {older} skip {skip + len(shown)}")
         
         await ctx.send(embed=embed)
     
@@ -749,8 +719,8 @@ async def bot_help(ctx):
     )
     
     embed.add_field(
-        name="!werebot tail [lines]",
-        value="Show last N lines of logs (default 20, max 50)",
+        name="!werebot tail [lines] [error|warning] [keyword] [skip N]",
+        value="Show last N lines of logs (default 20, max 50), optionally filtered; skip N goes further back",
         inline=False
     )
     
@@ -0,0 +1,206 @@
+"""
+Docker Engine API Client for the Discord Bot
+Talks to the Docker daemon over its unix socket with plain HTTP/1.1 on
+asyncio streams - no docker CLI in the container and no process spawned per
+command. Container names are resolved to IDs once and cached; a cached ID
+that stops existing (the container was recreated) is looked up again.
+"""
+
+from urllib.parse import quote, urlencode
+import asyncio
+import json
+
+DOCKER_SOCKET = '/var/run/docker.sock'
+
+# Seconds Docker waits for a container to exit on stop/restart before killing it
+STOP_TIMEOUT = 10
+
+
+class DockerError(Exception):
+    """The Docker daemon refused a request (or could not be reached)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ContainerNotFound(DockerError):
+    """No container with that name or ID"""
+
+
+def _cpu_percent(stats):
+    cpu = stats.get('cpu_stats', {})
+    precpu = stats.get('precpu_stats', {})
+    cpu_delta = cpu.get('cpu_usage', {}).get('total_usage', 0) - precpu.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    if cpu_delta <= 0 or system_delta <= 0:
+        return 0.0
+    cpus = cpu.get('online_cpus') or len(cpu.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    return cpu_delta / system_delta * cpus * 100
+
+
+def _memory(stats):
+    memory = stats.get('memory_stats', {})
+    details = memory.get('stats', {})
+    # Page cache is reclaimable; `docker stats` leaves it out too (cgroup v2: inactive_file, v1: cache)
+    cache = details.get('inactive_file', details.get('cache', 0))
+    return max(memory.get('usage', 0) - cache, 0), memory.get('limit', 0)
+
+
+class DockerClient:
+    """Minimal async client for the Docker Engine API"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET, timeout=30.0):
+        """
+        Args:
+            socket_path: Docker daemon socket
+            timeout: Seconds allowed per request (stop/restart add their grace period)
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._ids = {}  # container name -> ID
+
+    # -- HTTP ----------------------------------------------------------------
+
+    async def _exchange(self, method, target):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            writer.write(
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: docker\r\n"
+                f"Content-Length: 0\r\n"
+                f"Connection: close\r\n\r\n".encode('ascii')
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            try:
+                status = int(status_line.split(b' ', 2)[1])
+            except (IndexError, ValueError):
+                raise DockerError(f"Bad response from Docker: {status_line[:100]!r}")
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                body = bytearray()
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if size == 0:
+                        break
+                    body += await reader.readexactly(size)
+                    await reader.readline()  # CRLF after each chunk
+            elif 'content-length' in headers:
+                body = await reader.readexactly(int(headers['content-length']))
+            else:
+                body = await reader.read()
+            return status, bytes(body)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def request(self, method, path, query=None, timeout=None):
+        """
+        Send one API request.
+
+        Args:
+            method: HTTP method
+            path: API path, e.g. /containers/json
+            query: Query parameters (optional)
+            timeout: Seconds to wait (default: the client's timeout)
+
+        Returns:
+            (status, body bytes)
+
+        Raises:
+            DockerError: If the socket can't be reached or the request times out
+        """
+        target = path + ('?' + urlencode(query) if query else '')
+        try:
+            return await asyncio.wait_for(self._exchange(method, target), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise DockerError(f"Docker did not answer {method} {path} in time")
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            raise DockerError(f"Docker socket error: {e}")
+
+    @staticmethod
+    def _error(status, body):
+        try:
+            message = json.loads(body).get('message', '')
+        except (ValueError, AttributeError):
+            message = body.decode('utf-8', errors='replace')
+        return message or f"HTTP {status}"
+
+    # -- containers ----------------------------------------------------------
+
+    async def inspect(self, name):
+        """Full inspect data for a container (refreshes the cached ID)"""
+        status, body = await self.request('GET', f'/containers/{quote(name, safe="")}/json')
+        if status == 404:
+            self._ids.pop(name, None)
+            raise ContainerNotFound(f"Container {name} not found", status)
+        if status != 200:
+            raise DockerError(self._error(status, body), status)
+        data = json.loads(body)
+        self._ids[name] = data['Id']
+        return data
+
+    async def container_id(self, name):
+        """ID for a container name, cached after the first lookup"""
+        container_id = self._ids.get(name)
+        if container_id is None:
+            container_id = (await self.inspect(name))['Id']
+        return container_id
+
+    async def _container_call(self, name, method, action, query=None, timeout=None):
+        """Call /containers/{id}/{action}, re-resolving the ID once if the container was recreated"""
+        for attempt in range(2):
+            container_id = await self.container_id(name)
+            status, body = await self.request(method, f'/containers/{container_id}/{action}', query, timeout)
+            if status == 404 and attempt == 0:
+                self._ids.pop(name, None)
+                continue
+            if status == 404:
+                raise ContainerNotFound(f"Container {name} not found", status)
+            if status >= 400:
+                raise DockerError(self._error(status, body), status)
+            return status, body
+
+    async def start(self, name):
+        """Start a container; False if it was already running"""
+        status, _ = await self._container_call(name, 'POST', 'start')
+        return status != 304
+
+    async def stop(self, name, timeout=STOP_TIMEOUT):
+        """Stop a container; False if it was already stopped"""
+        status, _ = await self._container_call(name, 'POST', 'stop', {'t': timeout}, self.timeout + timeout)
+        return status != 304
+
+    async def restart(self, name, timeout=STOP_TIMEOUT):
+        """Restart a container"""
+        await self._container_call(name, 'POST', 'restart', {'t': timeout}, self.timeout + timeout)
+
+    async def stats(self, name):
+        """
+        One resource usage sample for a container.
+
+        Returns:
+            Dict with cpu_percent, memory_bytes, memory_limit and pids
+        """
+        _, body = await self._container_call(name, 'GET', 'stats', {'stream': 'false'})
+        stats = json.loads(body)
+        memory_bytes, memory_limit = _memory(stats)
+        return {
+            'cpu_percent': _cpu_percent(stats),
+            'memory_bytes': memory_bytes,
+            'memory_limit': memory_limit,
+            'pids': stats.get('pids_stats', {}).get('current'),
+        }
@@ -0,0 +1,156 @@
+"""
+Fake Docker Engine API for testing docker_client
+Serves the few endpoints DockerClient uses from an in-memory set of
+containers on a unix socket, records every request, and can answer with
+either Content-Length or chunked bodies like the real daemon.
+"""
+
+from urllib.parse import parse_qs, unquote, urlsplit
+import asyncio
+import json
+import os
+
+# A stats sample: 10% of a 2-CPU host's time over the sample window, 300 MiB
+# used of which 100 MiB is page cache, 1 GiB limit
+SAMPLE_STATS = {
+    'cpu_stats': {
+        'cpu_usage': {'total_usage': 2_000_000},
+        'system_cpu_usage': 110_000_000,
+        'online_cpus': 2,
+    },
+    'precpu_stats': {
+        'cpu_usage': {'total_usage': 1_000_000},
+        'system_cpu_usage': 100_000_000,
+    },
+    'memory_stats': {
+        'usage': 300 * 2**20,
+        'limit': 2**30,
+        'stats': {'inactive_file': 100 * 2**20},
+    },
+    'pids_stats': {'current': 5},
+}
+
+
+class FakeDockerEngine:
+    """
+    In-memory Docker daemon on a unix socket.
+
+    Usage:
+        engine = FakeDockerEngine(socket_path)
+        engine.add('werebot', running=True)
+        await engine.start()
+        ...
+        await engine.stop()
+    """
+
+    def __init__(self, socket_path, chunked=False):
+        """
+        Args:
+            socket_path: Where to listen
+            chunked: Send bodies with Transfer-Encoding: chunked instead of Content-Length
+        """
+        self.socket_path = socket_path
+        self.chunked = chunked
+        self.containers = {}  # ID -> {'name', 'running'}
+        self.stats = SAMPLE_STATS
+        self.requests = []    # (method, path, query)
+        self._server = None
+        self._next_id = 1
+
+    def add(self, name, running=True):
+        """Create a container, replacing (with a new ID) any with the same name"""
+        self.remove(name)
+        container_id = f"{self._next_id:064x}"
+        self._next_id += 1
+        self.containers[container_id] = {'name': name, 'running': running}
+        return container_id
+
+    def remove(self, name):
+        for container_id, container in list(self.containers.items()):
+            if container['name'] == name:
+                del self.containers[container_id]
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, self.socket_path)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    # -- HTTP ----------------------------------------------------------------
+
+    def _response(self, status, body=None):
+        payload = b'' if body is None else json.dumps(body).encode()
+        head = f"HTTP/1.1 {status} Fake\r\nContent-Type: application/json\r\n"
+        if not self.chunked or not payload:
+            return head.encode() + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+
+        out = head.encode() + b"Transfer-Encoding: chunked\r\n\r\n"
+        for start in range(0, len(payload), 16):
+            chunk = payload[start:start + 16]
+            out += f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n"
+        return out + b"0\r\n\r\n"
+
+    async def _handle(self, reader, writer):
+        request_line = (await reader.readline()).decode('latin-1')
+        while (await reader.readline()) not in (b'\r\n', b''):
+            pass
+
+        method, target, _ = request_line.split(' ', 2)
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append((method, url.path, query))
+
+        writer.write(self._route(method, url.path))
+        await writer.drain()
+        writer.close()
+
+    def _find(self, ref):
+        """Container by ID or name"""
+        if ref in self.containers:
+            return ref, self.containers[ref]
+        for container_id, container in self.containers.items():
+            if container['name'] == ref:
+                return container_id, container
+        return None, None
+
+    def _route(self, method, path):
+        parts = path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'containers':
+            return self._response(404, {'message': 'page not found'})
+
+        ref, action = unquote(parts[1]), parts[2]
+        container_id, container = self._find(ref)
+        if container is None:
+            return self._response(404, {'message': f'No such container: {ref}'})
+
+        if method == 'GET' and action == 'json':
+            return self._response(200, {
+                'Id': container_id,
+                'Name': '/' + container['name'],
+                'State': {
+                    'Status': 'running' if container['running'] else 'exited',
+                    'Running': container['running'],
+                    'StartedAt': '2026-01-01T00:00:00Z',
+                    'FinishedAt': '0001-01-01T00:00:00Z',
+                    'ExitCode': 0,
+                },
+            })
+        if method == 'GET' and action == 'stats':
+            return self._response(200, self.stats)
+        if method == 'POST' and action == 'start':
+            if container['running']:
+                return self._response(304)
+            container['running'] = True
+            return self._response(204)
+        if method == 'POST' and action == 'stop':
+            if not container['running']:
+                return self._response(304)
+            container['running'] = False
+            return self._response(204)
+        if method == 'POST' and action == 'restart':
+            container['running'] = True
+            return self._response(204)
+        return self._response(500, {'message': f'unsupported: {method} {action}'})
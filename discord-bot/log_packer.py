@@ -0,0 +1,183 @@
+"""
+Log Packing for the Discord Bot
+Turns a batch of log lines into as few Discord messages as possible: each
+message carries up to 10 embeds and 6000 characters, each embed up to 4096
+characters of description, and consecutive lines of the same severity share
+an embed colored for that severity. Nothing is truncated; a batch too big
+for a few messages is sent as a text file instead.
+"""
+
+from datetime import datetime
+import io
+
+import discord
+
+# Discord limits
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_CHARS_LIMIT = 6000  # titles + descriptions of all embeds in one message
+
+CODE_BLOCK = "```\n{}\n```"
+CODE_BLOCK_CHARS = len(CODE_BLOCK.format(''))
+LINE_LIMIT = EMBED_DESCRIPTION_LIMIT - CODE_BLOCK_CHARS
+
+# Batches needing more messages than this are sent as one file instead
+MAX_MESSAGES = 3
+
+ERROR, WARNING, INFO = 'error', 'warning', 'info'
+
+TITLES = {
+    ERROR: "🔴 Werebot Error",
+    WARNING: "⚠️ Werebot Warning",
+    INFO: "Werebot Logs",
+}
+TITLE_CHARS = max(len(title) for title in TITLES.values())
+
+
+def _color(level):
+    if level == ERROR:
+        return discord.Color.red()
+    if level == WARNING:
+        return discord.Color.orange()
+    return discord.Color.blue()
+
+
+def severity(line):
+    """ERROR, WARNING or INFO for a log line"""
+    if 'ERROR' in line or 'CRITICAL' in line:
+        return ERROR
+    if 'WARNING' in line:
+        return WARNING
+    return INFO
+
+
+def worst(levels):
+    """Most severe of the given levels (INFO if none)"""
+    levels = set(levels)
+    for level in (ERROR, WARNING):
+        if level in levels:
+            return level
+    return INFO
+
+
+def _pieces(line):
+    """A line split into parts that each fit an embed, with ``` defused so it can't end the code block"""
+    line = line.replace('```', '`\u200b``')
+    return [line[i:i + LINE_LIMIT] for i in range(0, len(line), LINE_LIMIT)] or ['']
+
+
+def _log_embed(level, text):
+    return discord.Embed(
+        title=TITLES[level],
+        description=CODE_BLOCK.format(text),
+        color=_color(level),
+        timestamp=datetime.utcnow()
+    )
+
+
+class PackedMessage:
+    """One Discord message worth of log output"""
+
+    __slots__ = ('embeds', 'line_count', 'level', 'attachment')
+
+    def __init__(self, embeds, line_count, level, attachment=None):
+        self.embeds = embeds
+        self.line_count = line_count
+        self.level = level
+        self.attachment = attachment  # text sent as a file, if any
+
+    def send_kwargs(self):
+        """Arguments for channel.send(); a new File each time, since a File can only be sent once"""
+        kwargs = {'embeds': self.embeds}
+        if self.attachment is not None:
+            kwargs['file'] = discord.File(
+                io.BytesIO(self.attachment.encode('utf-8')),
+                filename=f"werebot-{datetime.utcnow():%Y%m%d-%H%M%S}.log"
+            )
+        return kwargs
+
+
+def _file_message(lines, levels):
+    """A summary embed with the whole batch attached"""
+    level = worst(levels)
+    notable = [line for line, line_level in zip(lines, levels) if line_level != INFO]
+
+    description = f"{len(lines)} log lines - too many to post inline, see the attached file."
+    if notable:
+        preview = []
+        size = 0
+        for line in notable:
+            line = line.replace('```', '`\u200b``')[:300]
+            if size + len(line) + 1 > 1500:
+                break
+            preview.append(line)
+            size += len(line) + 1
+        description += f"\n\n{len(notable)} warning/error line(s):\n" + CODE_BLOCK.format('\n'.join(preview))
+
+    embed = discord.Embed(
+        title=TITLES[level],
+        description=description,
+        color=_color(level),
+        timestamp=datetime.utcnow()
+    )
+    return PackedMessage([embed], len(lines), level, attachment='\n'.join(lines) + '\n')
+
+
+def pack_log_lines(lines, max_messages=MAX_MESSAGES):
+    """
+    Pack log lines into the fewest messages Discord accepts, in order.
+
+    Args:
+        lines: Log lines (without newlines)
+        max_messages: Above this many messages, send one file message instead
+
+    Returns:
+        List of PackedMessage
+    """
+    if not lines:
+        return []
+
+    levels = [severity(line) for line in lines]
+
+    # messages: [[embed_parts, ...], ...]; embed_parts = [levels, pieces, text_length]
+    messages = []
+    message_chars = []
+    message_lines = []
+    for line, level in zip(lines, levels):
+        for number, piece in enumerate(_pieces(line)):
+            message = messages[-1] if messages else None
+            embed = message[-1] if message else None
+            added = len(piece) + 1
+            # A severity change starts a new embed, unless the message is out of embeds:
+            # then the line joins the last one, which takes the worst severity in it
+            if (embed and (level in embed[0] or len(message) == EMBEDS_PER_MESSAGE)
+                    and embed[2] + added <= LINE_LIMIT
+                    and message_chars[-1] + added <= MESSAGE_CHARS_LIMIT):
+                embed[0].add(level)
+                embed[1].append(piece)
+                embed[2] += added
+                message_chars[-1] += added
+            else:
+                # New embed: title and code fences count towards the message total
+                cost = TITLE_CHARS + CODE_BLOCK_CHARS + len(piece)
+                if (message is None or len(message) == EMBEDS_PER_MESSAGE
+                        or message_chars[-1] + cost > MESSAGE_CHARS_LIMIT):
+                    messages.append([])
+                    message_chars.append(0)
+                    message_lines.append(0)
+                messages[-1].append([{level}, [piece], len(piece)])
+                message_chars[-1] += cost
+            if number == 0:
+                message_lines[-1] += 1
+
+    if len(messages) > max_messages:
+        return [_file_message(lines, levels)]
+
+    return [
+        PackedMessage(
+            [_log_embed(worst(embed_levels), '\n'.join(pieces)) for embed_levels, pieces, _ in message],
+            line_count,
+            worst(level for embed_levels, _, _ in message for level in embed_levels)
+        )
+        for message, line_count in zip(messages, message_lines)
+    ]
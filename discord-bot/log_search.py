@@ -0,0 +1,110 @@
+"""
+Log Search for the Discord Bot
+Backs `!werebot tail`: reads the Were-Bot log backwards from the end in
+fixed-size blocks, so showing the last lines of a huge log only touches its
+last few blocks, then continues into rotated files (werebot.log.1, .2, ...)
+for older pages. Lines can be filtered by level and keyword.
+
+Everything here is blocking file I/O - call it through asyncio.to_thread.
+"""
+
+import glob
+import os
+import re
+
+from log_packer import ERROR, INFO, WARNING, severity
+
+BLOCK_SIZE = 64 * 1024
+
+# Minimum level -> levels shown
+LEVELS = {
+    'error': {ERROR},
+    'warning': {ERROR, WARNING},
+    'info': {ERROR, WARNING, INFO},
+}
+
+
+def log_files(path):
+    """The log followed by its rotated files, newest first (compressed ones are skipped)"""
+    rotated = []
+    for candidate in glob.glob(glob.escape(path) + '.*'):
+        match = re.fullmatch(r'\.(\d+)', candidate[len(path):])
+        if match:
+            rotated.append((int(match.group(1)), candidate))
+    return [path] + [candidate for _, candidate in sorted(rotated)]
+
+
+def reverse_lines(path, block_size=BLOCK_SIZE):
+    """
+    Yield the lines of a file from last to first, reading block by block from the end.
+
+    Args:
+        path: File to read
+        block_size: Bytes read per step
+
+    Yields:
+        Lines without their newline (decoded as UTF-8, bad bytes replaced)
+    """
+    with open(path, 'rb') as f:
+        position = file_size = f.seek(0, os.SEEK_END)
+        if position:
+            # A final newline ends the last line rather than starting an empty one
+            f.seek(position - 1)
+            if f.read(1) == b'\n':
+                position -= 1
+        remainder = b''  # start of a line that began in an earlier block
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            parts = (f.read(size) + remainder).split(b'\n')
+            remainder = parts.pop(0)
+            for part in reversed(parts):
+                yield part.decode('utf-8', errors='replace')
+        if file_size:
+            yield remainder.decode('utf-8', errors='replace')
+
+
+def search_logs(path, count=20, skip=0, level=None, keyword=None, block_size=BLOCK_SIZE):
+    """
+    Find recent log lines, newest first.
+
+    Args:
+        path: Current log file (rotated files next to it are searched too)
+        count: Lines to return
+        skip: Newest matching lines to pass over first (0 for the latest lines)
+        level: 'error', 'warning' or 'info' - minimum level to include (None for all)
+        keyword: Only lines containing this, case-insensitive (None for all)
+        block_size: Bytes read per step
+
+    Returns:
+        (lines, has_more): the lines oldest first, and whether older matching
+        lines exist
+    """
+    wanted = LEVELS.get(level) if level else None
+    needle = keyword.lower() if keyword else None
+
+    found = []
+    for log_file in log_files(path):
+        try:
+            lines = reverse_lines(log_file, block_size)
+            for line in lines:
+                line = line.rstrip('\r')
+                if not line.strip():
+                    continue
+                if wanted is not None and severity(line) not in wanted:
+                    continue
+                if needle is not None and needle not in line.lower():
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                if len(found) == count:
+                    return found[::-1], True
+                found.append(line)
+        except FileNotFoundError:
+            continue  # rotated away while we were reading
+        finally:
+            lines.close()
+
+    return found[::-1], False
@@ -0,0 +1,316 @@
+"""
+Event-driven Log Tailer for the Discord Bot
+Follows the Were-Bot log file like `tail -F`: new lines are picked up as
+soon as inotify reports a write, rotation (rename + new file) and
+truncation are detected, and the read position is saved to a cursor file
+so a restart continues where the last run stopped.
+
+Falls back to polling where inotify is not available.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import glob
+import json
+import os
+import struct
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct('iIII')
+
+# Largest chunk read per step, so catching up on a big backlog doesn't block the event loop
+MAX_READ = 256 * 1024
+
+
+class _Inotify:
+    """Minimal inotify binding over ctypes: one directory watch, readable from asyncio"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed for {directory}')
+
+    def read_names(self):
+        """
+        Drain pending events.
+
+        Returns:
+            Set of file names the events were about; None if the kernel
+            dropped events or the watch went away (caller should re-check)
+        """
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            if not data:
+                return names
+
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & (IN_Q_OVERFLOW | IN_IGNORED):
+                    return None
+                names.add(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """
+    Async line reader that follows a log file across rotation and truncation.
+
+    Usage:
+        tailer = LogTailer(path, cursor_file)
+        async for lines in tailer.batches():
+            await post(lines)
+            tailer.commit()
+
+    commit() records that the lines handed out so far were delivered; only
+    committed positions are written to the cursor file. When delivery finishes
+    later, take position() after each batch and commit that instead.
+    """
+
+    def __init__(self, path, cursor_file=None, poll_interval=1.0, recheck_interval=30.0):
+        """
+        Args:
+            path: Log file to follow
+            cursor_file: JSON file storing the position between restarts (optional)
+            poll_interval: Seconds between checks when inotify is unavailable
+            recheck_interval: Seconds between safety checks even with inotify
+        """
+        self.path = path
+        self.cursor_file = cursor_file
+        self.poll_interval = poll_interval
+        self.recheck_interval = recheck_interval
+
+        self._file = None
+        self._identity = None  # (st_dev, st_ino) of the open file
+        self._offset = 0       # end of the last complete line handed out
+        self._partial = b''    # bytes after the last newline
+        self._saved = None     # cursor as last written to cursor_file
+        self._was_missing = False  # the log didn't exist yet when we first looked
+        self._inotify = None
+        self._changed = asyncio.Event()
+
+    # -- cursor --------------------------------------------------------------
+
+    def _load_cursor(self):
+        if not self.cursor_file or not os.path.exists(self.cursor_file):
+            return None
+        try:
+            with open(self.cursor_file, 'r') as f:
+                cursor = json.load(f)
+            return (cursor['device'], cursor['inode']), cursor['offset']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable log cursor {self.cursor_file}: {e}")
+            return None
+
+    def position(self):
+        """Position after the lines handed out so far (for a later commit), or None"""
+        if self._identity is None:
+            return None
+        return {'device': self._identity[0], 'inode': self._identity[1], 'offset': self._offset}
+
+    def commit(self, position=None):
+        """
+        Persist a position.
+
+        Args:
+            position: From position(); defaults to after the lines handed out so far
+        """
+        cursor = position or self.position()
+        if not self.cursor_file or cursor is None:
+            return
+        if cursor == self._saved:
+            return
+        try:
+            tmp_path = self.cursor_file + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(cursor, f)
+            os.replace(tmp_path, self.cursor_file)
+            self._saved = cursor
+        except OSError as e:
+            print(f"Could not save log cursor: {e}")
+
+    # -- opening -------------------------------------------------------------
+
+    def _open(self, path, offset):
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._offset = offset if offset <= stat.st_size else 0
+        self._partial = b''
+        self._file.seek(self._offset)
+
+    def _find_by_identity(self, identity):
+        """The current log or a rotated sibling (werebot.log.1, ...) with this device/inode"""
+        for candidate in [self.path] + sorted(glob.glob(glob.escape(self.path) + '.*')):
+            try:
+                stat = os.stat(candidate)
+            except OSError:
+                continue
+            if (stat.st_dev, stat.st_ino) == identity:
+                return candidate
+        return None
+
+    def _open_initial(self):
+        """
+        Open where the cursor says; without a cursor start at the end so old
+        logs are not reposted.
+        """
+        if not os.path.exists(self.path):
+            self._was_missing = True
+            return False
+
+        cursor = self._load_cursor()
+        if cursor is None:
+            # A log created after we started is read from its first line
+            self._open(self.path, 0 if self._was_missing else os.path.getsize(self.path))
+            print(f"Starting log monitoring of {self.path} at position {self._offset}")
+            return True
+
+        identity, offset = cursor
+        found = self._find_by_identity(identity)
+        if found:
+            # If this is a rotated file, reaching its end switches to the new log
+            self._open(found, offset)
+            print(f"Resuming log monitoring in {found} at position {self._offset}")
+        else:
+            # The file we were reading is gone; everything in the current log is new
+            self._open(self.path, 0)
+            print(f"Log was rotated while offline, reading {self.path} from the start")
+        return True
+
+    # -- reading -------------------------------------------------------------
+
+    def _lines_from(self, chunk):
+        data = self._partial + chunk
+        complete, newline, self._partial = data.rpartition(b'\n')
+        if not newline:
+            return []
+        self._offset += len(complete) + 1
+        return complete.decode('utf-8', errors='replace').split('\n')
+
+    def _read_available(self):
+        """
+        Read whatever is new, following truncation and rotation.
+
+        Returns:
+            List of complete lines (possibly empty)
+        """
+        if self._file is None and not self._open_initial():
+            return []
+
+        chunk = self._file.read(MAX_READ)
+        if chunk:
+            return self._lines_from(chunk)
+
+        # At end of file: has it been truncated or replaced?
+        stat = os.fstat(self._file.fileno())
+        if stat.st_size < self._offset + len(self._partial):
+            print(f"{self.path} was truncated, reading from the start")
+            self._file.seek(0)
+            self._offset = 0
+            self._partial = b''
+            return self._lines_from(self._file.read(MAX_READ))
+
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return []  # rotated away, new file not created yet
+
+        if (current.st_dev, current.st_ino) != self._identity:
+            print(f"{self.path} was rotated, following the new file")
+            leftover = self._partial.decode('utf-8', errors='replace')
+            self._file.close()
+            self._open(self.path, 0)
+            lines = [leftover] if leftover else []
+            return lines + self._lines_from(self._file.read(MAX_READ))
+
+        return []
+
+    # -- waiting -------------------------------------------------------------
+
+    def _start_inotify(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            self._inotify = _Inotify(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling {self.path} every {self.poll_interval}s")
+            return
+        asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_inotify)
+        print(f"Watching {directory} with inotify")
+
+    def _on_inotify(self):
+        names = self._inotify.read_names()
+        base = os.path.basename(self.path)
+        # Other files in the data directory (the state database) change constantly
+        if names is None or any(name == base or name.startswith(base + '.') for name in names):
+            self._changed.set()
+
+    async def _wait_for_change(self):
+        timeout = self.recheck_interval if self._inotify else self.poll_interval
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    def close(self):
+        if self._inotify:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    async def batches(self):
+        """
+        Yield lists of new lines as they are written, forever.
+
+        Call commit() after handling each batch to move the saved cursor.
+        """
+        self._start_inotify()
+        try:
+            while True:
+                try:
+                    lines = self._read_available()
+                except OSError as e:
+                    print(f"Error reading {self.path}: {e}")
+                    lines = []
+                    if self._file:
+                        self._file.close()
+                        self._file = None
+
+                if lines:
+                    yield lines
+                    await asyncio.sleep(0)  # let other tasks run while catching up
+                else:
+                    await self._wait_for_change()
+        finally:
+            self.close()
@@ -0,0 +1,123 @@
+"""
+Tests for docker_client against the fake Engine API in fake_docker.
+
+Usage:
+    python -m unittest test_docker_client
+"""
+
+import os
+import tempfile
+import unittest
+
+from docker_client import ContainerNotFound, DockerClient, DockerError, _cpu_percent, _memory
+from fake_docker import SAMPLE_STATS, FakeDockerEngine
+
+
+class DockerClientTest(unittest.IsolatedAsyncioTestCase):
+    chunked = False
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, 'docker.sock')
+        self.engine = FakeDockerEngine(self.socket_path, chunked=self.chunked)
+        self.engine.add('werebot', running=True)
+        await self.engine.start()
+        self.client = DockerClient(self.socket_path, timeout=5)
+
+    async def asyncTearDown(self):
+        await self.engine.stop()
+        self.tmp.cleanup()
+
+    async def test_inspect(self):
+        data = await self.client.inspect('werebot')
+        self.assertTrue(data['State']['Running'])
+        self.assertEqual(await self.client.container_id('werebot'), data['Id'])
+
+    async def test_start_and_stop_report_304_as_unchanged(self):
+        self.assertFalse(await self.client.start('werebot'))  # already running
+        self.assertTrue(await self.client.stop('werebot'))
+        self.assertFalse(await self.client.stop('werebot'))   # already stopped
+        self.assertTrue(await self.client.start('werebot'))
+
+    async def test_stop_passes_grace_period(self):
+        await self.client.stop('werebot', timeout=3)
+        self.assertEqual(self.engine.requests[-1][2], {'t': '3'})
+
+    async def test_container_id_is_cached(self):
+        await self.client.restart('werebot')
+        await self.client.restart('werebot')
+        await self.client.stats('werebot')
+        lookups = [request for request in self.engine.requests if request[1].endswith('/json')]
+        self.assertEqual(len(lookups), 1)
+
+    async def test_recreated_container_is_resolved_again(self):
+        old_id = await self.client.container_id('werebot')
+        new_id = self.engine.add('werebot', running=False)  # e.g. `docker compose up` recreated it
+
+        self.assertTrue(await self.client.start('werebot'))
+        self.assertNotEqual(old_id, new_id)
+        self.assertEqual(await self.client.container_id('werebot'), new_id)
+        self.assertEqual(
+            [(method, path) for method, path, _ in self.engine.requests[-3:]],
+            [('POST', f'/containers/{old_id}/start'),
+             ('GET', '/containers/werebot/json'),
+             ('POST', f'/containers/{new_id}/start')]
+        )
+
+    async def test_missing_container(self):
+        with self.assertRaises(ContainerNotFound) as raised:
+            await self.client.restart('nope')
+        self.assertEqual(raised.exception.status, 404)
+
+    async def test_removed_container(self):
+        await self.client.container_id('werebot')
+        self.engine.remove('werebot')
+        with self.assertRaises(ContainerNotFound):
+            await self.client.stop('werebot')
+
+    async def test_stats(self):
+        stats = await self.client.stats('werebot')
+        self.assertAlmostEqual(stats['cpu_percent'], 20.0)
+        self.assertEqual(stats['memory_bytes'], 200 * 2**20)
+        self.assertEqual(stats['memory_limit'], 2**30)
+        self.assertEqual(stats['pids'], 5)
+
+    async def test_unreachable_socket(self):
+        client = DockerClient(os.path.join(self.tmp.name, 'missing.sock'))
+        with self.assertRaises(DockerError):
+            await client.start('werebot')
+
+
+class ChunkedDockerClientTest(DockerClientTest):
+    """The same tests with chunked response bodies"""
+    chunked = True
+
+
+class StatsMathTest(unittest.TestCase):
+
+    def test_cpu_percent(self):
+        # 1e6 of 1e7 system ticks, times 2 CPUs
+        self.assertAlmostEqual(_cpu_percent(SAMPLE_STATS), 20.0)
+
+    def test_cpu_percent_falls_back_to_percpu_count(self):
+        stats = {
+            'cpu_stats': {'cpu_usage': {'total_usage': 300, 'percpu_usage': [1, 2, 3, 4]},
+                          'system_cpu_usage': 2000},
+            'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 1000},
+        }
+        self.assertAlmostEqual(_cpu_percent(stats), 80.0)
+
+    def test_cpu_percent_without_previous_sample(self):
+        # A stopped container (or the first sample) has no deltas
+        self.assertEqual(_cpu_percent({'cpu_stats': {}, 'precpu_stats': {}}), 0.0)
+
+    def test_memory_excludes_cgroup_v1_cache(self):
+        stats = {'memory_stats': {'usage': 500, 'limit': 1000, 'stats': {'cache': 200}}}
+        self.assertEqual(_memory(stats), (300, 1000))
+
+    def test_memory_missing(self):
+        self.assertEqual(_memory({}), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
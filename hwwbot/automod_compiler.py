@@ -0,0 +1,123 @@
+"""
+AutoMod Player List Compiler for HWWBot
+Turns the raw player-list cells from the Backend sheet into clean AutoMod
+`~name` checks: prefixes stripped, duplicates removed, sorted, quoted where
+YAML needs it, and split over several checks when the list gets long.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Reddit usernames: letters, digits, _ and -
+USERNAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Names may be separated by commas, semicolons or any whitespace
+SEPARATORS = re.compile(r'[,;\s]+')
+
+# /u/name, u/name, @name
+PREFIX = re.compile(r'^(?:/?u/|@)', re.IGNORECASE)
+
+# Plain YAML scalars that would not load as strings (YAML 1.1 booleans and nulls)
+YAML_SPECIAL = {'y', 'n', 'yes', 'no', 'on', 'off', 'true', 'false', 'null'}
+
+# Longest list written on one check line; longer lists get ~name#2, ~name#3 ...
+MAX_CHECK_CHARS = 10000
+
+# Reddit refuses wiki pages over 512 KiB
+WIKI_MAX_BYTES = 512 * 1024
+
+
+def parse_names(raw):
+    """
+    Normalize a player-list cell into a sorted list of unique usernames.
+
+    Accepts "[a, b]", "a, b", one name per line, /u/ or u/ prefixes and any
+    capitalization. AutoMod compares names case-insensitively, so names are
+    lower-cased and deduplicated on that.
+
+    Args:
+        raw: Cell value (may be None)
+
+    Returns:
+        (names, rejected): sorted lowercase usernames, and tokens that are
+        not valid usernames
+    """
+    if not raw:
+        return [], []
+
+    names = set()
+    rejected = []
+    for token in SEPARATORS.split(raw.strip().strip('[]')):
+        token = PREFIX.sub('', token.strip().strip('"\''))
+        if not token:
+            continue
+        if USERNAME.match(token):
+            names.add(token.lower())
+        else:
+            rejected.append(token)
+    return sorted(names), rejected
+
+
+def yaml_name(name):
+    """A username as a YAML flow-sequence item, quoted only when it would not load as a string"""
+    # Leading digits or - may load as numbers (123, 1e5, 0x1f, -1)
+    if name in YAML_SPECIAL or name[0].isdigit() or name[0] == '-':
+        return f'"{name}"'
+    return name
+
+
+def chunk_names(names, max_chars=MAX_CHECK_CHARS):
+    """Split names into consecutive runs whose formatted list fits in max_chars"""
+    chunks = []
+    current = []
+    length = 2  # brackets
+    for name in names:
+        item = yaml_name(name)
+        added = len(item) + (2 if current else 0)  # ", " separator
+        if current and length + added > max_chars:
+            chunks.append(current)
+            current = []
+            length = 2
+            added = len(item)
+        current.append(item)
+        length += added
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+def name_checks(raw, indent='    ', label='player list'):
+    """
+    Compile a player-list cell into `~name` check lines for an author: block.
+
+    Checks in one rule must all be satisfied, so splitting a negated list
+    into ~name#1, ~name#2 ... still means "not any of these names": the
+    rule only fires for authors missing from every chunk. (Splitting over
+    separate rules would not: each rule would remove the players listed in
+    the other rules' chunks.)
+
+    Args:
+        raw: Cell value with the usernames
+        indent: Prefix for each line (the author: block's indentation)
+        label: What the list is, for log messages
+
+    Returns:
+        The check lines, joined with newlines (no trailing newline)
+    """
+    names, rejected = parse_names(raw)
+    if rejected:
+        logger.warning(f"Ignoring {len(rejected)} invalid name(s) in {label}: {', '.join(rejected[:10])}")
+    if not names:
+        logger.warning(f"{label} is empty")
+
+    chunks = chunk_names(names)
+    if len(chunks) == 1:
+        return f"{indent}~name: [{', '.join(chunks[0])}]"
+
+    logger.info(f"{label}: {len(names)} names split over {len(chunks)} checks")
+    return '\n'.join(
+        f"{indent}~name#{number}: [{', '.join(chunk)}]"
+        for number, chunk in enumerate(chunks, 1)
+    )
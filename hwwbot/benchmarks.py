@@ -0,0 +1,63 @@
+"""
+Microbenchmarks for HWWBot.
+
+Usage:
+    python benchmarks.py
+"""
+
+import logging
+import random
+import string
+import timeit
+
+from automod_compiler import name_checks, parse_names
+
+
+def _synthetic_roster(players=5000, duplicates=0.2, seed=42):
+    """
+    A sign-up roster as mods paste it: mixed case, some /u/ or u/ prefixes,
+    repeated sign-ups and the odd stray token.
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + '_-'
+    names = [
+        rng.choice(string.ascii_letters) + ''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 19)))
+        for _ in range(players)
+    ]
+    names += rng.sample(names, int(players * duplicates))
+    rng.shuffle(names)
+
+    tokens = []
+    for name in names:
+        roll = rng.random()
+        if roll < 0.1:
+            name = '/u/' + name
+        elif roll < 0.15:
+            name = 'u/' + name
+        elif roll < 0.3:
+            name = name.upper()
+        tokens.append(name)
+    tokens.insert(rng.randrange(len(tokens)), '(late)')
+    return '[' + ', '.join(tokens) + ']'
+
+
+def bench_roster_compile(players=5000, number=20, seed=42):
+    """Compiling a roster cell into ~name checks"""
+    raw = _synthetic_roster(players, seed=seed)
+    names, rejected = parse_names(raw)
+    checks = name_checks(raw)
+
+    parse = timeit.timeit(lambda: parse_names(raw), number=number) / number
+    compile_ = timeit.timeit(lambda: name_checks(raw), number=number) / number
+
+    print(f"AutoMod roster compile ({players} players + 20% duplicate sign-ups):")
+    print(f"  raw cell:        {len(raw):8d} chars, {raw.count(',') + 1} entries")
+    print(f"  compiled checks: {len(checks):8d} chars, {len(names)} names, "
+          f"{checks.count('~name')} check(s), {len(rejected)} rejected")
+    print(f"  parse_names:     {parse * 1e3:8.2f} ms")
+    print(f"  name_checks:     {compile_ * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)  # the stray token would be logged on every run
+    bench_roster_compile()
@@ -0,0 +1,114 @@
+"""
+Control Spreadsheet Access for HWWBot
+Reads everything a cycle needs from the sign-up spreadsheet in one
+values.batchGet request and writes the results back in one
+values.batchUpdate, reusing the opened spreadsheet across cycles.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SPREADSHEET_NAME = 'Hidden Werewolves - Game Sign Ups (Responses)'
+
+# HWWbot!E2 is the control cell, E3 the "Last updated" line
+STATUS_RANGE = "'HWWbot'!E2:E3"
+
+# Backend row 1: player lists (A-D) and new users (E); row 2: statuses (A-D)
+BACKEND_RANGE = "'Backend'!A1:E2"
+
+# Subreddits in Backend column order
+SUBREDDITS = ["HiddenWerewolves", "HiddenWerewolvesA", "HiddenWerewolvesB", "HiddenGhosts"]
+
+
+def _cell(values, row, col):
+    """Value at 0-based (row, col) of a returned range; the API omits trailing empty cells"""
+    try:
+        return values[row][col] or None
+    except IndexError:
+        return None
+
+
+class ControlSheet:
+    """
+    The HWWbot and Backend worksheets of the control spreadsheet.
+
+    client.open() costs a Drive search plus a metadata fetch, so the
+    spreadsheet is opened once and kept; the worksheets are addressed by
+    name inside the A1 ranges, so no worksheet handles are needed. Any
+    error drops the cached spreadsheet so the next cycle opens it again.
+    """
+
+    def __init__(self, client, name=SPREADSHEET_NAME):
+        """
+        Args:
+            client: Authorized gspread client
+            name: Title of the spreadsheet
+        """
+        self.client = client
+        self.name = name
+        self._spreadsheet = None
+        self.request_count = 0  # Sheets/Drive API requests made so far
+        self.last_status = None  # control cell value from the last read()
+
+    @property
+    def spreadsheet(self):
+        if self._spreadsheet is None:
+            logger.info(f"Opening spreadsheet '{self.name}'")
+            self.request_count += 2  # Drive search + spreadsheet metadata
+            self._spreadsheet = self.client.open(self.name)
+        return self._spreadsheet
+
+    def invalidate(self):
+        """Forget the cached spreadsheet (e.g. after an API error)"""
+        self._spreadsheet = None
+
+    def read(self):
+        """
+        Fetch the control cell and the Backend settings in one request.
+
+        Returns:
+            Dict with 'status' (HWWbot!E2), 'subreddits' (list of
+            (name, status, player_list)) and 'new_users'
+        """
+        try:
+            spreadsheet = self.spreadsheet
+            self.request_count += 1
+            response = spreadsheet.values_batch_get([STATUS_RANGE, BACKEND_RANGE])
+        except Exception:
+            self.invalidate()
+            raise
+
+        status_values, backend_values = (
+            value_range.get('values', []) for value_range in response.get('valueRanges', [{}, {}])
+        )
+
+        self.last_status = _cell(status_values, 0, 0)
+        return {
+            'status': self.last_status,
+            'subreddits': [
+                (sub_name, _cell(backend_values, 1, col), _cell(backend_values, 0, col))
+                for col, sub_name in enumerate(SUBREDDITS)
+            ],
+            'new_users': _cell(backend_values, 0, 4),
+        }
+
+    def write_status(self, status, last_updated):
+        """
+        Set the control cell and the "Last updated" line in one request.
+
+        Args:
+            status: New value for HWWbot!E2 (e.g. "Done")
+            last_updated: New value for HWWbot!E3
+        """
+        body = {
+            'valueInputOption': 'USER_ENTERED',
+            'data': [{'range': STATUS_RANGE, 'values': [[status], [last_updated]]}],
+        }
+        try:
+            spreadsheet = self.spreadsheet
+            self.request_count += 1
+            spreadsheet.values_batch_update(body)
+        except Exception:
+            self.invalidate()
+            raise
@@ -2,10 +2,20 @@ import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
 import praw
+from prawcore.exceptions import Conflict, Forbidden, NotFound
 import time
 import logging
+import difflib
+import hashlib
+import html
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from automod_compiler import WIKI_MAX_BYTES, name_checks
+from control_sheet import ControlSheet
+from poll_scheduler import PollScheduler
 
 # Set up logging
 logging.basicConfig(
@@ -21,6 +31,47 @@ logger = logging.getLogger(__name__)
 # Checkpoint file for resuming
 CHECKPOINT_FILE = 'hwwbot_checkpoint.json'
 
+# Subreddit updates run concurrently, each retried with exponential backoff
+UPDATE_WORKERS = 4
+UPDATE_ATTEMPTS = 3
+RETRY_BASE_DELAY = 5  # seconds; doubles after each failed attempt
+
+# Control cell values: "Retry: A, B" re-runs only those subreddits on the
+# next cycle; after MAX_RETRY_CYCLES it becomes "Failed: A, B" and waits for a mod
+RETRY_PREFIX = "Retry: "
+FAILED_PREFIX = "Failed: "
+MAX_RETRY_CYCLES = 3
+
+# How AutoMod pages are written (HWWBOT_WIKI_MODE):
+#   blind   - write without looking (the default, as before)
+#   checked - fetch the page first, write only if it differs, and refuse if its
+#             revision isn't the one the bot last pushed ("Conflict: A" in the sheet)
+#   dry-run - fetch and log the diff, never write ("Dry run: A" in the sheet)
+# "Force update.." in the control cell overwrites pages edited by hand.
+WIKI_MODE = os.environ.get('HWWBOT_WIKI_MODE', 'blind').lower()
+WIKI_MODES = ('checked', 'dry-run', 'blind')
+FORCE_STATUS = "Force update..."
+CONFLICT_PREFIX = "Conflict: "
+DRY_RUN_PREFIX = "Dry run: "
+MAX_DIFF_LINES = 60
+
+# Results of syncing one subreddit
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+CONFLICT = 'conflict'
+PREVIEWED = 'previewed'
+FAILED = 'failed'
+
+# Control cell polling: fast while the sheet is in use, backing off to the
+# max while idle; `touch check_now` in the data dir (or SIGUSR1) polls at once
+POLL_MIN_INTERVAL = int(os.environ.get('HWWBOT_POLL_MIN_INTERVAL', '10'))
+POLL_MAX_INTERVAL = int(os.environ.get('HWWBOT_POLL_MAX_INTERVAL', '300'))
+CHECK_NOW_FILE = 'check_now'
+
+# PRAW instances are not thread-safe, so each worker gets its own
+_thread_state = threading.local()
+_executor = ThreadPoolExecutor(max_workers=UPDATE_WORKERS, thread_name_prefix='automod')
+
 def load_checkpoint():
     """Load checkpoint data if it exists"""
     if os.path.exists(CHECKPOINT_FILE):
@@ -29,7 +80,7 @@ def load_checkpoint():
                 return json.load(f)
         except Exception as e:
             logger.warning(f"Could not load checkpoint: {e}")
-    return {'last_run': None, 'run_count': 0}
+    return {'last_run': None, 'run_count': 0, 'automod_hashes': {}}
 
 def save_checkpoint(data):
     """Save checkpoint data"""
@@ -40,10 +91,9 @@ def save_checkpoint(data):
     except Exception as e:
         logger.error(f"Could not save checkpoint: {e}")
 
-def bot_login():
+def create_reddit():
     """
-    Initialize Reddit connection with proper OAuth2 authentication.
-    Uses environment variables for credentials.
+    Create a Reddit instance from the environment credentials (no requests made).
     """
     # Get credentials from environment variables
     client_id = os.environ.get('HWWBOT_CLIENT_ID')
@@ -58,15 +108,29 @@ def bot_login():
         logger.error("Required: REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USERNAME, REDDIT_PASSWORD")
         raise ValueError("Missing Reddit credentials")
     
+    return praw.Reddit(
+        client_id=client_id,
+        client_secret=client_secret,
+        username=username,
+        password=password,
+        user_agent=user_agent
+    )
+
+def thread_reddit():
+    """Reddit instance belonging to the current worker thread"""
+    reddit = getattr(_thread_state, 'reddit', None)
+    if reddit is None:
+        reddit = _thread_state.reddit = create_reddit()
+    return reddit
+
+def bot_login():
+    """
+    Initialize Reddit connection with proper OAuth2 authentication.
+    Uses environment variables for credentials.
+    """
     try:
-        logger.info(f"Attempting to log in to Reddit as {username}...")
-        reddit = praw.Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
-            username=username,
-            password=password,
-            user_agent=user_agent
-        )
+        logger.info(f"Attempting to log in to Reddit as {os.environ.get('HWWBOT_USERNAME')}...")
+        reddit = create_reddit()
         
         # Verify authentication
         user = reddit.user.me()
@@ -101,63 +165,189 @@ def init_google_sheets():
         logger.error(f"Failed to connect to Google Sheets: {e}")
         raise
 
-def update_automod_config(reddit, subreddit_name, automod_config):
+def config_hash(automod_config):
+    """Fingerprint of a rendered AutoMod config, stored per subreddit in the checkpoint"""
+    return hashlib.sha256(normalize_config(automod_config).encode('utf-8')).hexdigest()
+
+def normalize_config(text):
+    """Page text as compared by the bot (Reddit returns &, < and > escaped and may add \\r)"""
+    return html.unescape(text or '').replace('\r\n', '\n').strip()
+
+def config_diff(subreddit_name, current, rendered):
+    """Unified diff from the live page to the rendered config, shortened for the log"""
+    lines = list(difflib.unified_diff(
+        normalize_config(current).splitlines(),
+        normalize_config(rendered).splitlines(),
+        fromfile=f"r/{subreddit_name} (live)",
+        tofile=f"r/{subreddit_name} (rendered)",
+        lineterm=''
+    ))
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [f"... {len(lines) - MAX_DIFF_LINES} more line(s)"]
+    return '\n'.join(lines)
+
+def pushed_revision(page, username, search=5):
+    """
+    ID of the newest revision of a page written by the bot, read back after an edit
+    
+    Reddit's wiki edit response is empty, so the revision the edit created
+    has to be looked up. Taking the bot's own newest revision rather than
+    the newest one means a hand edit landing right after the push still
+    shows up as a moved revision on the next run.
+    
+    Args:
+        page: PRAW WikiPage that was just edited
+        username: The bot's Reddit username
+        search: Revisions to look through
+    
+    Returns:
+        Revision ID, or None if it couldn't be found
+    """
+    try:
+        for revision in page.revisions(limit=search):
+            author = revision['author']
+            if author is not None and author.name.lower() == username.lower():
+                return revision['id']
+    except Exception as e:
+        logger.warning(f"Could not read back the r/{page.subreddit} AutoMod revision: {e}")
+    return None
+
+def sync_automod_config(page, subreddit_name, automod_config, last_revision=None,
+                        mode='blind', force=False):
+    """
+    Bring one AutoMod page in line with the rendered config (a single attempt)
+    
+    Args:
+        page: PRAW WikiPage for config/AutoModerator
+        subreddit_name: Name of the subreddit
+        automod_config: Rendered AutoModerator configuration
+        last_revision: ID of the revision the bot last pushed there, if known
+        mode: 'checked', 'dry-run' or 'blind' (see WIKI_MODE)
+        force: Overwrite the page even if it was edited by hand
+    
+    Returns:
+        (result, revision): UPDATED, UNCHANGED, CONFLICT or PREVIEWED, and
+        for UNCHANGED the ID of the page revision that already matches (None
+        otherwise, and always in blind mode)
+    """
+    if mode == 'blind':
+        page.edit(content=automod_config)
+        return UPDATED, None
+    
+    # One fetch gives both the content and the revision it belongs to
+    current = page.content_md
+    revision = page.revision_id
+    if normalize_config(current) == normalize_config(automod_config):
+        logger.info(f"r/{subreddit_name} page already matches the rendered config")
+        return UNCHANGED, revision
+    
+    diff = config_diff(subreddit_name, current, automod_config)
+    edited_by_hand = last_revision is not None and revision != last_revision
+    
+    if mode == 'dry-run':
+        note = " (page was edited since the last push)" if edited_by_hand else ""
+        logger.info(f"[dry run] r/{subreddit_name} would change{note}:\n{diff}")
+        return PREVIEWED, None
+    
+    if edited_by_hand and not force:
+        logger.error(
+            f"r/{subreddit_name} AutoMod page was edited by u/{page.revision_by} since the bot's last push; "
+            f"not overwriting it. Set the control cell to '{FORCE_STATUS}' to overwrite. Pending change:\n{diff}"
+        )
+        return CONFLICT, None
+    
+    logger.info(f"Updating r/{subreddit_name}:\n{diff}")
+    # previous= makes Reddit reject the edit if the page moved after the fetch
+    page.edit(content=automod_config, previous=revision)
+    return UPDATED, None
+
+def update_automod_config(reddit, subreddit_name, automod_config, last_revision=None,
+                          mode='blind', force=False, attempts=UPDATE_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
     """
     Update AutoModerator configuration for a subreddit
     
+    Transient errors are retried with exponential backoff; missing wiki
+    permissions (403) or a missing subreddit (404) fail immediately.
+    
     Args:
         reddit: PRAW Reddit instance
         subreddit_name: Name of the subreddit
         automod_config: AutoModerator configuration string
+        last_revision: ID of the revision the bot last pushed there, if known
+        mode: 'checked', 'dry-run' or 'blind' (see WIKI_MODE)
+        force: Overwrite the page even if it was edited by hand
+        attempts: Total attempts before giving up
+        base_delay: Seconds to wait after the first failure (doubles each time)
+    
+    Returns:
+        (result, revision): UPDATED, UNCHANGED, CONFLICT, PREVIEWED or FAILED,
+        and the ID of the page revision now matching the config if known
+        (checked and dry-run modes only)
     """
-    try:
-        logger.info(f"Updating AutoMod config for r/{subreddit_name}")
-        page = reddit.subreddit(subreddit_name).wiki['config/AutoModerator']
-        page.edit(content=automod_config)
-        logger.info(f"Successfully updated r/{subreddit_name}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to update r/{subreddit_name}: {e}")
-        return False
+    for attempt in range(1, attempts + 1):
+        try:
+            logger.info(f"Updating AutoMod config for r/{subreddit_name}")
+            page = reddit.subreddit(subreddit_name).wiki['config/AutoModerator']
+            result, revision = sync_automod_config(page, subreddit_name, automod_config, last_revision, mode, force)
+            if result == UPDATED:
+                logger.info(f"Successfully updated r/{subreddit_name}")
+                if mode != 'blind':
+                    revision = pushed_revision(page, reddit.config.username)
+            return result, revision
+        except Conflict as e:
+            logger.error(f"r/{subreddit_name} AutoMod page changed while updating it: {e}")
+            return CONFLICT, None
+        except (Forbidden, NotFound) as e:
+            logger.error(f"Failed to update r/{subreddit_name}: {e} (not retrying)")
+            return FAILED, None
+        except Exception as e:
+            if attempt == attempts:
+                logger.error(f"Failed to update r/{subreddit_name} after {attempts} attempts: {e}")
+                return FAILED, None
+            delay = base_delay * (2 ** (attempt - 1))
+            logger.warning(f"Failed to update r/{subreddit_name} (attempt {attempt}/{attempts}): {e}; retrying in {delay}s")
+            time.sleep(delay)
+
+def _update_in_worker(*args, **kwargs):
+    """update_automod_config() with the worker thread's own Reddit instance"""
+    return update_automod_config(thread_reddit(), *args, **kwargs)
 
-def run_bot(reddit, client, checkpoint):
+def run_bot(sheet, checkpoint):
     """
     Main bot logic - checks spreadsheet and updates subreddit AutoMod configs
+    
+    The control cell is only set to "Done" when every subreddit was updated.
+    Otherwise the failed subreddits are written back as "Retry: A, B" and
+    only those are updated on the next cycle. Pages edited by hand are left
+    alone and reported as "Conflict: A, B" (checked mode); a dry run reports
+    "Dry run: A, B would change".
+    
+    Args:
+        sheet: ControlSheet for the sign-up spreadsheet
+        checkpoint: Checkpoint dict
     """
     try:
-        # Get the control sheet
+        # Control cell and Backend settings come back in a single request
         logger.info("Checking spreadsheet for updates...")
-        sheet_two = client.open('Hidden Werewolves - Game Sign Ups (Responses)').worksheet("HWWbot")
-        status = sheet_two.cell(2, 5).value
+        config = sheet.read()
+        status = config['status']
         
-        if status != "Updating...":
+        force = status == FORCE_STATUS
+        if status == "Updating..." or force:
+            logger.info(f"Status is '{status}', proceeding with update")
+            retry_only = None
+            checkpoint['retry_cycles'] = 0
+            checkpoint['conflicts'] = []
+        elif status and status.startswith(RETRY_PREFIX):
+            retry_only = {name.strip() for name in status[len(RETRY_PREFIX):].split(',') if name.strip()}
+            logger.info(f"Retrying failed subreddits: {', '.join(sorted(retry_only))}")
+        else:
             logger.info(f"Status is '{status}', skipping this cycle")
             return checkpoint
         
-        logger.info("Status is 'Updating...', proceeding with update")
-        
-        # Get the backend sheet with player lists
-        sheet_one = client.open('Hidden Werewolves - Game Sign Ups (Responses)').worksheet("Backend")
-        
-        # Fetch all necessary data
-        logger.info("Fetching configuration from spreadsheet...")
-        status1 = sheet_one.cell(2, 1).value
-        status2 = sheet_one.cell(2, 2).value
-        status3 = sheet_one.cell(2, 3).value
-        status4 = sheet_one.cell(2, 4).value  # HiddenGhosts status
-        list1 = sheet_one.cell(1, 1).value
-        list2 = sheet_one.cell(1, 2).value
-        list3 = sheet_one.cell(1, 3).value
-        list4 = sheet_one.cell(1, 4).value  # HiddenGhosts player list
-        new_users = sheet_one.cell(1, 5).value  # Moved to column 5
-        
-        # Subreddit names
-        subreddits = [
-            ("HiddenWerewolves", status1, list1),
-            ("HiddenWerewolvesA", status2, list2),
-            ("HiddenWerewolvesB", status3, list3),
-            ("HiddenGhosts", status4, list4)
-        ]
+        # (subreddit, status, player list) in Backend column order
+        subreddits = [sub for sub in config['subreddits'] if retry_only is None or sub[0] in retry_only]
+        new_users = config['new_users']
         
         # Common AutoMod components
         flair = '"Meta"'
@@ -177,8 +367,16 @@ comment: |
         
         off_comment = '''comment: "This comment was removed as you currently do not meet the account requirements to participate in /r/HiddenWerewolves. Please see [this thread](https://redd.it/8t428a) for details. **If a game is in-progress and you believe your comment was removed in error, please message the game hosts directly.**  If there is no game in-progress, please message the mods via modmail."'''
         
-        # Update each subreddit
-        results = []
+        # Update each subreddit whose config changed since it was last pushed
+        automod_hashes = checkpoint.setdefault('automod_hashes', {})
+        automod_revisions = checkpoint.setdefault('automod_revisions', {})
+        conflicts = set(checkpoint.get('conflicts', []))
+        jobs = []
+        skipped = []
+        failed = []
+        previewed = []
+        updated = []
+        new_user_checks = name_checks(new_users, label="new users list")
         logger.info(f"Updating {len(subreddits)} subreddits...")
         for sub_name, status, player_list in subreddits:
             logger.info(f"Processing r/{sub_name} (Status: {status})")
@@ -188,7 +386,7 @@ comment: |
 type: any
 is_edited: false
 author:
-    ~name: {player_list}
+{name_checks(player_list, label=f"r/{sub_name} player list")}
 parent_submission:
     ~flair_css_class: [{flair}]
 action: remove
@@ -199,35 +397,88 @@ type: any
 is_edited: false
 author:
     account_age: < 1 month
-    ~name: {new_users}
+{new_user_checks}
 parent_submission:
     ~flair_css_class: [{flair}]
 action: remove
 {off_comment}"""
             
-            # Update the subreddit
-            success = update_automod_config(reddit, sub_name, automod)
-            results.append((sub_name, success))
+            size = len(automod.encode('utf-8'))
+            if size > WIKI_MAX_BYTES:
+                logger.error(f"r/{sub_name} config is {size} bytes, over the {WIKI_MAX_BYTES} byte wiki limit")
+                failed.append(sub_name)
+                continue
+            
+            fingerprint = config_hash(automod)
+            # A forced run re-checks every page, since a hand edit doesn't change the hash
+            if automod_hashes.get(sub_name) == fingerprint and not force:
+                logger.info(f"r/{sub_name} config unchanged, skipping wiki edit")
+                skipped.append(sub_name)
+                continue
             
-            # Small delay between updates
-            time.sleep(1)
+            jobs.append((sub_name, automod, fingerprint))
+        
+        # Push the changed configs concurrently
+        futures = [
+            (sub_name, fingerprint, _executor.submit(
+                _update_in_worker, sub_name, automod, automod_revisions.get(sub_name),
+                mode=WIKI_MODE, force=force
+            ))
+            for sub_name, automod, fingerprint in jobs
+        ]
+        for sub_name, fingerprint, future in futures:
+            result, revision = future.result()
+            if result in (UPDATED, UNCHANGED):
+                automod_hashes[sub_name] = fingerprint
+                # Without a known revision the next checked run can't spot hand edits
+                if revision:
+                    automod_revisions[sub_name] = revision
+                else:
+                    automod_revisions.pop(sub_name, None)
+                updated.append(sub_name)
+                conflicts.discard(sub_name)
+            elif result == CONFLICT:
+                conflicts.add(sub_name)
+            elif result == PREVIEWED:
+                previewed.append(sub_name)
+            else:
+                failed.append(sub_name)
+        checkpoint['conflicts'] = sorted(conflicts)
         
         # Update checkpoint
-        checkpoint['last_run'] = datetime.now().isoformat()
         checkpoint['run_count'] += 1
+        if failed:
+            checkpoint['retry_cycles'] = checkpoint.get('retry_cycles', 0) + 1
+        else:
+            checkpoint['retry_cycles'] = 0
+            if not conflicts and not previewed:
+                checkpoint['last_run'] = datetime.now().isoformat()
         save_checkpoint(checkpoint)
         
         # Update timestamp in spreadsheet
         now = datetime.now() + timedelta(seconds=1300)
         time_now = "Last updated: " + now.strftime("%d/%m/%Y %H:%M:%S") + " EDT"
-        logger.info(f"Update complete: {time_now}")
         
-        sheet_two.update_cell(3, 5, time_now)
-        sheet_two.update_cell(2, 5, "Done")
+        if failed and checkpoint['retry_cycles'] <= MAX_RETRY_CYCLES:
+            logger.warning(f"Update incomplete, will retry: {', '.join(failed)}")
+            sheet.write_status(RETRY_PREFIX + ", ".join(failed), time_now)
+        elif failed:
+            logger.error(f"Giving up on {', '.join(failed)} after {MAX_RETRY_CYCLES} retry cycles")
+            sheet.write_status(FAILED_PREFIX + ", ".join(failed), time_now)
+        elif conflicts:
+            logger.warning(f"Not overwritten (edited by hand): {', '.join(sorted(conflicts))}")
+            sheet.write_status(CONFLICT_PREFIX + ", ".join(sorted(conflicts)), time_now)
+        elif previewed:
+            sheet.write_status(DRY_RUN_PREFIX + ", ".join(previewed) + " would change", time_now)
+        else:
+            logger.info(f"Update complete: {time_now}")
+            sheet.write_status("Done", time_now)
         
         # Log results
-        successful = sum(1 for _, success in results if success)
-        logger.info(f"Updated {successful}/{len(results)} subreddits successfully")
+        attempted = len(subreddits) - len(skipped)
+        logger.info(f"Updated {len(updated)}/{attempted} subreddits successfully")
+        if skipped:
+            logger.info(f"Skipped {len(skipped)} unchanged: {', '.join('r/' + name for name in skipped)}")
         
         return checkpoint
         
@@ -247,23 +498,37 @@ def main():
         logger.info(f"Last successful run: {checkpoint['last_run']}")
         logger.info(f"Total runs: {checkpoint['run_count']}")
     
+    if WIKI_MODE not in WIKI_MODES:
+        logger.critical(f"HWWBOT_WIKI_MODE must be one of {', '.join(WIKI_MODES)}, not '{WIKI_MODE}'")
+        return
+    logger.info(f"Wiki mode: {WIKI_MODE}")
+    
     # Initialize connections
     try:
-        reddit = bot_login()
-        client = init_google_sheets()
+        bot_login()
+        sheet = ControlSheet(init_google_sheets())
     except Exception as e:
         logger.critical(f"Failed to initialize connections: {e}")
         return
     
+    scheduler = PollScheduler(
+        min_interval=POLL_MIN_INTERVAL,
+        max_interval=POLL_MAX_INTERVAL,
+        trigger_file=CHECK_NOW_FILE
+    )
+    scheduler.install_signal_handler()
+    
     logger.info("Bot initialized successfully. Starting main loop...")
     consecutive_errors = 0
     max_consecutive_errors = 5
     
     while True:
         try:
-            checkpoint = run_bot(reddit, client, checkpoint)
+            requests_before = sheet.request_count
+            checkpoint = run_bot(sheet, checkpoint)
             consecutive_errors = 0  # Reset error counter on success
-            time.sleep(10)
+            scheduler.record(sheet.last_status, sheet.request_count - requests_before)
+            scheduler.wait()
             
         except KeyboardInterrupt:
             logger.info("Received shutdown signal. Saving checkpoint and exiting...")
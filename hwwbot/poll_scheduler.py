@@ -0,0 +1,150 @@
+"""
+Adaptive Polling for HWWBot
+Decides how long to wait before the next look at the control cell: fast
+while mods are working on the sheet, slower and slower while it sits idle,
+immediately when asked to, and never faster than the Sheets quota allows.
+"""
+
+import logging
+import os
+import signal
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Sheets API: 60 read requests per minute per user
+SHEETS_QUOTA_PER_MINUTE = 60
+
+
+def format_interval(seconds):
+    """30 -> '30s', 300 -> '5m'"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    return f"{seconds / 60:.0f}m"
+
+
+class PollScheduler:
+    """
+    Polling interval that backs off while the control cell is idle.
+
+    Any change of the control cell value (a mod setting "Updating...", the
+    bot writing "Done", a mod resetting to "Ready") counts as activity: the
+    interval drops back to min_interval and stays there for active_window
+    seconds. After that each idle poll multiplies it by backoff, up to
+    max_interval.
+
+    A poll can be forced by creating trigger_file (it is removed when seen)
+    or by sending SIGUSR1, e.g. docker kill -s USR1 hwwbot.
+    """
+
+    def __init__(self, min_interval=10, max_interval=300, backoff=1.5, active_window=900,
+                 trigger_file='check_now', quota_per_minute=SHEETS_QUOTA_PER_MINUTE):
+        """
+        Args:
+            min_interval: Seconds between polls while active
+            max_interval: Longest wait between polls while idle
+            backoff: Factor the interval grows by per idle poll
+            active_window: Seconds of fast polling after the last activity
+            trigger_file: Path whose existence forces an immediate poll
+            quota_per_minute: Sheets requests allowed in any 60 seconds
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.active_window = active_window
+        self.trigger_file = trigger_file
+        self.quota_per_minute = quota_per_minute
+
+        self.interval = min_interval
+        self.last_status = None
+        self.last_activity = time.monotonic()
+        self.recent_requests = deque()  # monotonic time of each request in the last minute
+        self.total_requests = 0
+        self._signalled = False
+
+    def install_signal_handler(self):
+        """Poll immediately on SIGUSR1"""
+        signal.signal(signal.SIGUSR1, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        self._signalled = True
+
+    def record(self, status, requests):
+        """
+        Account for one poll and adjust the interval.
+
+        Args:
+            status: Control cell value seen by the poll
+            requests: Sheets API requests the poll (and any update) made
+        """
+        now = time.monotonic()
+        self.recent_requests.extend([now] * requests)
+        self.total_requests += requests
+
+        if status != self.last_status:
+            if self.last_status is not None:
+                logger.debug(f"Control cell changed to '{status}'")
+            self.last_status = status
+            self.last_activity = now
+
+        previous = self.interval
+        if now - self.last_activity < self.active_window:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        if format_interval(self.interval) != format_interval(previous):
+            logger.info(
+                f"Polling every {format_interval(self.interval)} "
+                f"({self.quota_used()}/{self.quota_per_minute} Sheets requests in the last minute, "
+                f"{self.total_requests} since start)"
+            )
+
+    def quota_used(self):
+        """Sheets requests made in the last 60 seconds"""
+        cutoff = time.monotonic() - 60
+        while self.recent_requests and self.recent_requests[0] <= cutoff:
+            self.recent_requests.popleft()
+        return len(self.recent_requests)
+
+    def _quota_delay(self):
+        """Seconds until another request fits in the per-minute budget"""
+        if self.quota_used() < self.quota_per_minute:
+            return 0
+        return self.recent_requests[0] + 60 - time.monotonic()
+
+    def _triggered(self):
+        if self._signalled:
+            self._signalled = False
+            logger.info("Check requested by signal")
+            return True
+        if self.trigger_file and os.path.exists(self.trigger_file):
+            try:
+                os.remove(self.trigger_file)
+            except OSError as e:
+                logger.warning(f"Could not remove {self.trigger_file}: {e}")
+            logger.info(f"Check requested by {self.trigger_file}")
+            return True
+        return False
+
+    def wait(self):
+        """
+        Sleep until the next poll is due or one is requested.
+
+        A requested poll resets the interval to min_interval, since it
+        usually means a mod is about to change something. Either way the
+        wait is stretched if the quota for the last minute is used up.
+        """
+        deadline = time.monotonic() + self.interval
+        while time.monotonic() < deadline:
+            if self._triggered():
+                self.interval = self.min_interval
+                self.last_activity = time.monotonic()
+                break
+            time.sleep(min(1, max(0, deadline - time.monotonic())))
+
+        delay = self._quota_delay()
+        if delay > 0:
+            logger.warning(f"Sheets quota budget used up, waiting {delay:.0f}s")
+            time.sleep(delay)
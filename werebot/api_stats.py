@@ -0,0 +1,171 @@
+"""
+Reddit API Call Accounting for Were-Bot
+A prawcore Requestor that records every HTTP request PRAW makes, with its
+latency, the endpoint and the part of the bot that caused it, so each
+polling cycle can report where the request budget went.
+"""
+
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import prawcore
+
+logger = logging.getLogger(__name__)
+
+# Path segments followed by a variable part (subreddit, user, submission ID)
+VARIABLE_AFTER = {'r', 'u', 'user'}
+
+
+def endpoint_name(method, url):
+    """
+    Group a request URL into an endpoint, e.g. "GET /r/*/comments".
+
+    Subreddit names, usernames and everything after a submission ID are
+    collapsed so one endpoint is one line in the summary.
+    """
+    parts = urlsplit(url).path.strip('/').split('/')
+    for i in range(1, len(parts)):
+        if parts[i - 1] == 'comments':
+            parts = parts[:i] + ['*']
+            break
+        if parts[i - 1] in VARIABLE_AFTER:
+            parts[i] = '*'
+    return f"{method.upper()} /{'/'.join(parts)}"
+
+
+class ApiStats:
+    """
+    Request counters for the current cycle and since the bot started.
+
+    Requests are attributed to the innermost active scope (see scope() and
+    attributed()); requests outside any scope count as 'other'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.cycle = self._empty()
+        self.totals = self._empty()
+
+    @staticmethod
+    def _empty():
+        return {
+            'requests': 0,
+            'seconds': 0.0,
+            'by_method': Counter(),
+            'by_scope': Counter(),
+            'by_endpoint': Counter(),
+            'seconds_by_scope': Counter(),
+        }
+
+    @property
+    def current_scope(self):
+        return getattr(self._local, 'scope', None) or 'other'
+
+    @contextmanager
+    def scope(self, name):
+        """Attribute requests made inside the block to `name`"""
+        previous = getattr(self._local, 'scope', None)
+        self._local.scope = name
+        try:
+            yield
+        finally:
+            self._local.scope = previous
+
+    def attributed(self, name=None):
+        """Decorator: attribute requests made by a function to its name (or `name`)"""
+        def decorator(func):
+            scope_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.scope(scope_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, method, url, elapsed):
+        scope = self.current_scope
+        endpoint = endpoint_name(method, url)
+        with self._lock:
+            for counters in (self.cycle, self.totals):
+                counters['requests'] += 1
+                counters['seconds'] += elapsed
+                counters['by_method'][method.upper()] += 1
+                counters['by_scope'][scope] += 1
+                counters['by_endpoint'][endpoint] += 1
+                counters['seconds_by_scope'][scope] += elapsed
+
+    def count(self, method=None):
+        """Requests made so far this cycle (optionally only one HTTP method)"""
+        with self._lock:
+            if method:
+                return self.cycle['by_method'][method.upper()]
+            return self.cycle['requests']
+
+    def end_cycle(self):
+        """
+        Log a one-line summary of this cycle and start a new one.
+
+        The line is INFO when the cycle spent more than the single listing
+        request of an idle cycle, DEBUG otherwise.
+
+        Returns:
+            Number of requests made during the cycle
+        """
+        with self._lock:
+            cycle, self.cycle = self.cycle, self._empty()
+
+        scopes = " ".join(f"{scope}={count}" for scope, count in cycle['by_scope'].most_common())
+        endpoints = " ".join(f"{endpoint}={count}" for endpoint, count in cycle['by_endpoint'].most_common())
+        summary = (f"API: {cycle['requests']} request(s), {cycle['seconds']:.2f}s"
+                   + (f" | {scopes} | {endpoints}" if cycle['requests'] else ""))
+
+        logger.log(logging.INFO if cycle['requests'] > 1 else logging.DEBUG, summary)
+        return cycle['requests']
+
+    def load_totals(self, data):
+        """Continue the totals saved in the checkpoint by totals_dict()"""
+        if not data:
+            return
+        with self._lock:
+            self.totals['requests'] = data.get('requests', 0)
+            self.totals['seconds'] = data.get('seconds', 0.0)
+            for key in ('by_method', 'by_scope', 'by_endpoint', 'seconds_by_scope'):
+                self.totals[key] = Counter(data.get(key, {}))
+
+    def totals_dict(self):
+        """JSON-serializable totals for the checkpoint"""
+        with self._lock:
+            return {
+                'requests': self.totals['requests'],
+                'seconds': round(self.totals['seconds'], 3),
+                'by_method': dict(self.totals['by_method']),
+                'by_scope': dict(self.totals['by_scope']),
+                'by_endpoint': dict(self.totals['by_endpoint']),
+                'seconds_by_scope': {k: round(v, 3) for k, v in self.totals['seconds_by_scope'].items()},
+            }
+
+
+# Shared by the requestor and the bot
+stats = ApiStats()
+
+
+class CountingRequestor(prawcore.Requestor):
+    """
+    Requestor that records each request in `stats`.
+
+    Pass as praw.Reddit(requestor_class=CountingRequestor).
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            stats.record(method, url, time.monotonic() - start)
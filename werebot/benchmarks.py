@@ -0,0 +1,205 @@
+"""
+Microbenchmarks for Were-Bot hot paths.
+
+Usage:
+    python benchmarks.py
+"""
+
+import random
+import re
+import string
+import timeit
+from datetime import datetime
+
+from command_parser import parse_comment
+from fuzzy_index import FuzzyIndex, edit_distance, max_distance
+from nickname_matcher import NicknameMatcher
+from vote_tally import ThreadTally
+
+
+def _legacy_command_scan(body):
+    """The substring chain run_bot used before command_parser (for comparison)"""
+    upper = body.upper()
+    found = []
+    if "WEREBOT K9" in upper or "WERE-BOT K9" in upper or "WEREBOT! K9" in upper or "WERE-BOT! K9" in upper:
+        found.append('K9')
+    if "WEREBOT VOTE" in upper or "WERE-BOT VOTE" in upper or "WEREBOT! VOTE" in upper or "WERE-BOT! VOTE" in upper:
+        found.append('VOTE')
+    if "WEREBOT UNVOTE" in upper or "WERE-BOT UNVOTE" in upper or "WEREBOT! UNVOTE" in upper or "WERE-BOT! UNVOTE" in upper:
+        found.append('UNVOTE')
+    if "WEREBOT TALLY" in upper or "WERE-BOT TALLY" in upper or "WEREBOT! TALLY" in upper or "WERE-BOT! TALLY" in upper:
+        found.append('TALLY')
+    if "WEREBOT RANDOM" in upper or "WERE-BOT RANDOM" in upper or "WEREBOT! RANDOM" in upper or "WERE-BOT! RANDOM" in upper:
+        found.append('RANDOM')
+    if "WEREBOT SNOOZE" in upper or "WERE-BOT SNOOZE" in upper:
+        found.append('SNOOZE')
+    if "WEREBOT" in upper or "WERE-BOT" in upper:
+        if not any(word in upper for word in ("K9", "VOTE", "UNVOTE", "TALLY", "RANDOM", "SNOOZE", "SUBSCRIBE", "UNSUBSCRIBE")):
+            found.append('TAG')
+    if "WEREBOT!UNSUBSCRIBE" in upper or "WERE-BOT!UNSUBSCRIBE" in upper:
+        found.append('UNSUBSCRIBE')
+    if "WEREBOT!SUBSCRIBE" in upper or "WERE-BOT!SUBSCRIBE" in upper:
+        found.append('SUBSCRIBE')
+    if "I HATE FRRRRK" in upper:
+        found.append('EGG_FRRRRK')
+    if "FUCK WEREBOT" in upper or "FUCK WERE-BOT" in upper:
+        found.append('EGG_RUDE')
+    if "THANKS WEREBOT" in upper or "THANKS WERE-BOT" in upper or "THANK YOU WEREBOT" in upper or "THANK YOU WERE-BOT" in upper:
+        found.append('EGG_THANKS')
+    if "GOOD BOT" in upper and ("WEREBOT" in upper or "WERE-BOT" in upper):
+        found.append('EGG_GOOD_BOT')
+    return found
+
+
+def _legacy_resolve_mentions(text, nickname_map):
+    """NicknameMapper.resolve_mentions before NicknameMatcher (for comparison)"""
+    def replace_nickname(match):
+        datetime.now()  # the cache check get_username ran for every word
+        username = nickname_map.get(match.group(1).lower())
+        if username:
+            return f"/u/{username}"
+        return match.group(0)
+
+    return re.sub(r'\b[@#]?([A-Za-z0-9_-]+)\b', replace_nickname, text)
+
+
+def _synthetic_comments(count=2000, seed=42):
+    """Day-phase style comments: mostly chatter, some commands and tags"""
+    rng = random.Random(seed)
+    words = ["wolf", "town", "vote", "check", "claim", "suspicious", "I", "think", "the", "seer", "is", "lying"]
+    templates = [
+        "{chatter}",
+        "{chatter}",
+        "{chatter}",
+        "{chatter}",
+        "{chatter}",
+        "{chatter}",
+        "{chatter}\n\nWEREBOT VOTE /u/Player{n}",
+        "WEREBOT TALLY",
+        "{chatter} WEREBOT /u/a{n} /u/b{n} /u/c{n} /u/d{n}",
+        "WERE-BOT! RANDOM a | b | c",
+        "thanks werebot! {chatter}",
+    ]
+    comments = []
+    for _ in range(count):
+        chatter = " ".join(rng.choice(words) for _ in range(rng.randint(20, 200)))
+        template = rng.choice(templates)
+        comments.append(template.format(chatter=chatter, n=rng.randint(1, 99)))
+    return comments
+
+
+def bench_command_parsing(number=5):
+    comments = _synthetic_comments()
+
+    legacy = timeit.timeit(lambda: [_legacy_command_scan(c) for c in comments], number=number)
+    parsed = timeit.timeit(lambda: [parse_comment(c) for c in comments], number=number)
+
+    per_comment = 1e6 / (len(comments) * number)
+    print(f"Command parsing ({len(comments)} comments x {number}):")
+    print(f"  legacy substring chain: {legacy * per_comment:8.2f} us/comment")
+    print(f"  command_parser:         {parsed * per_comment:8.2f} us/comment")
+
+
+def bench_vote_tally(voters=200, events=2000, tally_every=5, seed=42):
+    """A VOTE/UNVOTE stream with a TALLY after every few events"""
+    rng = random.Random(seed)
+    targets = [f"Player{i}" for i in range(30)]
+    stream = [(f"VOTER{rng.randrange(voters)}", rng.choice(targets) if rng.random() < 0.9 else None)
+              for _ in range(events)]
+
+    def rebuild():
+        votes = {}
+        for i, (voter, target) in enumerate(stream):
+            if target:
+                votes[voter] = {'target': target, 'permalink': '/r/x/comments/abc/t/def/'}
+            else:
+                votes.pop(voter, None)
+            if i % tally_every == 0 and votes:
+                ThreadTally.from_votes(votes).markdown()
+
+    def incremental():
+        tally = ThreadTally()
+        for i, (voter, target) in enumerate(stream):
+            if target:
+                tally.set_vote(voter, target, '/r/x/comments/abc/t/def/')
+            else:
+                tally.remove_vote(voter)
+            if i % tally_every == 0 and tally:
+                tally.markdown()
+
+    rebuilt = timeit.timeit(rebuild, number=1)
+    updated = timeit.timeit(incremental, number=1)
+
+    print(f"Vote tally ({events} VOTE/UNVOTE events, TALLY every {tally_every}):")
+    print(f"  rebuild per TALLY:        {rebuilt * 1e3:8.2f} ms")
+    print(f"  incremental ThreadTally:  {updated * 1e3:8.2f} ms")
+
+
+def bench_nickname_resolution(nicknames=300, number=20, seed=42):
+    """A long day-phase post against a sheet-sized nickname map"""
+    rng = random.Random(seed)
+    nickname_map = {}
+    for i in range(nicknames):
+        nickname = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        nickname_map[nickname] = f"User_{i}"
+
+    names = list(nickname_map)
+    chatter = ["I", "think", "the", "seer", "is", "lying", "and", "wolf", "vote", "town", "claim", "-", "@"]
+    post = " ".join(rng.choice(names) if rng.random() < 0.05 else rng.choice(chatter) for _ in range(2000))
+
+    matcher = NicknameMatcher(nickname_map)
+    assert matcher.resolve(post).replace("@/u/", "/u/") == _legacy_resolve_mentions(post, nickname_map).replace("@/u/", "/u/")
+
+    legacy = timeit.timeit(lambda: _legacy_resolve_mentions(post, nickname_map), number=number)
+    compiled = timeit.timeit(lambda: matcher.resolve(post), number=number)
+
+    print(f"Nickname resolution ({nicknames} nicknames, 2000-word post x {number}):")
+    print(f"  re.sub + per-word lookup: {legacy / number * 1e3:8.2f} ms/post")
+    print(f"  NicknameMatcher:          {compiled / number * 1e3:8.2f} ms/post")
+    build = timeit.timeit(lambda: NicknameMatcher(nickname_map), number=number)
+    print(f"  (compiling the matcher:   {build / number * 1e3:8.2f} ms per load)")
+
+
+def bench_fuzzy_lookup(names=600, lookups=2000, seed=42):
+    """Misspelled VOTE targets against nicknames + usernames"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits
+    name_map = {}
+    while len(name_map) < names:
+        name = "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 16)))
+        name_map[name] = name.capitalize()
+
+    def typo(name):
+        chars = list(name)
+        position = rng.randrange(len(chars))
+        chars[position] = rng.choice(alphabet)
+        return "".join(chars)
+
+    queries = [typo(rng.choice(list(name_map))) for _ in range(lookups)]
+
+    def linear(query):
+        limit = max_distance(len(query))
+        return min(name_map, key=lambda name: edit_distance(query, name, limit))
+
+    build = timeit.timeit(lambda: FuzzyIndex(name_map), number=1)
+    index = FuzzyIndex(name_map)
+
+    changed = dict(list(name_map.items())[10:])
+    changed.update({f"newplayer{i}": f"NewPlayer{i}" for i in range(10)})
+    incremental = timeit.timeit(lambda: (index.update(changed), index.update(name_map)), number=1) / 2
+
+    indexed = timeit.timeit(lambda: [index.lookup(q) for q in queries], number=1)
+    scanned = timeit.timeit(lambda: [linear(q) for q in queries[:200]], number=1)
+
+    print(f"Fuzzy name lookup ({names} names, {lookups} misspelled queries):")
+    print(f"  full build:               {build * 1e3:8.2f} ms")
+    print(f"  incremental update (20):  {incremental * 1e3:8.2f} ms")
+    print(f"  symmetric-delete lookup:  {indexed / lookups * 1e6:8.2f} us/lookup")
+    print(f"  linear edit-distance scan:{scanned / 200 * 1e6:8.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    bench_command_parsing()
+    bench_vote_tally()
+    bench_nickname_resolution()
+    bench_fuzzy_lookup()
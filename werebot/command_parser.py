@@ -0,0 +1,220 @@
+"""
+Command Grammar for Were-Bot
+Parses a comment body once: one compiled pattern finds every mention with
+its prefix spelling (WEREBOT, WERE-BOT, WEREBOT!, WERE-BOT!) and command,
+and the easter-egg triggers are checked around those mentions.
+"""
+
+import re
+from collections import namedtuple
+
+# Command names
+K9 = 'K9'
+VOTE = 'VOTE'
+UNVOTE = 'UNVOTE'
+TALLY = 'TALLY'
+RANDOM = 'RANDOM'
+SNOOZE = 'SNOOZE'
+SUBSCRIBE = 'SUBSCRIBE'
+UNSUBSCRIBE = 'UNSUBSCRIBE'
+
+# Easter egg triggers
+EGG_FRRRRK = 'EGG_FRRRRK'
+EGG_RUDE = 'EGG_RUDE'
+EGG_THANKS = 'EGG_THANKS'
+EGG_GOOD_BOT = 'EGG_GOOD_BOT'
+
+# Commands that replace tagging when present
+SPECIFIC_COMMANDS = frozenset([K9, VOTE, UNVOTE, TALLY, RANDOM, SNOOZE, SUBSCRIBE, UNSUBSCRIBE])
+
+# Commands whose argument is the rest of the comment
+REST_OF_BODY_COMMANDS = frozenset([K9, RANDOM])
+
+# Mentions start with the literal WERE, so the regex engine can jump between
+# candidate positions with a fast substring search instead of trying the
+# pattern at every character. Run on body.upper().
+MENTION = re.compile(r"""
+    WERE-?BOT
+    (?:
+        !\s*(?P<subscription>(?:UN)?SUBSCRIBE)\b
+      | !?\s+(?P<command>K9|UNVOTE|VOTE|TALLY|RANDOM|SNOOZE)\b
+    )?
+""", re.VERBOSE)
+
+# Easter eggs that don't sit right before a mention; only searched for when
+# their keyword appears at all
+EGG_FRRRRK_PATTERN = re.compile(r'\bI\s+HATE\s+FRRRRK')
+EGG_GOOD_BOT_PATTERN = re.compile(r'\bGOOD\s+BOT\b')
+
+# The whole grammar in one pattern, for bodies whose length changes when
+# upper-cased (e.g. "ß" -> "SS"): argument offsets must line up with the
+# original text, so these are matched case-insensitively instead. The easter
+# eggs only consume the words before WEREBOT (lookahead), so the mention itself
+# is still matched by the prefix branch on the next iteration.
+GRAMMAR_IGNORECASE = re.compile(r"""
+    (?:
+          WERE-?BOT
+          (?:
+              !\s*(?P<subscription>(?:UN)?SUBSCRIBE)\b
+            | !?\s+(?P<command>K9|UNVOTE|VOTE|TALLY|RANDOM|SNOOZE)\b
+          )?
+        | (?P<egg_frrrrk>\bI\s+HATE\s+FRRRRK)
+        | (?P<egg_rude>\bFUCK\s+(?=WERE-?BOT))
+        | (?P<egg_thanks>\bTHANK(?:S|\s+YOU)\s+(?=WERE-?BOT))
+        | (?P<egg_good_bot>\bGOOD\s+BOT\b)
+    )
+""", re.VERBOSE | re.IGNORECASE)
+
+VOTE_TARGET = re.compile(r'\s+(/?u/)?([a-zA-Z0-9_-]+)', re.IGNORECASE)
+
+EGG_GROUPS = (
+    ('egg_frrrrk', EGG_FRRRRK),
+    ('egg_rude', EGG_RUDE),
+    ('egg_thanks', EGG_THANKS),
+    ('egg_good_bot', EGG_GOOD_BOT),
+)
+
+# name: command/egg name
+# argument: VOTE target, or the remaining text for K9/RANDOM ('' otherwise)
+# explicit_user: True if a VOTE target was written as /u/name
+Command = namedtuple('Command', ['name', 'argument', 'explicit_user'])
+
+
+class ParsedComment:
+    """Result of parsing a comment body"""
+
+    __slots__ = ('commands', 'mentions_bot')
+
+    def __init__(self, commands, mentions_bot):
+        self.commands = commands  # name -> Command (first occurrence wins)
+        self.mentions_bot = mentions_bot
+
+    def has(self, name):
+        return name in self.commands
+
+    def get(self, name):
+        return self.commands.get(name)
+
+    @property
+    def has_specific_command(self):
+        """True if the comment contains a real command (not just a mention)"""
+        return not SPECIFIC_COMMANDS.isdisjoint(self.commands)
+
+    @property
+    def is_tag_request(self):
+        """True if WEREBOT was mentioned without any specific command"""
+        return self.mentions_bot and not self.has_specific_command
+
+
+def _word_before(text, end):
+    """
+    The word ending at the last non-space character before `end`, if at
+    least one whitespace character separates the two.
+
+    Returns:
+        (word, start) or (None, end)
+    """
+    j = end
+    while j and text[j - 1].isspace():
+        j -= 1
+    if j == end:
+        return None, end
+    start = j
+    while start and (text[start - 1].isalnum() or text[start - 1] == '_'):
+        start -= 1
+    return text[start:j], start
+
+
+def _egg_before_mention(upper, start):
+    """EGG_RUDE / EGG_THANKS if "FUCK", "THANKS" or "THANK YOU" directly precedes a mention at start"""
+    word, word_start = _word_before(upper, start)
+    if word == 'FUCK':
+        return EGG_RUDE
+    if word == 'THANKS':
+        return EGG_THANKS
+    if word == 'YOU' and _word_before(upper, word_start)[0] == 'THANK':
+        return EGG_THANKS
+    return None
+
+
+def _add_command(commands, name, body, end):
+    """Record the first occurrence of a command, with its argument taken from body after `end`"""
+    name = name.upper()
+    if name in commands:
+        return
+
+    argument = ''
+    explicit_user = False
+    if name == VOTE:
+        target = VOTE_TARGET.match(body, end)
+        if target:
+            explicit_user = bool(target.group(1))
+            argument = target.group(2)
+    elif name in REST_OF_BODY_COMMANDS:
+        argument = body[end:].strip()
+
+    commands[name] = Command(name, argument, explicit_user)
+
+
+def _parse_ignorecase(body):
+    """Slow path for bodies whose length changes when upper-cased"""
+    commands = {}
+    mentions_bot = False
+    for match in GRAMMAR_IGNORECASE.finditer(body):
+        egg = match.lastgroup
+        if egg and egg.startswith('egg_'):
+            for group, name in EGG_GROUPS:
+                if group == egg and name not in commands:
+                    commands[name] = Command(name, '', False)
+            continue
+
+        mentions_bot = True
+        name = match.group('command') or match.group('subscription')
+        if name:
+            _add_command(commands, name, body, match.end())
+    return commands, mentions_bot
+
+
+def parse_comment(body):
+    """
+    Parse a comment body in one pass.
+
+    Args:
+        body: Raw comment text
+
+    Returns:
+        ParsedComment
+    """
+    commands = {}
+    mentions_bot = False
+
+    # Every trigger contains BOT or FRRRRK; most comments are rejected here
+    upper = body.upper()
+    has_bot = 'BOT' in upper
+    if not has_bot and 'FRRRRK' not in upper:
+        return ParsedComment(commands, mentions_bot)
+
+    if len(upper) != len(body):
+        commands, mentions_bot = _parse_ignorecase(body)
+    else:
+        if has_bot:
+            for match in MENTION.finditer(upper):
+                mentions_bot = True
+                egg = _egg_before_mention(upper, match.start())
+                if egg and egg not in commands:
+                    commands[egg] = Command(egg, '', False)
+                name = match.group('command') or match.group('subscription')
+                if name:
+                    _add_command(commands, name, body, match.end())
+
+        if 'FRRRRK' in upper and EGG_FRRRRK_PATTERN.search(upper):
+            commands.setdefault(EGG_FRRRRK, Command(EGG_FRRRRK, '', False))
+
+        if mentions_bot and 'GOOD' in upper and EGG_GOOD_BOT_PATTERN.search(upper):
+            commands.setdefault(EGG_GOOD_BOT, Command(EGG_GOOD_BOT, '', False))
+
+    # "good bot" only counts when it's directed at Werebot
+    if not mentions_bot:
+        commands.pop(EGG_GOOD_BOT, None)
+
+    return ParsedComment(commands, mentions_bot)
@@ -0,0 +1,193 @@
+"""
+Cursor-based Comment Ingestion for Were-Bot
+Pages forward through new subreddit comments with Reddit's `before` parameter
+so bursts larger than one listing page are never silently skipped.
+Listing items are turned into CommentEvent records straight from the JSON,
+so handlers never touch lazy PRAW objects.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CommentEvent:
+    """
+    Everything the handlers need from a comment, taken from the listing JSON.
+
+    Unlike a PRAW Comment, no attribute access can trigger a network fetch
+    (e.g. comment.submission.permalink used to load the whole submission).
+    """
+
+    __slots__ = ('id', 'fullname', 'submission_id', 'author', 'body', 'permalink', 'created_utc')
+
+    def __init__(self, id, fullname, submission_id, author, body, permalink, created_utc):
+        self.id = id
+        self.fullname = fullname
+        self.submission_id = submission_id
+        self.author = author
+        self.body = body
+        self.permalink = permalink
+        self.created_utc = created_utc
+
+    @classmethod
+    def from_listing(cls, data):
+        """
+        Build an event from the `data` dict of a t1 listing child.
+
+        Args:
+            data: Comment JSON, e.g. {"id": "def456", "link_id": "t3_abc123", ...}
+        """
+        link_id = data.get('link_id', '')
+        return cls(
+            id=data['id'],
+            fullname=data.get('name') or f"t1_{data['id']}",
+            submission_id=link_id[3:] if link_id.startswith('t3_') else link_id,
+            author=data.get('author'),
+            body=data.get('body', ''),
+            permalink=data.get('permalink', ''),
+            created_utc=data.get('created_utc', 0),
+        )
+
+    @property
+    def submission_permalink(self):
+        """Permalink of the submission, e.g. /r/sub/comments/abc123/title/"""
+        return self.permalink.rstrip('/').rsplit('/', 1)[0] + '/'
+
+    def __repr__(self):
+        return f"CommentEvent(id={self.id!r}, submission_id={self.submission_id!r}, author={self.author!r})"
+
+
+class CommentStream:
+    """
+    Fetches only comments newer than a persisted cursor.
+
+    The cursor (fullname + created_utc of the newest comment handled) lives
+    in the checkpoint dict so it survives restarts. fetch() never moves it:
+    the caller commits the cursor it returns once the batch has been handled,
+    so a failure partway through re-fetches the rest of the batch next cycle.
+    """
+
+    def __init__(self, reddit, subreddits, state, page_size=100, max_pages=10,
+                 initial_limit=50, probe_interval=6):
+        """
+        Initialize comment stream.
+
+        Args:
+            reddit: PRAW Reddit instance
+            subreddits: Subreddit string (e.g. "sub1+sub2")
+            state: Dict the cursor is stored in (the bot checkpoint)
+            page_size: Comments per listing request (Reddit maximum is 100)
+            max_pages: Maximum pages fetched per cycle; the rest is picked up
+                       next cycle because the cursor only moves forward
+            initial_limit: Comments fetched when there is no cursor yet
+            probe_interval: Empty cycles between checks for a stale cursor
+        """
+        self.reddit = reddit
+        self.subreddits = subreddits
+        self.state = state
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.initial_limit = initial_limit
+        self.probe_interval = probe_interval
+
+        self.empty_cycles = 0
+        self.cursor_moved = False
+
+    @property
+    def cursor(self):
+        """Fullname (t1_xxx) of the newest comment seen, or None"""
+        return self.state.get('comment_cursor')
+
+    def commit(self, cursor):
+        """
+        Move the cursor after the comments of a handled batch.
+
+        Args:
+            cursor: Cursor returned by fetch() (None leaves it unchanged)
+        """
+        if cursor is None:
+            return
+        self.state['comment_cursor'], self.state['comment_cursor_utc'] = cursor
+        self.cursor_moved = True
+
+    def _listing(self, limit, params=None):
+        """
+        Fetch one page of the subreddit comment listing (newest first).
+
+        Uses the raw JSON response rather than PRAW's objectified listing so
+        each item becomes a CommentEvent without any lazy attributes.
+        """
+        request_params = {'limit': limit}
+        if params:
+            request_params.update(params)
+
+        response = self.reddit.request(method='GET', path=f"r/{self.subreddits}/comments/", params=request_params)
+        children = response.get('data', {}).get('children', [])
+        return [CommentEvent.from_listing(child['data']) for child in children if child.get('kind') == 't1']
+
+    def _recover_stale_cursor(self):
+        """
+        Detect a cursor that no longer pages (e.g. the comment was removed).
+
+        `before=` a removed comment returns an empty listing forever, so every
+        few empty cycles we look at the newest page and pick up anything newer
+        than the cursor's timestamp.
+
+        Returns:
+            (comments oldest first, new cursor or None)
+        """
+        cursor_utc = self.state.get('comment_cursor_utc') or 0
+        page = self._listing(self.page_size)
+        newer = [c for c in page if c.created_utc >= cursor_utc and c.fullname != self.cursor]
+
+        if newer:
+            logger.warning(f"Comment cursor {self.cursor} appears stale, resyncing from newest listing")
+            return list(reversed(newer)), (newer[0].fullname, newer[0].created_utc)
+        return [], None
+
+    def fetch(self):
+        """
+        Fetch all comments posted since the committed cursor.
+
+        Returns:
+            (comments, cursor): CommentEvents oldest first, and the cursor to
+            pass to commit() once they have been handled (None if unchanged)
+        """
+        self.cursor_moved = False
+
+        if not self.cursor:
+            comments = self._listing(self.initial_limit)
+            if not comments:
+                return [], None
+            logger.info(f"Initializing comment cursor at {comments[0].fullname}")
+            return list(reversed(comments)), (comments[0].fullname, comments[0].created_utc)
+
+        new_comments = []
+        cursor = None
+        before = self.cursor
+        for page_num in range(self.max_pages):
+            page = self._listing(self.page_size, params={'before': before})
+            if not page:
+                break
+
+            # Listing is newest first; page[0] is the newest of this window
+            new_comments.extend(reversed(page))
+            cursor = (page[0].fullname, page[0].created_utc)
+            before = page[0].fullname
+
+            if len(page) < self.page_size:
+                break
+        else:
+            logger.warning(f"Comment backlog exceeds {self.max_pages} pages, continuing next cycle")
+
+        if new_comments:
+            self.empty_cycles = 0
+            return new_comments, cursor
+
+        self.empty_cycles += 1
+        if self.empty_cycles >= self.probe_interval:
+            self.empty_cycles = 0
+            return self._recover_stale_cursor()
+
+        return [], None
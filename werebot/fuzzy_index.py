@@ -0,0 +1,156 @@
+"""
+Approximate Name Matching for Were-Bot
+Symmetric-delete index over known nicknames and usernames, so a VOTE for
+"K9mooonmoon" still finds K9moonmoon without scanning every name.
+"""
+
+import threading
+from itertools import combinations
+
+
+def max_distance(length):
+    """
+    Edits tolerated for a name of this length.
+
+    Short names are exact-only: one edit turns "Al" into "Ali" or "Bo" into
+    "Bob", which are just as likely to be other players.
+    """
+    if length >= 8:
+        return 2
+    if length >= 5:
+        return 1
+    return 0
+
+
+def deletes(word, distance):
+    """All strings obtained by deleting up to `distance` characters (including word itself)"""
+    variants = {word}
+    for count in range(1, min(distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add(''.join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insert, delete, substitute, transpose).
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        # A transposition can reach back two rows, so stop only when both exceed the limit
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """
+    Maps lower-cased names (nicknames and usernames) to usernames and
+    finds the closest name to a misspelled one.
+
+    Every name is stored under each string reachable by deleting up to
+    max_distance(len(name)) characters. A query generates its own deletes
+    and only the names sharing one of them are compared, so a lookup costs
+    a few dozen dict hits regardless of how many names are indexed.
+    """
+
+    def __init__(self, names=None):
+        """
+        Args:
+            names: Optional dict of name -> username to index
+        """
+        self._lock = threading.Lock()
+        self.names = {}     # name (lowercase) -> username
+        self.variants = {}  # deleted variant -> set of names
+        if names:
+            self.update(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add(self, name):
+        for variant in deletes(name, max_distance(len(name))):
+            self.variants.setdefault(variant, set()).add(name)
+
+    def _remove(self, name):
+        for variant in deletes(name, max_distance(len(name))):
+            bucket = self.variants.get(variant)
+            if bucket:
+                bucket.discard(name)
+                if not bucket:
+                    del self.variants[variant]
+
+    def update(self, names):
+        """
+        Make the index match `names`, touching only names that changed.
+
+        Args:
+            names: Dict of name -> username (names are lower-cased here)
+
+        Returns:
+            (added, removed) counts
+        """
+        names = {name.lower(): username for name, username in names.items() if name}
+        with self._lock:
+            removed = [name for name in self.names if name not in names]
+            added = [name for name in names if name not in self.names]
+            for name in removed:
+                self._remove(name)
+            for name in added:
+                self._add(name)
+            self.names = names
+        return len(added), len(removed)
+
+    def lookup(self, query):
+        """
+        Find the username whose name is closest to `query`.
+
+        Returns:
+            (username, distance), or (None, None) if nothing is within the
+            allowed distance or the best matches point to different users
+        """
+        query = query.lower()
+        limit = max_distance(len(query))
+
+        with self._lock:
+            if query in self.names:
+                return self.names[query], 0
+            if limit == 0:
+                return None, None
+
+            candidates = set()
+            for variant in deletes(query, limit):
+                bucket = self.variants.get(variant)
+                if bucket:
+                    candidates.update(bucket)
+
+            best_distance = limit + 1
+            best_users = set()
+            for name in candidates:
+                allowed = min(limit, max_distance(len(name)))
+                distance = edit_distance(query, name, allowed)
+                if distance > allowed:
+                    continue
+                if distance < best_distance:
+                    best_distance = distance
+                    best_users = {self.names[name]}
+                elif distance == best_distance:
+                    best_users.add(self.names[name])
+
+        if best_distance > limit or len(best_users) != 1:
+            return None, None
+        return best_users.pop(), best_distance
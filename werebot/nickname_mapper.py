@@ -3,43 +3,41 @@ Nickname Lookup System for Were-Bot
 Allows users to use shorthand nicknames that map to Reddit usernames
 """
 
-import gspread
-from google.oauth2.service_account import Credentials
+import csv
+import json
 import logging
+import os
+import threading
 import time
 from datetime import datetime, timedelta
 
+from fuzzy_index import FuzzyIndex
+from nickname_matcher import NicknameMatcher
+
 logger = logging.getLogger(__name__)
 
 
-class NicknameMapper:
+class GoogleSheetBackend:
     """
-    Manages nickname-to-username mappings from Google Sheets.
-    Caches results to minimize API calls.
+    Reads the nickname sheet from Google Sheets.
+    
+    The client is created on first use (not at startup), and the opened
+    spreadsheet is kept so a refresh costs one modified-time request when
+    nothing changed.
     """
     
-    def __init__(self, spreadsheet_url, credentials_file, cache_duration=300):
-        """
-        Initialize nickname mapper.
-        
-        Args:
-            spreadsheet_url: URL of the Google Sheet
-            credentials_file: Path to Google service account credentials JSON
-            cache_duration: How long to cache nicknames (seconds, default 5 minutes)
-        """
+    def __init__(self, spreadsheet_url, credentials_file):
         self.spreadsheet_url = spreadsheet_url
         self.credentials_file = credentials_file
-        self.cache_duration = cache_duration
-        
-        self.nickname_map = {}  # nickname (lowercase) -> username
-        self.last_update = None
         self.client = None
-        
-        self._init_google_client()
+        self.sheet = None
     
     def _init_google_client(self):
         """Initialize Google Sheets client"""
         try:
+            import gspread
+            from google.oauth2.service_account import Credentials
+            
             logger.info("Initializing Google Sheets client for nickname lookup...")
             
             scopes = [
@@ -59,6 +57,155 @@ class NicknameMapper:
             logger.error(f"Failed to initialize Google Sheets client: {e}")
             self.client = None
     
+    def _open(self):
+        if self.sheet is None:
+            if not self.client:
+                # Also retries a client that failed to initialize (e.g. transient auth error)
+                self._init_google_client()
+            if not self.client:
+                raise RuntimeError("Google Sheets client not initialized")
+            self.sheet = self.client.open_by_url(self.spreadsheet_url)
+        return self.sheet
+    
+    def revision(self):
+        """Last modified time of the spreadsheet (Drive metadata, no cell data)"""
+        sheet = self._open()
+        get_last_update = getattr(sheet, 'get_lastUpdateTime', None)
+        if get_last_update:
+            return get_last_update()
+        return sheet.lastUpdateTime
+    
+    def fetch_rows(self):
+        """All rows of the first worksheet"""
+        try:
+            return self._open().get_worksheet(0).get_all_values()
+        except Exception:
+            # Reopen next time in case the cached handle went bad
+            self.sheet = None
+            raise
+
+
+class LocalSheetBackend:
+    """
+    Reads the nickname sheet from a local CSV file with the same columns.
+    
+    Stands in for Google Sheets when running offline or testing; the file's
+    modification time and size serve as the revision.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def revision(self):
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    
+    def fetch_rows(self):
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.reader(f))
+
+
+class NicknameMapper:
+    """
+    Manages nickname-to-username mappings from Google Sheets.
+    Caches results to minimize API calls.
+    
+    After the first load, refreshes run in a background thread: lookups keep
+    using the current map and never wait for Google Sheets, and a new map
+    replaces the old one only once it has loaded completely.
+    
+    Every loaded map is saved to a snapshot file together with the sheet's
+    revision. At startup the snapshot is served immediately, and a refresh
+    only downloads the sheet when its revision has changed.
+    """
+    
+    def __init__(self, spreadsheet_url=None, credentials_file=None, cache_duration=300,
+                 retry_delay=30, max_retry_delay=1800, snapshot_file=None, backend=None):
+        """
+        Initialize nickname mapper.
+        
+        Args:
+            spreadsheet_url: URL of the Google Sheet
+            credentials_file: Path to Google service account credentials JSON
+            cache_duration: How long to cache nicknames (seconds, default 5 minutes)
+            retry_delay: Seconds before the first retry of a failed refresh
+            max_retry_delay: Upper bound for the doubling retry delay
+            snapshot_file: Optional JSON file the last loaded map is kept in
+            backend: Sheet backend to read instead of Google Sheets (e.g. LocalSheetBackend)
+        """
+        self.spreadsheet_url = spreadsheet_url
+        self.credentials_file = credentials_file
+        self.cache_duration = cache_duration
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.snapshot_file = snapshot_file
+        self.backend = backend or GoogleSheetBackend(spreadsheet_url, credentials_file)
+        
+        self.nickname_map = {}  # nickname (lowercase) -> username
+        self.matcher = NicknameMatcher({})  # compiled from nickname_map on every load
+        self.fuzzy = FuzzyIndex()  # nicknames and usernames, for near-miss lookups
+        self.revision = None  # sheet revision nickname_map was loaded from
+        self.last_update = None
+        
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+    
+    def _swap(self, new_map, revision):
+        """Install a new map; compile first so lookups see either the old or the new map"""
+        # Usernames are valid targets too; only names that changed are re-indexed
+        fuzzy_names = {username.lower(): username for username in new_map.values()}
+        fuzzy_names.update(new_map)
+        self.fuzzy.update(fuzzy_names)
+        
+        matcher = NicknameMatcher(new_map)
+        self.matcher = matcher
+        self.nickname_map = new_map
+        self.revision = revision
+    
+    def load_snapshot(self):
+        """
+        Serve the map saved by the last successful load, without any network I/O.
+        
+        The snapshot is treated as stale so the next refresh checks the
+        sheet's revision right away.
+        
+        Returns:
+            True if a snapshot with at least one nickname was loaded
+        """
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return False
+        
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                snapshot = json.load(f)
+            nicknames = snapshot.get('nicknames') or {}
+            if not nicknames:
+                return False
+            
+            self._swap(nicknames, snapshot.get('revision'))
+            logger.info(f"Loaded {len(nicknames)} nicknames from snapshot "
+                        f"(saved {snapshot.get('saved_at', 'unknown')})")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load nickname snapshot: {e}")
+            return False
+    
+    def _save_snapshot(self):
+        if not self.snapshot_file:
+            return
+        
+        try:
+            tmp_file = self.snapshot_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    'revision': self.revision,
+                    'saved_at': datetime.now().isoformat(),
+                    'nicknames': self.nickname_map,
+                }, f, indent=2)
+            os.replace(tmp_file, self.snapshot_file)
+        except Exception as e:
+            logger.warning(f"Could not save nickname snapshot: {e}")
+    
     def _should_refresh_cache(self):
         """Check if cache should be refreshed"""
         if not self.last_update:
@@ -67,6 +214,55 @@ class NicknameMapper:
         age = datetime.now() - self.last_update
         return age.total_seconds() > self.cache_duration
     
+    def _refresh_if_stale(self):
+        """
+        Make sure a stale map gets refreshed, without blocking the caller.
+        
+        The refresh itself runs in the background thread (started here if it
+        isn't running yet); the caller keeps using the current map.
+        """
+        if self._refresh_thread is None and self._should_refresh_cache():
+            self.start_background_refresh()
+    
+    def start_background_refresh(self):
+        """Reload the nickname sheet every cache_duration seconds in a daemon thread"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='nickname-refresh', daemon=True)
+        self._refresh_thread.start()
+        logger.info(f"Nickname refresh running in background every {self.cache_duration}s")
+    
+    def stop_background_refresh(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
+    
+    def _refresh_loop(self):
+        failures = 0
+        while True:
+            if failures:
+                delay = min(self.retry_delay * (2 ** (failures - 1)), self.max_retry_delay)
+            elif self.last_update:
+                age = (datetime.now() - self.last_update).total_seconds()
+                delay = max(self.cache_duration - age, 0)
+            else:
+                delay = 0
+            
+            if self._stop_event.wait(delay):
+                return
+            
+            if self.load_nicknames():
+                failures = 0
+            else:
+                failures += 1
+                retry_in = min(self.retry_delay * (2 ** (failures - 1)), self.max_retry_delay)
+                logger.warning(f"Nickname refresh failed {failures} time(s), keeping "
+                               f"{len(self.nickname_map)} cached nicknames; retrying in {retry_in}s")
+    
     def load_nicknames(self):
         """
         Load nicknames from Google Sheet.
@@ -76,20 +272,26 @@ class NicknameMapper:
         Column B: Reddit Username (e.g., "Team-Hufflepuff", "K9moonmoon")
         
         First row is headers (will be skipped).
-        """
-        if not self.client:
-            logger.warning("Google Sheets client not initialized, cannot load nicknames")
-            return False
         
+        The sheet's revision is checked first; if it matches the revision the
+        current map came from, the download is skipped.
+        """
         try:
-            logger.info("Loading nicknames from Google Sheet...")
+            revision = None
+            try:
+                revision = self.backend.revision()
+            except Exception as e:
+                logger.debug(f"Could not read nickname sheet revision, downloading it: {e}")
+            
+            if revision is not None and revision == self.revision and self.nickname_map:
+                self.last_update = datetime.now()
+                logger.debug(f"Nickname sheet unchanged (revision {revision})")
+                return True
             
-            # Open spreadsheet
-            sheet = self.client.open_by_url(self.spreadsheet_url)
-            worksheet = sheet.get_worksheet(0)  # First worksheet
+            logger.info("Loading nicknames from sheet...")
             
             # Get all values
-            all_values = worksheet.get_all_values()
+            all_values = self.backend.fetch_rows()
             
             if not all_values:
                 logger.warning("Nickname sheet is empty")
@@ -118,8 +320,9 @@ class NicknameMapper:
                         new_map[nickname_lower] = username
                         logger.debug(f"Loaded nickname: {nickname} -> {username}")
             
-            self.nickname_map = new_map
+            self._swap(new_map, revision)
             self.last_update = datetime.now()
+            self._save_snapshot()
             
             logger.info(f"Successfully loaded {len(self.nickname_map)} nicknames")
             return True
@@ -138,12 +341,33 @@ class NicknameMapper:
         Returns:
             Reddit username if found, None otherwise
         """
-        # Refresh cache if needed
-        if self._should_refresh_cache():
-            self.load_nicknames()
+        # Refresh cache if needed (in the background)
+        self._refresh_if_stale()
         
         return self.nickname_map.get(nickname.lower())
     
+    def find_closest(self, name):
+        """
+        Get the Reddit username for a nickname or username, tolerating typos.
+        
+        Names of 5-7 characters may be one edit off, longer names two; shorter
+        names must match exactly. Matches that are equally close to two
+        different users are rejected.
+        
+        Args:
+            name: Nickname or username as written (case-insensitive)
+        
+        Returns:
+            Reddit username if found, None otherwise
+        """
+        # Refresh cache if needed (in the background)
+        self._refresh_if_stale()
+        
+        username, distance = self.fuzzy.lookup(name)
+        if username and distance:
+            logger.info(f"Fuzzy-matched '{name}' to '{username}' ({distance} edit(s))")
+        return username
+    
     def resolve_mentions(self, text):
         """
         Resolve all nickname mentions in text to Reddit usernames.
@@ -152,6 +376,7 @@ class NicknameMapper:
         - Puff
         - @Puff
         - #Puff
+        - Big Bad (multi-word nicknames; the longest nickname wins)
         
         And converts them to /u/Team-Hufflepuff
         
@@ -161,32 +386,11 @@ class NicknameMapper:
         Returns:
             Text with nicknames replaced by /u/username mentions
         """
-        if not self.nickname_map:
-            return text
-        
-        # Refresh cache if needed
-        if self._should_refresh_cache():
-            self.load_nicknames()
-        
-        import re
-        
-        # Find all potential nickname mentions
-        # Matches: word boundaries followed by alphanumeric (with optional @ or # prefix)
-        pattern = r'\b[@#]?([A-Za-z0-9_-]+)\b'
-        
-        def replace_nickname(match):
-            potential_nickname = match.group(1)
-            username = self.get_username(potential_nickname)
-            
-            if username:
-                logger.debug(f"Resolved nickname '{potential_nickname}' to '/u/{username}'")
-                return f"/u/{username}"
-            else:
-                # Not a nickname, return original
-                return match.group(0)
+        # Refresh cache if needed (in the background)
+        self._refresh_if_stale()
         
-        resolved_text = re.sub(pattern, replace_nickname, text)
-        return resolved_text
+        # One pass over the text with the matcher compiled at load time
+        return self.matcher.resolve(text)
     
     def get_all_nicknames(self):
         """
@@ -195,9 +399,8 @@ class NicknameMapper:
         Returns:
             Dictionary of nickname -> username mappings
         """
-        # Refresh cache if needed
-        if self._should_refresh_cache():
-            self.load_nicknames()
+        # Refresh cache if needed (in the background)
+        self._refresh_if_stale()
         
         return self.nickname_map.copy()
 
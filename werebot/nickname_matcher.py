@@ -0,0 +1,193 @@
+"""
+Nickname Matching Engine for Were-Bot
+Compiles the nickname map once into a token trie so every nickname in a
+comment is found in a single left-to-right pass, including multi-word
+nicknames, with the longest nickname winning.
+"""
+
+import re
+
+# A word: letters, digits and _, with inner hyphens ("Team-Hufflepuff").
+# Leading/trailing hyphens are not part of the word, so "-Puff" and "Puff-"
+# still match Puff while "Team-Puff" does not (the same \b rules as before).
+WORD = re.compile(r'\w+(?:-+\w+)*')
+
+# Separator plus the next word, used to extend a multi-word match
+GAP_AND_WORD = re.compile(r'(\W*)(\w+(?:-+\w+)*)')
+
+WHITESPACE = re.compile(r'\s+')
+
+# Nicknames may be written as @Puff or #Puff
+MENTION_PREFIXES = '@#'
+
+
+def _normalize_gap(gap):
+    """Separator between two words of a nickname, with any whitespace run as one space"""
+    return WHITESPACE.sub(' ', gap)
+
+
+def _trie_pattern(words):
+    """
+    Regex source matching any of `words`, factored as a character trie.
+
+    A flat alternation makes the regex engine try every nickname at every
+    position; the factored form only follows branches that share a prefix.
+    """
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+    return build(root)
+
+
+class _Node:
+    __slots__ = ('username', 'children')
+
+    def __init__(self):
+        self.username = None  # set if the words up to here form a nickname
+        self.children = {}    # (separator, next word) -> _Node
+
+
+class NicknameMatcher:
+    """
+    Immutable matcher for one nickname map.
+
+    The first words of all nicknames are compiled into one regex (run on the
+    lower-cased text), so Python only handles words that can start a
+    nickname. From each hit the token trie is walked over the following
+    words to find the longest nickname starting there.
+    """
+
+    def __init__(self, nickname_map):
+        """
+        Args:
+            nickname_map: Dict of nickname (lowercase) -> username
+        """
+        self.roots = {}  # first word -> _Node
+        count = 0
+
+        for nickname, username in nickname_map.items():
+            nickname = nickname.lower()
+            words = list(WORD.finditer(nickname))
+            if not words:
+                continue
+
+            node = self.roots.setdefault(words[0].group(), _Node())
+            for previous, word in zip(words, words[1:]):
+                gap = _normalize_gap(nickname[previous.end():word.start()])
+                node = node.children.setdefault((gap, word.group()), _Node())
+
+            if node.username is None:
+                count += 1
+            node.username = username
+
+        self.count = count
+        self.scanner = None
+        if self.roots:
+            self.scanner = re.compile(
+                r'(?<!\w)(?:' + _trie_pattern(self.roots) + r')(?!\w|-+\w)'
+            )
+
+    def __len__(self):
+        return self.count
+
+    def _longest_from(self, lowered, node, end):
+        """
+        Walk the trie over the words after `end`.
+
+        Returns:
+            (username, end) of the longest nickname, username None if none
+        """
+        best = (node.username, end)
+        while node.children:
+            match = GAP_AND_WORD.match(lowered, end)
+            if not match:
+                break
+            node = node.children.get((_normalize_gap(match.group(1)), match.group(2)))
+            if node is None:
+                break
+            end = match.end()
+            if node.username is not None:
+                best = (node.username, end)
+        return best
+
+    @staticmethod
+    def _inside_compound(lowered, start):
+        """True if the word at `start` is the tail of a hyphenated word (e.g. Puff in Team-Puff)"""
+        i = start
+        while i > 0 and lowered[i - 1] == '-':
+            i -= 1
+        return i < start and i > 0 and (lowered[i - 1].isalnum() or lowered[i - 1] == '_')
+
+    def find(self, text):
+        """
+        Find every nickname in the text.
+
+        Returns:
+            List of (start, end, username); start includes an @/# prefix
+        """
+        if self.scanner is None:
+            return []
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Offsets must line up with the original text (e.g. "İ" lowers to two chars)
+            lowered = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+        found = []
+        position = 0
+        while True:
+            match = self.scanner.search(lowered, position)
+            if not match:
+                return found
+
+            start = match.start()
+            if self._inside_compound(lowered, start):
+                position = match.end()
+                continue
+
+            username, end = self._longest_from(lowered, self.roots[match.group()], match.end())
+            if username is None:
+                # Only the start of a multi-word nickname; continue after this word
+                position = match.end()
+                continue
+
+            if start > 0 and text[start - 1] in MENTION_PREFIXES:
+                start -= 1
+            found.append((start, end, username))
+            position = end
+
+    def resolve(self, text):
+        """
+        Replace every nickname with a /u/username mention.
+
+        Args:
+            text: Text containing potential nicknames
+
+        Returns:
+            Text with nicknames replaced by /u/username mentions
+        """
+        matches = self.find(text)
+        if not matches:
+            return text
+
+        parts = []
+        last = 0
+        for start, end, username in matches:
+            parts.append(text[last:start])
+            parts.append(f"/u/{username}")
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts)
@@ -0,0 +1,292 @@
+"""
+Reply Outbox for Were-Bot
+Handlers queue replies here instead of calling comment.reply() inline.
+The outbox is drained between polling cycles at the rate Reddit reports
+through PRAW's auth.limits, retries failures and persists pending items.
+Progress is saved after every post, so a multi-comment tag chain resumes
+at the batch where it stopped instead of starting over.
+"""
+
+import html
+import logging
+import re
+import time
+
+import praw
+
+logger = logging.getLogger(__name__)
+
+# Errors that will never succeed on retry (parent gone or closed)
+PERMANENT_ERRORS = {'DELETED_COMMENT', 'THREAD_LOCKED', 'TOO_OLD', 'SUBREDDIT_NOTALLOWED'}
+
+
+class ReplyOutbox:
+    """
+    Persistent queue of replies.
+
+    Each item replies to `parent_id` with one or more texts. Multi-text items
+    form a chain: every text after the first replies to the previous one
+    (used by send_tags so batches nest under each other as before).
+
+    Items take turns one post at a time, so a long chain never holds up the
+    single replies queued behind it. An item is flagged as `posting` before
+    each post; if the bot dies before recording the result, the next attempt
+    first looks for the reply on Reddit rather than posting it twice.
+    """
+
+    def __init__(self, reddit, store, min_interval=1.0, max_attempts=5, retry_delay=5):
+        """
+        Initialize the outbox.
+
+        Args:
+            reddit: PRAW Reddit instance
+            store: StateStore used to persist pending items
+            min_interval: Minimum seconds between two posts
+            max_attempts: Attempts per text before the item is dropped
+            retry_delay: Base seconds for exponential retry backoff
+        """
+        self.reddit = reddit
+        self.store = store
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.callbacks = {}  # kind -> callback(item, reply) run when an item completes
+        self.failure_callbacks = {}  # kind -> callback(item, reason) run when an item is dropped
+        self.next_send_at = 0
+        self.items = store.load_outbox()
+
+        if self.items:
+            logger.info(f"Loaded {len(self.items)} pending replies from outbox")
+
+    def __len__(self):
+        return len(self.items)
+
+    def register(self, kind, callback, on_failure=None):
+        """
+        Register callbacks for an item kind.
+
+        Args:
+            kind: Item kind
+            callback: Run with (item, last_reply) once an item is delivered
+            on_failure: Run with (item, reason) if an item is dropped; item['sent']
+                        says how many of its texts were posted before that
+        """
+        self.callbacks[kind] = callback
+        if on_failure:
+            self.failure_callbacks[kind] = on_failure
+
+    def enqueue(self, parent_id, texts, kind='reply', meta=None):
+        """
+        Queue a reply (or a chain of replies).
+
+        Args:
+            parent_id: ID of the comment to reply to
+            texts: Reply text, or list of texts posted as a chain
+            kind: Item kind, used to select a completion callback; a comment
+                  gets at most one pending item of each kind
+            meta: JSON-serializable data passed through to the callback
+
+        Returns:
+            Outbox item ID, or None if a reply of this kind to the comment was already queued
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+
+        item_id = self.store.add_outbox_item(kind, parent_id, texts, meta)
+        if item_id is None:
+            logger.info(f"{kind} reply to {parent_id} is already queued, not adding it again")
+            return None
+
+        self.items.append({
+            'id': item_id,
+            'kind': kind,
+            'parent_id': parent_id,
+            'texts': texts,
+            'sent': 0,
+            'attempts': 0,
+            'not_before': 0,
+            'meta': meta or {},
+            'source_id': parent_id,
+            'posting': False,
+        })
+        logger.debug(f"Queued {kind} reply to {parent_id} ({len(texts)} text(s))")
+        return item_id
+
+    def pending(self, kind, **meta):
+        """First queued item of this kind whose meta has all the given values, or None"""
+        for item in self.items:
+            if item['kind'] == kind and all(item['meta'].get(key) == value for key, value in meta.items()):
+                return item
+        return None
+
+    def update(self, item):
+        """Persist changes a caller made to a queued item's texts or meta"""
+        self.store.update_outbox_item(item)
+
+    def _rate_limit_interval(self):
+        """Seconds to wait before the next post, from Reddit's reported limits"""
+        limits = self.reddit.auth.limits
+        remaining = limits.get('remaining')
+        reset_timestamp = limits.get('reset_timestamp')
+
+        if remaining is None or reset_timestamp is None:
+            return self.min_interval
+
+        seconds_to_reset = max(reset_timestamp - time.time(), 0)
+        if remaining < 1:
+            return max(seconds_to_reset, self.min_interval)
+
+        return max(seconds_to_reset / remaining, self.min_interval)
+
+    def _next_ready(self, now):
+        """First item whose retry delay has passed, or None"""
+        for item in self.items:
+            if item['not_before'] <= now:
+                return item
+        return None
+
+    def _retry_later(self, item, delay):
+        item['attempts'] += 1
+        if item['attempts'] >= self.max_attempts:
+            self._drop(item, f"failed {item['attempts']} times")
+            return
+
+        item['not_before'] = time.time() + delay
+        self.store.update_outbox_item(item)
+        logger.warning(f"Reply to {item['parent_id']} failed, retrying in {delay:.0f}s "
+                       f"({item['attempts']}/{self.max_attempts})")
+
+    def _finish(self, item):
+        self.items.remove(item)
+        self.store.delete_outbox_item(item['id'])
+
+    def _drop(self, item, reason):
+        """Give up on an item, letting its kind's failure callback pick up the pieces"""
+        logger.error(f"Dropping {item['kind']} reply to {item['parent_id']}: {reason}")
+        self._finish(item)
+        callback = self.failure_callbacks.get(item['kind'])
+        if callback:
+            try:
+                callback(item, reason)
+            except Exception as e:
+                logger.error(f"Outbox failure callback for {item['kind']} failed: {e}")
+
+    def _find_posted_reply(self, parent_id, text):
+        """Our reply to parent_id with this text, if an interrupted attempt already posted it"""
+        username = (self.reddit.config.username or '').lower()
+        parent = self.reddit.comment(parent_id)
+        parent.refresh()
+        parent.replies.replace_more(limit=0)
+
+        for reply in parent.replies:
+            if reply.author and reply.author.name.lower() == username \
+                    and html.unescape(reply.body).strip() == text.strip():
+                return reply
+        return None
+
+    def _deliver(self, item):
+        """Post the next text of an item"""
+        text = item['texts'][item['sent']]
+
+        reply = None
+        if item['posting']:
+            try:
+                reply = self._find_posted_reply(item['parent_id'], text)
+            except Exception as e:
+                logger.warning(f"Could not check {item['parent_id']} for an earlier reply: {e}")
+                self._retry_later(item, self.retry_delay * (2 ** item['attempts']))
+                return
+
+            if reply:
+                logger.info(f"Reply {reply.id} to {item['parent_id']} was already posted, resuming after it")
+
+        if reply is None:
+            reply = self._post(item, text)
+            if reply is None:
+                return
+
+        item['sent'] += 1
+        item['attempts'] = 0
+        item['posting'] = False
+        item['parent_id'] = reply.id  # Next text in a chain replies to this one
+
+        if item['sent'] < len(item['texts']):
+            self.store.update_outbox_item(item)
+            # Let other items go before the rest of this chain
+            self.items.remove(item)
+            self.items.append(item)
+            return
+
+        self._finish(item)
+        callback = self.callbacks.get(item['kind'])
+        if callback:
+            try:
+                callback(item, reply)
+            except Exception as e:
+                logger.error(f"Outbox callback for {item['kind']} failed: {e}")
+
+    def _post(self, item, text):
+        """
+        Reply to the item's current parent.
+
+        Returns:
+            The new comment, or None if the post failed (retry is scheduled)
+        """
+        item['posting'] = True
+        self.store.update_outbox_item(item)
+
+        try:
+            return self.reddit.comment(item['parent_id']).reply(text)
+        except praw.exceptions.RedditAPIException as e:
+            # Reddit rejected the post, so there is nothing to look for on retry
+            item['posting'] = False
+
+            error_types = {error.error_type for error in e.items}
+            if error_types & PERMANENT_ERRORS:
+                self._drop(item, str(e))
+                return None
+
+            if 'RATELIMIT' in error_types:
+                # e.g. "Take a break for 3 minutes before trying again."
+                match = re.search(r'(\d+) (second|minute)', str(e))
+                delay = 60
+                if match:
+                    delay = int(match.group(1)) * (60 if match.group(2) == 'minute' else 1)
+                # Reddit asked us to wait: not a failed attempt, so it never uses up max_attempts
+                self.next_send_at = item['not_before'] = time.time() + delay
+                self.store.update_outbox_item(item)
+                logger.warning(f"Rate limited replying to {item['parent_id']}, waiting {delay}s")
+                return None
+
+            self._retry_later(item, self.retry_delay * (2 ** item['attempts']))
+            return None
+        except Exception as e:
+            # e.g. a timeout: the reply may have been posted, so `posting` stays set
+            logger.warning(f"Error posting reply to {item['parent_id']}: {e}")
+            self._retry_later(item, self.retry_delay * (2 ** item['attempts']))
+            return None
+
+    def run_until(self, deadline):
+        """
+        Deliver queued replies until the deadline (unix time).
+
+        Sleeps when idle, so this also replaces the main loop's fixed sleep.
+        """
+        while True:
+            now = time.time()
+            if now >= deadline:
+                return
+
+            item = self._next_ready(now)
+            if item is None:
+                wake = min([i['not_before'] for i in self.items] + [deadline])
+                time.sleep(max(wake - now, 0.05))
+                continue
+
+            if self.next_send_at > now:
+                time.sleep(min(self.next_send_at, deadline) - now)
+                continue
+
+            self._deliver(item)
+            self.next_send_at = max(self.next_send_at, time.time() + self._rate_limit_interval())
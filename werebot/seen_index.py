@@ -0,0 +1,166 @@
+"""
+Processed-Comment Index for Were-Bot
+Bounded, O(1) membership checks for comment IDs we've already handled,
+backed by a compact append-only binary file.
+"""
+
+import logging
+import os
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# Each record is a base36 comment ID stored as an unsigned 64-bit integer
+# plus the unix time it was first seen (12 bytes per comment)
+RECORD = struct.Struct('<QI')
+
+
+class SeenCommentIndex:
+    """
+    Tracks processed comment IDs with size and age based eviction.
+
+    Lookups hit an in-memory dict; new IDs are buffered and written to disk
+    in one group commit per cycle via flush().
+    """
+
+    def __init__(self, index_file, max_entries=100000, max_age=14 * 24 * 3600):
+        """
+        Initialize the index.
+
+        Args:
+            index_file: Path of the binary index file
+            max_entries: Maximum number of IDs kept (oldest evicted first)
+            max_age: Seconds after which an ID is evicted
+        """
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._seen = {}  # comment id (int) -> first seen (unix time), oldest first
+        self._pending = []
+        self._records_on_disk = 0
+
+    @staticmethod
+    def _to_int(comment_id):
+        """Convert a base36 comment ID (e.g. "k2j3h4a") to an integer"""
+        return int(comment_id, 36)
+
+    def __contains__(self, comment_id):
+        try:
+            return self._to_int(comment_id) in self._seen
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, comment_id, seen_at=None):
+        """Mark a comment as processed (persisted on the next flush)"""
+        try:
+            key = self._to_int(comment_id)
+        except ValueError:
+            logger.warning(f"Ignoring invalid comment ID: {comment_id!r}")
+            return
+
+        if key in self._seen:
+            return
+
+        seen_at = int(seen_at if seen_at is not None else time.time())
+        self._seen[key] = seen_at
+        self._pending.append((key, seen_at))
+        self._evict()
+
+    def _evict(self, now=None):
+        """Drop IDs beyond the size limit or older than max_age"""
+        cutoff = (now if now is not None else time.time()) - self.max_age
+
+        while self._seen:
+            oldest_key = next(iter(self._seen))
+            if len(self._seen) <= self.max_entries and self._seen[oldest_key] >= cutoff:
+                break
+            del self._seen[oldest_key]
+
+    def load(self, legacy_file=None):
+        """
+        Load the index from disk.
+
+        Args:
+            legacy_file: Optional newline-separated ID file (comments_replied_to.txt)
+                         imported when no binary index exists yet
+
+        Returns:
+            Number of IDs loaded
+        """
+        if os.path.isfile(self.index_file):
+            try:
+                with open(self.index_file, 'rb') as f:
+                    data = f.read()
+                usable = len(data) - len(data) % RECORD.size
+                if usable != len(data):
+                    logger.warning(f"Ignoring truncated trailing record in {self.index_file}")
+                for key, seen_at in RECORD.iter_unpack(data[:usable]):
+                    self._seen.setdefault(key, seen_at)
+                self._records_on_disk = usable // RECORD.size
+            except Exception as e:
+                logger.error(f"Error loading seen comment index: {e}")
+        elif legacy_file and os.path.isfile(legacy_file):
+            self._migrate(legacy_file)
+
+        self._evict()
+        if self._records_on_disk > 2 * max(len(self._seen), 1):
+            self.compact()
+
+        logger.info(f"Loaded {len(self._seen)} previously processed comments")
+        return len(self._seen)
+
+    def _migrate(self, legacy_file):
+        """Import the most recent IDs from the old text file"""
+        try:
+            with open(legacy_file, 'r') as f:
+                comment_ids = [line.strip() for line in f if line.strip()]
+        except Exception as e:
+            logger.error(f"Error reading legacy comments file: {e}")
+            return
+
+        now = int(time.time())
+        for comment_id in comment_ids[-self.max_entries:]:
+            self.add(comment_id, seen_at=now)
+        self.compact()
+        logger.info(f"Migrated {len(self._seen)} comment IDs from {legacy_file}")
+
+    def flush(self):
+        """Append all IDs added since the last flush in a single write"""
+        if not self._pending:
+            return
+
+        data = b''.join(RECORD.pack(key, seen_at) for key, seen_at in self._pending)
+        try:
+            with open(self.index_file, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._records_on_disk += len(self._pending)
+            self._pending = []
+        except Exception as e:
+            logger.error(f"Failed to flush seen comment index: {e}")
+            return
+
+        # Evicted IDs still occupy disk space until the file is rewritten
+        if self._records_on_disk > 2 * self.max_entries:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the index file with only the retained IDs"""
+        tmp_file = self.index_file + '.tmp'
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(b''.join(RECORD.pack(key, seen_at) for key, seen_at in self._seen.items()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.index_file)
+            self._records_on_disk = len(self._seen)
+            self._pending = []
+            logger.debug(f"Compacted seen comment index to {len(self._seen)} entries")
+        except Exception as e:
+            logger.error(f"Failed to compact seen comment index: {e}")
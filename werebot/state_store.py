@@ -0,0 +1,297 @@
+"""
+SQLite State Store for Were-Bot
+Transactional storage for votes, snoozes, tally comments, unsubscribes and
+the pending reply outbox.
+Each change is a single-row upsert instead of a rewrite of a whole JSON file.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS votes (
+    submission_id TEXT NOT NULL,
+    voter TEXT NOT NULL,
+    target TEXT NOT NULL,
+    permalink TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (submission_id, voter)
+);
+CREATE TABLE IF NOT EXISTS snoozes (
+    submission_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (submission_id, username)
+);
+CREATE TABLE IF NOT EXISTS tally_comments (
+    submission_id TEXT PRIMARY KEY,
+    comment_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unsubscribed (
+    username TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    texts TEXT NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    meta TEXT NOT NULL DEFAULT '{}',
+    source_id TEXT NOT NULL,
+    posting INTEGER NOT NULL DEFAULT 0
+);
+-- A comment re-handled after a crash must not queue the same reply twice.
+-- Keyed on the kind, not the text: RANDOM picks and tallies differ each time.
+DROP INDEX IF EXISTS outbox_source;
+CREATE UNIQUE INDEX IF NOT EXISTS outbox_source_kind ON outbox (source_id, kind);
+"""
+
+
+class StateStore:
+    """
+    Persists Werebot state in a SQLite database running in WAL mode.
+
+    Reads return the same dict/list structures the bot has always used, so
+    only the writes change shape (one row per change).
+    """
+
+    def __init__(self, db_file):
+        """
+        Open (and create if needed) the state database.
+
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        """Run a single write statement in its own transaction"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute(sql, params)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # === Votes ===
+
+    def load_votes(self):
+        """
+        Returns:
+            dict: submission_id -> {VOTER: {'target': ..., 'permalink': ...}}
+        """
+        votes = {}
+        rows = self._query('SELECT submission_id, voter, target, permalink FROM votes ORDER BY rowid')
+        for submission_id, voter, target, permalink in rows:
+            votes.setdefault(submission_id, {})[voter] = {'target': target, 'permalink': permalink}
+        return votes
+
+    def upsert_vote(self, submission_id, voter, target, permalink=''):
+        self._execute(
+            'INSERT INTO votes (submission_id, voter, target, permalink) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (submission_id, voter) DO UPDATE SET target = excluded.target, permalink = excluded.permalink',
+            (submission_id, voter, target, permalink or '')
+        )
+
+    def delete_vote(self, submission_id, voter):
+        self._execute('DELETE FROM votes WHERE submission_id = ? AND voter = ?', (submission_id, voter))
+
+    # === Snoozes ===
+
+    def load_snoozes(self):
+        """
+        Returns:
+            dict: submission_id -> [USERNAME, ...]
+        """
+        snoozed = {}
+        for submission_id, username in self._query('SELECT submission_id, username FROM snoozes ORDER BY rowid'):
+            snoozed.setdefault(submission_id, []).append(username)
+        return snoozed
+
+    def add_snooze(self, submission_id, username):
+        self._execute('INSERT OR IGNORE INTO snoozes (submission_id, username) VALUES (?, ?)',
+                      (submission_id, username))
+
+    # === Tally comments ===
+
+    def load_tally_comments(self):
+        """
+        Returns:
+            dict: submission_id -> tally comment_id
+        """
+        return dict(self._query('SELECT submission_id, comment_id FROM tally_comments ORDER BY rowid'))
+
+    def set_tally_comment(self, submission_id, comment_id):
+        self._execute(
+            'INSERT INTO tally_comments (submission_id, comment_id) VALUES (?, ?) '
+            'ON CONFLICT (submission_id) DO UPDATE SET comment_id = excluded.comment_id',
+            (submission_id, comment_id)
+        )
+
+    # === Unsubscribes ===
+
+    def load_unsubscribed(self):
+        """
+        Returns:
+            list: Uppercased usernames
+        """
+        return [row[0] for row in self._query('SELECT username FROM unsubscribed ORDER BY rowid')]
+
+    def add_unsubscribed(self, username):
+        self._execute('INSERT OR IGNORE INTO unsubscribed (username) VALUES (?)', (username,))
+
+    def remove_unsubscribed(self, username):
+        self._execute('DELETE FROM unsubscribed WHERE username = ?', (username,))
+
+    # === Reply outbox ===
+
+    def load_outbox(self):
+        """
+        Returns:
+            list: Pending outbox items (dicts), oldest first
+        """
+        rows = self._query('SELECT id, kind, parent_id, texts, sent, attempts, not_before, meta, source_id, posting '
+                           'FROM outbox ORDER BY id')
+        return [
+            {
+                'id': item_id,
+                'kind': kind,
+                'parent_id': parent_id,
+                'texts': json.loads(texts),
+                'sent': sent,
+                'attempts': attempts,
+                'not_before': not_before,
+                'meta': json.loads(meta),
+                'source_id': source_id,
+                'posting': bool(posting),
+            }
+            for item_id, kind, parent_id, texts, sent, attempts, not_before, meta, source_id, posting in rows
+        ]
+
+    def add_outbox_item(self, kind, parent_id, texts, meta=None):
+        """
+        Insert a pending item.
+
+        Returns:
+            The new item ID, or None if an item of this kind for the same
+            comment is already pending
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO outbox (kind, parent_id, texts, meta, source_id) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (source_id, kind) DO NOTHING',
+                (kind, parent_id, json.dumps(texts), json.dumps(meta or {}), parent_id)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def update_outbox_item(self, item):
+        """Record delivery progress / retry state (and any changed texts or meta) for an item"""
+        self._execute(
+            'UPDATE outbox SET parent_id = ?, texts = ?, meta = ?, sent = ?, attempts = ?, not_before = ?, posting = ? '
+            'WHERE id = ?',
+            (item['parent_id'], json.dumps(item['texts']), json.dumps(item['meta']), item['sent'],
+             item['attempts'], item['not_before'], int(item['posting']), item['id'])
+        )
+
+    def delete_outbox_item(self, item_id):
+        self._execute('DELETE FROM outbox WHERE id = ?', (item_id,))
+
+    # === Migration from the old file formats ===
+
+    def _is_migrated(self, name):
+        return bool(self._query('SELECT 1 FROM meta WHERE key = ?', (f'migrated:{name}',)))
+
+    def _import(self, name, path, rows_by_table):
+        """Insert rows from one legacy file and record it as migrated, atomically"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, rows in rows_by_table:
+                    self.conn.executemany(sql, rows)
+                self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                  (f'migrated:{name}', path))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def migrate_files(self, votes_file=None, snoozed_file=None, tally_file=None, unsubscribed_file=None):
+        """
+        Import the legacy JSON/text state files once.
+
+        Each file is imported in its own transaction and then renamed to
+        `<file>.migrated` so it is kept as a backup but never loaded again.
+        """
+        migrations = []
+
+        def load_json(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        if votes_file:
+            def vote_rows(path):
+                rows = []
+                for submission_id, votes in load_json(path).items():
+                    for voter, vote_info in votes.items():
+                        # Handle both old format (string) and new format (dict)
+                        if isinstance(vote_info, dict):
+                            rows.append((submission_id, voter.upper(), vote_info['target'], vote_info.get('permalink', '')))
+                        else:
+                            rows.append((submission_id, voter.upper(), vote_info, ''))
+                return [('INSERT OR REPLACE INTO votes (submission_id, voter, target, permalink) VALUES (?, ?, ?, ?)', rows)]
+            migrations.append(('votes', votes_file, vote_rows))
+
+        if snoozed_file:
+            def snooze_rows(path):
+                rows = [(submission_id, username.upper())
+                        for submission_id, users in load_json(path).items() for username in users]
+                return [('INSERT OR IGNORE INTO snoozes (submission_id, username) VALUES (?, ?)', rows)]
+            migrations.append(('snoozes', snoozed_file, snooze_rows))
+
+        if tally_file:
+            def tally_rows(path):
+                rows = list(load_json(path).items())
+                return [('INSERT OR REPLACE INTO tally_comments (submission_id, comment_id) VALUES (?, ?)', rows)]
+            migrations.append(('tally_comments', tally_file, tally_rows))
+
+        if unsubscribed_file:
+            def unsubscribed_rows(path):
+                with open(path, 'r') as f:
+                    rows = [(line.strip().upper(),) for line in f if line.strip()]
+                return [('INSERT OR IGNORE INTO unsubscribed (username) VALUES (?)', rows)]
+            migrations.append(('unsubscribed', unsubscribed_file, unsubscribed_rows))
+
+        for name, path, build_rows in migrations:
+            if self._is_migrated(name) or not os.path.isfile(path):
+                continue
+            try:
+                self._import(name, path, build_rows(path))
+                os.replace(path, path + '.migrated')
+                logger.info(f"Migrated {path} into {self.db_file}")
+            except Exception as e:
+                logger.error(f"Failed to migrate {path}: {e}")
@@ -0,0 +1,204 @@
+"""
+Tests for comment_stream and the handlers against a stub Reddit API.
+
+A canned comment listing goes through CommentStream, run_bot and the
+outbox; the only GET allowed is the listing itself.
+
+Usage:
+    python -m unittest test_comment_stream
+"""
+
+import importlib
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from urllib.parse import urlsplit
+
+import praw
+
+import api_stats
+from api_stats import CountingRequestor
+from comment_stream import CommentEvent, CommentStream
+
+SUBREDDITS = 'hiddenwerewolves+hiddenwerewolvesa'
+THREAD = '/r/hiddenwerewolves/comments/abc123/day_1/'
+
+
+def _comment(comment_id, author, body, created_utc):
+    return {'kind': 't1', 'data': {
+        'id': comment_id,
+        'name': f't1_{comment_id}',
+        'link_id': 't3_abc123',
+        'author': author,
+        'body': body,
+        'permalink': f'{THREAD}{comment_id}/',
+        'created_utc': created_utc,
+    }}
+
+
+# Newest first, as Reddit sends it
+LISTING = {'kind': 'Listing', 'data': {'children': [
+    _comment('c006', 'Alice', 'werebot snooze', 1006),
+    _comment('c005', 'Dave', 'werebot random Alice, Bob, Carol', 1005),
+    _comment('c004', 'Carol', 'werebot tally', 1004),
+    _comment('c003', 'Bob', 'werebot tally', 1003),
+    _comment('c002', 'Bob', 'werebot vote u/Alice', 1002),
+    _comment('c001', 'Alice', 'werebot u/Bob u/Carol u/Dave u/Erin u/Frank', 1001),
+    {'kind': 'more', 'data': {'id': 'zzz'}},
+]}}
+
+
+class StubResponse:
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self.headers = {'content-length': str(len(self.text))}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class StubSession:
+    """Answers the Reddit endpoints the bot uses and records every request"""
+
+    def __init__(self):
+        self.headers = {}
+        self.requests = []  # (method, path)
+        self._next_reply = 1
+
+    def close(self):
+        pass
+
+    def request(self, method, url, **kwargs):
+        method, path = method.upper(), urlsplit(url).path.rstrip('/')
+        self.requests.append((method, path))
+
+        if path == '/api/v1/access_token':
+            return StubResponse(200, {'access_token': 'token', 'expires_in': 3600,
+                                      'scope': '*', 'token_type': 'bearer'})
+        if path == '/api/v1/me':
+            return StubResponse(200, {'name': 'Were-Bot', 'id': 'bot'})
+        if method == 'GET' and path == f'/r/{SUBREDDITS}/comments':
+            return StubResponse(200, LISTING)
+        if method == 'POST' and path in ('/api/comment', '/api/editusertext'):
+            reply_id = f'r{self._next_reply:03d}'
+            self._next_reply += 1
+            return StubResponse(200, {'json': {'errors': [], 'data': {'things': [
+                {'kind': 't1', 'data': {'id': reply_id, 'name': f't1_{reply_id}', 'body': ''}}
+            ]}}})
+        return StubResponse(404, {'message': 'Not Found', 'error': 404})
+
+
+def setUpModule():
+    global werebot, _cwd, _tmp
+    # werebot_updated logs to werebot.log and keeps its state files in the
+    # working directory
+    _tmp = tempfile.TemporaryDirectory()
+    _cwd = os.getcwd()
+    os.chdir(_tmp.name)
+    werebot = importlib.import_module('werebot_updated')
+    logging.disable(logging.WARNING)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+    os.chdir(_cwd)
+    _tmp.cleanup()
+
+
+class CommentEventTest(unittest.TestCase):
+
+    def test_from_listing(self):
+        event = CommentEvent.from_listing(LISTING['data']['children'][2]['data'])
+        self.assertEqual(event.id, 'c004')
+        self.assertEqual(event.fullname, 't1_c004')
+        self.assertEqual(event.submission_id, 'abc123')
+        self.assertEqual(event.author, 'Carol')
+        self.assertEqual(event.submission_permalink, THREAD)
+
+    def test_no_dict(self):
+        # __slots__ records: no per-instance dict to grow
+        event = CommentEvent.from_listing(LISTING['data']['children'][0]['data'])
+        self.assertFalse(hasattr(event, '__dict__'))
+
+
+class NoLazyFetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = StubSession()
+        self.reddit = praw.Reddit(
+            client_id='id',
+            client_secret='secret',
+            username='Were-Bot',
+            password='password',
+            user_agent='werebot tests',
+            requestor_class=CountingRequestor,
+            requestor_kwargs={'session': self.session},
+        )
+        werebot._bot_username = None
+        werebot._state_store = None
+        for name in os.listdir('.'):
+            if name != 'werebot.log':
+                os.remove(name)
+
+        self.checkpoint = werebot.load_checkpoint()
+        self.comment_stream = CommentStream(self.reddit, SUBREDDITS, self.checkpoint, initial_limit=50)
+        self.outbox = werebot.ReplyOutbox(self.reddit, werebot.get_state_store(), min_interval=0)
+
+    def tearDown(self):
+        werebot.get_state_store().close()
+        werebot._state_store = None
+
+    def run_cycle(self):
+        self.comments_replied_to = werebot.get_saved_comments()
+        return werebot.run_bot(
+            self.reddit,
+            self.comments_replied_to,
+            werebot.get_unsubscribed_users(),
+            self.checkpoint,
+            werebot.get_snoozed_threads(),
+            werebot.get_vote_declarations(),
+            werebot.get_tally_comments(),
+            self.comment_stream,
+            self.outbox,
+        )
+
+    def requests_after_listing(self):
+        listing = self.session.requests.index(('GET', f'/r/{SUBREDDITS}/comments'))
+        return self.session.requests[listing + 1:]
+
+    def test_handlers_make_no_get_after_the_listing(self):
+        gets_before = api_stats.stats.count('GET')
+        checkpoint, snoozed_threads, vote_data, tally_comments = self.run_cycle()
+
+        # Every comment was handled...
+        self.assertEqual(len(self.comments_replied_to), 6)
+        self.assertEqual(checkpoint['comment_cursor'], 't1_c006')
+        self.assertEqual(vote_data['abc123'].votes['BOB'].target, 'Alice')
+        self.assertIn('ALICE', snoozed_threads['abc123'])
+        self.assertTrue(len(self.outbox))
+
+        # ...with the listing as the only request, counted as the only GET
+        self.assertEqual(self.requests_after_listing(), [])
+        self.assertEqual(api_stats.stats.count('GET') - gets_before, 2)  # /api/v1/me + listing
+        self.assertNotIn('lazy_fetches', checkpoint)
+
+    def test_posting_replies_makes_no_get(self):
+        self.run_cycle()
+        deadline = time.time() + 5
+        while len(self.outbox) and time.time() < deadline:
+            self.outbox.run_until(time.time() + 0.1)
+
+        self.assertEqual(len(self.outbox), 0)
+        after = self.requests_after_listing()
+        self.assertTrue(after)
+        self.assertEqual({method for method, _ in after}, {'POST'})
+
+
+if __name__ == '__main__':
+    unittest.main()
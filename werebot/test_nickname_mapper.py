@@ -0,0 +1,131 @@
+"""
+Tests for nickname_mapper, driven through a temporary CSV sheet.
+
+Usage:
+    python -m unittest test_nickname_mapper
+"""
+
+import csv
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from nickname_mapper import LocalSheetBackend, NicknameMapper
+
+ROWS = [
+    ['Nickname', 'Reddit Username'],
+    ['Puff', '/u/Team-Hufflepuff'],
+    ['K9', 'u/K9moonmoon'],
+    ['Big Bad', 'TheBigBadWolf'],
+]
+
+
+class CountingBackend(LocalSheetBackend):
+    """LocalSheetBackend that counts sheet downloads"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.fetches = 0
+
+    def fetch_rows(self):
+        self.fetches += 1
+        return super().fetch_rows()
+
+
+class NicknameMapperTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sheet = os.path.join(self.tmp.name, 'nicknames.csv')
+        self.snapshot = os.path.join(self.tmp.name, 'nickname_snapshot.json')
+        self.write_sheet(ROWS)
+        self.mappers = []
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        for mapper in self.mappers:
+            mapper.stop_background_refresh()
+        logging.disable(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def write_sheet(self, rows):
+        with open(self.sheet, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+    def mapper(self):
+        backend = CountingBackend(self.sheet)
+        mapper = NicknameMapper(snapshot_file=self.snapshot, backend=backend)
+        self.mappers.append(mapper)
+        return mapper, backend
+
+    def test_cold_start_loads_sheet_and_saves_snapshot(self):
+        mapper, backend = self.mapper()
+        self.assertFalse(mapper.load_snapshot())
+        self.assertTrue(mapper.load_nicknames())
+
+        self.assertEqual(backend.fetches, 1)
+        self.assertEqual(mapper.nickname_map, {
+            'puff': 'Team-Hufflepuff', 'k9': 'K9moonmoon', 'big bad': 'TheBigBadWolf',
+        })
+        with open(self.snapshot) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['nicknames'], mapper.nickname_map)
+        self.assertEqual(snapshot['revision'], backend.revision())
+
+    def test_warm_start_serves_snapshot_without_the_sheet(self):
+        first, _ = self.mapper()
+        first.load_nicknames()
+        os.remove(self.sheet)  # sheet unreachable from now on
+
+        mapper, backend = self.mapper()
+        self.assertTrue(mapper.load_snapshot())
+        self.assertEqual(backend.fetches, 0)
+        self.assertEqual(mapper.resolve_mentions('Puff and Big Bad'),
+                         '/u/Team-Hufflepuff and /u/TheBigBadWolf')
+        self.assertEqual(mapper.find_closest('K9moonmon'), 'K9moonmoon')
+
+        # A failed refresh keeps the snapshot's map
+        self.assertFalse(mapper.load_nicknames())
+        self.assertEqual(mapper.get_all_nicknames(), first.nickname_map)
+
+    def test_unchanged_revision_skips_download(self):
+        first, _ = self.mapper()
+        first.load_nicknames()
+
+        mapper, backend = self.mapper()
+        mapper.load_snapshot()
+        self.assertTrue(mapper.load_nicknames())
+        self.assertEqual(backend.fetches, 0)
+        self.assertIsNotNone(mapper.last_update)
+
+        self.write_sheet(ROWS + [['Wolfie', 'Were-Wolfie']])
+        self.assertTrue(mapper.load_nicknames())
+        self.assertEqual(backend.fetches, 1)
+        self.assertEqual(mapper.nickname_map['wolfie'], 'Were-Wolfie')
+
+    def test_corrupt_snapshot_falls_back_to_sheet(self):
+        with open(self.snapshot, 'w') as f:
+            f.write('{"revision": "1:2", "nicknames": {"puff"')
+
+        mapper, backend = self.mapper()
+        self.assertFalse(mapper.load_snapshot())
+        self.assertEqual(mapper.nickname_map, {})
+        self.assertIsNone(mapper.revision)
+
+        self.assertTrue(mapper.load_nicknames())
+        self.assertEqual(backend.fetches, 1)
+        with open(self.snapshot) as f:
+            self.assertEqual(json.load(f)['nicknames'], mapper.nickname_map)
+
+    def test_empty_snapshot_is_not_served(self):
+        with open(self.snapshot, 'w') as f:
+            json.dump({'revision': 'x', 'nicknames': {}}, f)
+
+        mapper, _ = self.mapper()
+        self.assertFalse(mapper.load_snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+"""
+Incremental Vote Tallies for Were-Bot
+Keeps one tally per thread that VOTE/UNVOTE update in place, so the sorted
+leaderboard and the tally markdown are ready whenever TALLY is requested.
+Optionally pushes vote changes to the thread's tally comment on a timer.
+"""
+
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+EMPTY_TALLY_MESSAGE = (
+    "## Vote Tally\n\n"
+    "*No votes have been declared in this thread yet.*\n\n"
+    "Use `WEREBOT VOTE username` to declare your vote!"
+)
+
+# seq: order the voter first voted in this thread (their position in the table)
+Vote = namedtuple('Vote', ['seq', 'target', 'permalink'])
+
+
+def normalize_vote(vote_info):
+    """
+    Convert a stored vote to (target, permalink).
+
+    Handles both the old format (target string) and the new format (dict).
+    """
+    if isinstance(vote_info, dict):
+        return vote_info['target'], vote_info.get('permalink', '') or ''
+    return vote_info, ''
+
+
+def format_voter(voter, permalink):
+    """Markdown link (or /u/ mention) for one voter in the tally table"""
+    # Remove /u/ prefix if present
+    if voter.startswith('/u/'):
+        voter = voter[3:]
+
+    # Fix ALL CAPS names - convert to proper case
+    if voter.isupper() and len(voter) > 1:
+        voter = voter[0].upper() + voter[1:].lower()
+
+    if permalink:
+        return f"[{voter}](https://reddit.com{permalink})"
+    return f"/u/{voter}"
+
+
+class Candidate:
+    """Everyone voting for one target, in the order they first voted"""
+
+    __slots__ = ('entries', 'key', 'row')
+
+    def __init__(self):
+        self.entries = []  # sorted (seq, VOTER, target, permalink)
+        self.key = None    # this candidate's position key in the leaderboard
+        self.row = None    # cached markdown table row
+
+    @property
+    def display_name(self):
+        # Capitalization as written by the earliest voter, as the table always used
+        return self.entries[0][2]
+
+    def render_row(self):
+        if self.row is None:
+            voters_list = ", ".join(format_voter(voter, permalink) for _, voter, _, permalink in self.entries)
+            self.row = f"**{self.display_name}** | {len(self.entries)} | {voters_list}\n"
+        return self.row
+
+
+class ThreadTally:
+    """
+    Vote tally for a single thread.
+
+    The leaderboard is a sorted list of (-votes, name, first seq, TARGET)
+    keys. A vote only moves the one or two candidates it touches, so VOTE
+    and UNVOTE cost O(log n) bisects instead of a full re-sort on TALLY.
+    """
+
+    __slots__ = ('votes', 'candidates', 'leaderboard', '_next_seq', '_markdown')
+
+    def __init__(self):
+        self.votes = {}        # VOTER -> Vote
+        self.candidates = {}   # TARGET -> Candidate
+        self.leaderboard = []  # sorted candidate keys, most votes first
+        self._next_seq = 0
+        self._markdown = None
+
+    @classmethod
+    def from_votes(cls, votes):
+        """
+        Build a tally from stored declarations.
+
+        Args:
+            votes: Dict of VOTER -> vote info (old string or new dict format),
+                   in the order the votes were first declared
+        """
+        tally = cls()
+        for voter, vote_info in votes.items():
+            target, permalink = normalize_vote(vote_info)
+            tally.set_vote(voter, target, permalink)
+        return tally
+
+    def __len__(self):
+        return len(self.votes)
+
+    def __contains__(self, voter):
+        return voter.upper() in self.votes
+
+    def get(self, voter):
+        """Vote of the given voter, or None"""
+        return self.votes.get(voter.upper())
+
+    def set_vote(self, voter, target, permalink=''):
+        """Declare (or change) a vote"""
+        voter = voter.upper()
+        old = self.votes.get(voter)
+        if old:
+            self._detach(voter, old)
+            seq = old.seq
+        else:
+            seq = self._next_seq
+            self._next_seq += 1
+
+        vote = Vote(seq, target, permalink or '')
+        self.votes[voter] = vote
+        self._attach(voter, vote)
+        self._markdown = None
+
+    def remove_vote(self, voter):
+        """
+        Remove a vote.
+
+        Returns:
+            True if the voter had a vote in this thread
+        """
+        voter = voter.upper()
+        vote = self.votes.pop(voter, None)
+        if vote is None:
+            return False
+
+        self._detach(voter, vote)
+        self._markdown = None
+        return True
+
+    def _unrank(self, candidate):
+        if candidate.key is not None:
+            del self.leaderboard[bisect_left(self.leaderboard, candidate.key)]
+            candidate.key = None
+
+    def _rank(self, candidate, target_upper):
+        candidate.key = (-len(candidate.entries), candidate.display_name.lower(),
+                         candidate.entries[0][0], target_upper)
+        insort(self.leaderboard, candidate.key)
+        candidate.row = None
+
+    def _attach(self, voter, vote):
+        target_upper = vote.target.upper()
+        candidate = self.candidates.get(target_upper)
+        if candidate is None:
+            candidate = self.candidates[target_upper] = Candidate()
+
+        self._unrank(candidate)
+        insort(candidate.entries, (vote.seq, voter, vote.target, vote.permalink))
+        self._rank(candidate, target_upper)
+
+    def _detach(self, voter, vote):
+        target_upper = vote.target.upper()
+        candidate = self.candidates[target_upper]
+
+        self._unrank(candidate)
+        del candidate.entries[bisect_left(candidate.entries, (vote.seq, voter))]
+
+        if candidate.entries:
+            self._rank(candidate, target_upper)
+        else:
+            del self.candidates[target_upper]
+
+    def top(self, n=3):
+        """
+        Returns:
+            List of (TARGET, count, display_name) for the n leading candidates
+        """
+        return [(key[3], -key[0], self.candidates[key[3]].display_name) for key in self.leaderboard[:n]]
+
+    def markdown(self):
+        """The tally table posted by TALLY (cached until the next vote change)"""
+        if self._markdown is None:
+            total = len(self.votes)
+            parts = ["## Vote Tally\n\n", "Candidate | Votes | Voted By\n", "---|:---:|---\n"]
+            parts.extend(self.candidates[key[3]].render_row() for key in self.leaderboard)
+            parts.append(f"\n*Total: {total} declared vote{'s' if total != 1 else ''}*")
+            self._markdown = "".join(parts)
+        return self._markdown
+
+
+def render_tally(tally):
+    """Tally comment text for a thread; tally is None or empty if nobody has voted"""
+    return tally.markdown() if tally else EMPTY_TALLY_MESSAGE
+
+
+class TallyAutoUpdater:
+    """
+    Keeps existing tally comments live without TALLY requests.
+
+    VOTE/UNVOTE mark a thread dirty; flush() then edits each dirty thread's
+    tally comment at most once per interval, so a burst of votes becomes a
+    single edit. Threads without a tally comment are left alone until
+    someone requests TALLY.
+    """
+
+    def __init__(self, reddit, interval=60):
+        """
+        Args:
+            reddit: PRAW Reddit instance
+            interval: Minimum seconds between two edits of the same tally comment
+        """
+        self.reddit = reddit
+        self.interval = interval
+
+        self.dirty = set()
+        self.last_edit = {}  # submission_id -> time of the last edit
+        self.posted = {}     # submission_id -> text last written to the tally comment
+
+    def mark_dirty(self, submission_id):
+        self.dirty.add(submission_id)
+
+    def record(self, submission_id, text):
+        """Note a tally comment written elsewhere (TALLY request or new comment)"""
+        self.posted[submission_id] = text
+        self.last_edit[submission_id] = time.time()
+
+    def flush(self, vote_data, tally_comments):
+        """
+        Apply pending changes whose interval has passed.
+
+        Args:
+            vote_data: Dict of submission_id -> ThreadTally
+            tally_comments: Dict of submission_id -> tally comment ID
+
+        Returns:
+            Number of tally comments edited
+        """
+        now = time.time()
+        edits = 0
+
+        for submission_id in list(self.dirty):
+            tally_comment_id = tally_comments.get(submission_id)
+            if not tally_comment_id:
+                self.dirty.discard(submission_id)
+                continue
+
+            if now - self.last_edit.get(submission_id, 0) < self.interval:
+                continue
+
+            self.dirty.discard(submission_id)
+            text = render_tally(vote_data.get(submission_id))
+            if self.posted.get(submission_id) == text:
+                continue
+
+            try:
+                self.reddit.comment(tally_comment_id).edit(text)
+            except Exception as e:
+                logger.warning(f"Could not auto-update tally comment {tally_comment_id}: {e}")
+                # Try again after another interval
+                self.dirty.add(submission_id)
+                self.last_edit[submission_id] = now
+                continue
+
+            self.record(submission_id, text)
+            edits += 1
+            logger.info(f"Auto-updated tally comment {tally_comment_id} in thread {submission_id}")
+
+        return edits
@@ -9,17 +9,6 @@ import sys
 import random
 from datetime import datetime
 
-# Add current directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-# Optional: Import nickname mapper if available
-try:
-    from nickname_mapper import NicknameMapper
-    NICKNAME_MAPPER_AVAILABLE = True
-except ImportError:
-    NICKNAME_MAPPER_AVAILABLE = False
-    logger.warning("Nickname mapper not available (nickname_mapper.py not found)")
-
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,20 +20,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Optional: Import nickname mapper if available
+try:
+    from nickname_mapper import NicknameMapper, LocalSheetBackend
+    NICKNAME_MAPPER_AVAILABLE = True
+except ImportError:
+    NICKNAME_MAPPER_AVAILABLE = False
+    logger.warning("Nickname mapper not available (nickname_mapper.py not found)")
+
+import api_stats
+from api_stats import CountingRequestor
+from comment_stream import CommentStream
+from seen_index import SeenCommentIndex
+from state_store import StateStore
+from vote_tally import ThreadTally, TallyAutoUpdater, render_tally
+from reply_outbox import ReplyOutbox
+import command_parser
+from command_parser import parse_comment
+
+# Attributes a function's Reddit requests to its name in the per-cycle API summary
+track_api = api_stats.stats.attributed
+
 # Configuration
 CHECKPOINT_FILE = 'werebot_checkpoint.json'
-COMMENTS_FILE = 'comments_replied_to.txt'
+COMMENTS_FILE = 'comments_replied_to.txt'  # Legacy text format, migrated on first start
+SEEN_INDEX_FILE = 'seen_comments.idx'
 UNSUBSCRIBED_FILE = 'unsubscribed_users.txt'
 SNOOZED_FILE = 'snoozed_threads.json'
 VOTES_FILE = 'vote_declarations.json'
 TALLY_COMMENTS_FILE = 'tally_comments.json'
+STATE_DB_FILE = 'werebot_state.db'  # Replaces the four files above (migrated on first start)
 SUBREDDITS = 'hiddenwerewolves+hiddenwerewolvesa+hiddenwerewolvesb+badgerstudygroup+hiddenghosts'
-COMMENT_LIMIT = 50
+COMMENT_LIMIT = 50  # Comments fetched on first start, before a cursor exists
+COMMENT_PAGE_SIZE = 100  # Reddit's maximum listing page size
+COMMENT_MAX_PAGES = 10  # Pages fetched per cycle during a burst
 MAX_USERS_PER_COMMENT = 3
 
+# Live tally comments: edit a thread's tally comment after vote changes (opt-in)
+AUTO_TALLY = os.environ.get('WEREBOT_AUTO_TALLY', '').lower() in ('1', 'true', 'yes')
+AUTO_TALLY_INTERVAL = int(os.environ.get('WEREBOT_AUTO_TALLY_INTERVAL', '60'))  # Seconds between edits per thread
+
 # Nickname mapping configuration (optional)
 NICKNAME_SPREADSHEET_URL = os.environ.get('NICKNAME_SPREADSHEET_URL', '')
 NICKNAME_CREDENTIALS = os.environ.get('NICKNAME_CREDENTIALS', 'creds2.json')
+NICKNAME_SHEET_FILE = os.environ.get('NICKNAME_SHEET_FILE', '')  # Local CSV used instead of the Google Sheet
+NICKNAME_SNAPSHOT_FILE = 'nickname_snapshot.json'  # Last loaded nicknames, served at startup
 
 def load_checkpoint():
     """Load checkpoint data if it exists"""
@@ -94,7 +117,8 @@ def bot_login():
             client_secret=client_secret,
             username=username,
             password=password,
-            user_agent=user_agent
+            user_agent=user_agent,
+            requestor_class=CountingRequestor
         )
         
         # Verify authentication
@@ -106,38 +130,45 @@ def bot_login():
         logger.error(f"Failed to log in to Reddit: {e}")
         raise
 
-def get_saved_comments():
-    """Load the list of comments we've already replied to"""
-    if not os.path.isfile(COMMENTS_FILE):
-        logger.info("No previous comments file found, starting fresh")
-        return []
+_bot_username = None
+
+def get_bot_username(reddit):
+    """Name of the logged-in account, looked up once instead of every cycle"""
+    global _bot_username
     
-    try:
-        with open(COMMENTS_FILE, "r") as f:
-            comments = f.read().strip().split("\n")
-            # Filter out empty strings
-            comments = [c for c in comments if c]
-            logger.info(f"Loaded {len(comments)} previously processed comments")
-            return comments
-    except Exception as e:
-        logger.error(f"Error loading comments file: {e}")
-        return []
+    if _bot_username is None:
+        _bot_username = reddit.user.me().name
+    return _bot_username
+
+def get_saved_comments():
+    """Load the index of comments we've already replied to"""
+    index = SeenCommentIndex(SEEN_INDEX_FILE)
+    index.load(legacy_file=COMMENTS_FILE)
+    return index
+
+_state_store = None
+
+def get_state_store():
+    """Open the SQLite state store, migrating the old state files on first use"""
+    global _state_store
+    if _state_store is None:
+        _state_store = StateStore(STATE_DB_FILE)
+        _state_store.migrate_files(
+            votes_file=VOTES_FILE,
+            snoozed_file=SNOOZED_FILE,
+            tally_file=TALLY_COMMENTS_FILE,
+            unsubscribed_file=UNSUBSCRIBED_FILE
+        )
+    return _state_store
 
 def get_unsubscribed_users():
     """Load the list of unsubscribed users"""
-    if not os.path.isfile(UNSUBSCRIBED_FILE):
-        logger.info("No unsubscribed users file found, starting fresh")
-        return []
-    
     try:
-        with open(UNSUBSCRIBED_FILE, "r") as f:
-            users = f.read().strip().split("\n")
-            # Filter out empty strings
-            users = [u.upper() for u in users if u]
-            logger.info(f"Loaded {len(users)} unsubscribed users")
-            return users
+        users = get_state_store().load_unsubscribed()
+        logger.info(f"Loaded {len(users)} unsubscribed users")
+        return users
     except Exception as e:
-        logger.error(f"Error loading unsubscribed users file: {e}")
+        logger.error(f"Error loading unsubscribed users: {e}")
         return []
 
 def get_snoozed_threads():
@@ -148,27 +179,21 @@ def get_snoozed_threads():
         dict: Maps submission_id -> list of usernames who snoozed that thread
               Example: {"abc123": ["USER1", "USER2"], "def456": ["USER3"]}
     """
-    if not os.path.isfile(SNOOZED_FILE):
-        logger.info("No snoozed threads file found, starting fresh")
-        return {}
-    
     try:
-        with open(SNOOZED_FILE, "r") as f:
-            data = json.load(f)
-            logger.info(f"Loaded snoozed data for {len(data)} threads")
-            return data
+        data = get_state_store().load_snoozes()
+        logger.info(f"Loaded snoozed data for {len(data)} threads")
+        return data
     except Exception as e:
-        logger.error(f"Error loading snoozed threads file: {e}")
+        logger.error(f"Error loading snoozed threads: {e}")
         return {}
 
-def save_snoozed_threads(snoozed_threads):
-    """Save the snoozed threads data to file"""
+def save_snooze(submission_id, username_upper):
+    """Persist a single thread snooze"""
     try:
-        with open(SNOOZED_FILE, "w") as f:
-            json.dump(snoozed_threads, f, indent=2)
-        logger.debug("Snoozed threads saved")
+        get_state_store().add_snooze(submission_id, username_upper)
+        logger.debug("Snooze saved")
     except Exception as e:
-        logger.error(f"Failed to save snoozed threads: {e}")
+        logger.error(f"Failed to save snooze: {e}")
 
 def add_snooze(submission_id, username, snoozed_threads):
     """
@@ -214,33 +239,37 @@ def is_snoozed(submission_id, username, snoozed_threads):
 
 def get_vote_declarations():
     """
-    Load vote declarations from file.
+    Load vote declarations from the state store.
     
     Returns:
-        dict: Maps submission_id -> {voter: target, ...}
-              Example: {"abc123": {"ALICE": "Bob", "CHARLIE": "Alice"}}
+        dict: Maps submission_id -> ThreadTally, updated in place on VOTE/UNVOTE
     """
-    if not os.path.isfile(VOTES_FILE):
-        logger.info("No vote declarations file found, starting fresh")
-        return {}
-    
     try:
-        with open(VOTES_FILE, "r") as f:
-            data = json.load(f)
-            logger.info(f"Loaded vote data for {len(data)} threads")
-            return data
+        data = {
+            submission_id: ThreadTally.from_votes(votes)
+            for submission_id, votes in get_state_store().load_votes().items()
+        }
+        logger.info(f"Loaded vote data for {len(data)} threads")
+        return data
     except Exception as e:
-        logger.error(f"Error loading vote declarations file: {e}")
+        logger.error(f"Error loading vote declarations: {e}")
         return {}
 
-def save_vote_declarations(vote_data):
-    """Save vote declarations to file"""
+def save_vote_declaration(submission_id, voter_upper, target, permalink=''):
+    """Persist a single vote declaration"""
+    try:
+        get_state_store().upsert_vote(submission_id, voter_upper, target, permalink)
+        logger.debug("Vote declaration saved")
+    except Exception as e:
+        logger.error(f"Failed to save vote declaration: {e}")
+
+def delete_vote_declaration(submission_id, voter_upper):
+    """Remove a single persisted vote declaration"""
     try:
-        with open(VOTES_FILE, "w") as f:
-            json.dump(vote_data, f, indent=2)
-        logger.debug("Vote declarations saved")
+        get_state_store().delete_vote(submission_id, voter_upper)
+        logger.debug("Vote declaration deleted")
     except Exception as e:
-        logger.error(f"Failed to save vote declarations: {e}")
+        logger.error(f"Failed to delete vote declaration: {e}")
 
 def get_tally_comments():
     """
@@ -250,27 +279,21 @@ def get_tally_comments():
         dict: Maps submission_id -> comment_id of tally comment
               Example: {"abc123": "xyz789"}
     """
-    if not os.path.isfile(TALLY_COMMENTS_FILE):
-        logger.info("No tally comments file found, starting fresh")
-        return {}
-    
     try:
-        with open(TALLY_COMMENTS_FILE, "r") as f:
-            data = json.load(f)
-            logger.info(f"Loaded tally comment data for {len(data)} threads")
-            return data
+        data = get_state_store().load_tally_comments()
+        logger.info(f"Loaded tally comment data for {len(data)} threads")
+        return data
     except Exception as e:
-        logger.error(f"Error loading tally comments file: {e}")
+        logger.error(f"Error loading tally comments: {e}")
         return {}
 
-def save_tally_comments(tally_data):
-    """Save tally comments tracking data to file"""
+def save_tally_comment(submission_id, comment_id):
+    """Persist the tally comment ID for a thread"""
     try:
-        with open(TALLY_COMMENTS_FILE, "w") as f:
-            json.dump(tally_data, f, indent=2)
-        logger.debug("Tally comments saved")
+        get_state_store().set_tally_comment(submission_id, comment_id)
+        logger.debug("Tally comment saved")
     except Exception as e:
-        logger.error(f"Failed to save tally comments: {e}")
+        logger.error(f"Failed to save tally comment: {e}")
 
 def declare_vote(submission_id, voter, target, vote_data, permalink=''):
     """
@@ -280,22 +303,16 @@ def declare_vote(submission_id, voter, target, vote_data, permalink=''):
         submission_id: Reddit submission ID
         voter: Username declaring the vote
         target: Username being voted for
-        vote_data: Current vote declarations dict
+        vote_data: Dict of submission_id -> ThreadTally
         permalink: Comment permalink for the vote
     
     Returns:
         Updated vote_data dict
     """
-    voter_upper = voter.upper()
-    
     if submission_id not in vote_data:
-        vote_data[submission_id] = {}
+        vote_data[submission_id] = ThreadTally()
     
-    # Store as dict with target and permalink
-    vote_data[submission_id][voter_upper] = {
-        'target': target,
-        'permalink': permalink
-    }
+    vote_data[submission_id].set_vote(voter, target, permalink)
     logger.info(f"Vote declared: {voter} → {target} in thread {submission_id}")
     
     return vote_data
@@ -307,21 +324,17 @@ def remove_vote(submission_id, voter, vote_data):
     Args:
         submission_id: Reddit submission ID
         voter: Username removing their vote
-        vote_data: Current vote declarations dict
+        vote_data: Dict of submission_id -> ThreadTally
     
     Returns:
         tuple: (Updated vote_data dict, was_vote_removed)
     """
-    voter_upper = voter.upper()
-    
     if submission_id not in vote_data:
         return vote_data, False
     
-    if voter_upper not in vote_data[submission_id]:
+    if not vote_data[submission_id].remove_vote(voter):
         return vote_data, False
     
-    # Remove the vote
-    del vote_data[submission_id][voter_upper]
     logger.info(f"Vote removed: {voter} in thread {submission_id}")
     
     return vote_data, True
@@ -332,56 +345,16 @@ def get_vote_summary(submission_id, vote_data):
     
     Args:
         submission_id: Reddit submission ID
-        vote_data: Current vote declarations dict
+        vote_data: Dict of submission_id -> ThreadTally
     
     Returns:
-        tuple: (top_3_candidates, all_votes_breakdown)
+        tuple: (top_3_candidates, thread_tally) - thread_tally is None if nobody voted
     """
-    if submission_id not in vote_data or not vote_data[submission_id]:
-        return [], {}
-    
-    votes = vote_data[submission_id]
+    tally = vote_data.get(submission_id)
+    if not tally:
+        return [], None
     
-    # Count votes per target
-    vote_counts = {}
-    for voter, vote_info in votes.items():
-        # Handle both old format (string) and new format (dict)
-        if isinstance(vote_info, dict):
-            target = vote_info['target']
-        else:
-            # Old format compatibility
-            target = vote_info
-        
-        target_upper = target.upper()
-        if target_upper not in vote_counts:
-            vote_counts[target_upper] = {
-                'count': 0,
-                'voters': [],
-                'display_name': target  # Keep original capitalization
-            }
-        vote_counts[target_upper]['count'] += 1
-        vote_counts[target_upper]['voters'].append(voter)
-    
-    # Sort by count (descending)
-    sorted_candidates = sorted(
-        vote_counts.items(),
-        key=lambda x: x[1]['count'],
-        reverse=True
-    )
-    
-    # Get top 3
-    top_3 = [(name, data['count'], data['display_name']) 
-             for name, data in sorted_candidates[:3]]
-    
-    return top_3, votes
-
-def save_comment_id(comment_id):
-    """Append a comment ID to the processed comments file"""
-    try:
-        with open(COMMENTS_FILE, "a") as f:
-            f.write(comment_id + "\n")
-    except Exception as e:
-        logger.error(f"Failed to save comment ID {comment_id}: {e}")
+    return tally.top(3), tally
 
 def extract_usernames(text):
     """
@@ -441,13 +414,19 @@ def filter_snoozed_users(usernames, submission_id, snoozed_threads):
 
 def create_tag_message(author, comment):
     """Create the message that gets posted with tags"""
-    permalink = f"https://www.reddit.com{comment.submission.permalink}{comment.id}"
+    permalink = f"https://www.reddit.com{comment.submission_permalink}{comment.id}"
     return f".\n\n/u/{author} wants you to see [this comment!]({permalink}) I am a bot, so please don't reply here."
 
-def send_tags(comment, usernames, checkpoint):
+@track_api()
+def send_tags(comment, usernames, outbox):
     """
     Send tag notifications in batches of 3 users per comment.
     Reddit only notifies the first 3 users mentioned in a comment.
+    
+    The batches are queued as one outbox chain: each batch replies to the
+    previous one, and total_tags is counted once the whole chain is posted.
+    The outbox records each posted batch, so after a crash the chain resumes
+    with the next batch rather than losing or re-sending the rest.
     """
     if not usernames:
         logger.warning("No users to tag")
@@ -459,10 +438,10 @@ def send_tags(comment, usernames, checkpoint):
     logger.info(f"Tagging {n} users across {num_comments} comment(s)")
     
     message = create_tag_message(comment.author, comment)
-    current_comment = comment
     
     try:
         # Create comments in batches of 3
+        reply_texts = []
         for i in range(num_comments):
             start_idx = i * MAX_USERS_PER_COMMENT
             end_idx = min(start_idx + MAX_USERS_PER_COMMENT, n)
@@ -470,40 +449,17 @@ def send_tags(comment, usernames, checkpoint):
             
             # Format the tags
             tags = " ".join([f"/u/{username}" for username in batch])
-            reply_text = f"**Werebot Tagging:** {tags} {message}"
-            
-            # Post the comment with retry logic
-            retry_count = 0
-            max_retries = 3
-            while retry_count < max_retries:
-                try:
-                    current_comment = current_comment.reply(reply_text)
-                    logger.info(f"Tagged batch {i+1}/{num_comments}: {', '.join(batch)}")
-                    time.sleep(2)  # Rate limiting
-                    break
-                except praw.exceptions.RedditAPIException as e:
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        logger.error(f"Failed to post tags after {max_retries} attempts: {e}")
-                        raise
-                    logger.warning(f"API error, retrying ({retry_count}/{max_retries})...")
-                    time.sleep(5)
-                except Exception as e:
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        logger.error(f"Unexpected error posting tags: {e}")
-                        raise
-                    logger.warning(f"Error posting comment, retrying ({retry_count}/{max_retries})...")
-                    time.sleep(5)
+            reply_texts.append(f"**Werebot Tagging:** {tags} {message}")
         
-        checkpoint['total_tags'] += n
+        outbox.enqueue(comment.id, reply_texts, kind='tags', meta={'count': n})
         return True
         
     except Exception as e:
         logger.error(f"Failed to send tags: {e}")
         return False
 
-def handle_unsubscribe(comment, unsubscribed_users, checkpoint):
+@track_api()
+def handle_unsubscribe(comment, unsubscribed_users, checkpoint, outbox):
     """Handle a user unsubscribing from Werebot"""
     username_upper = str(comment.author).upper()
     
@@ -511,8 +467,7 @@ def handle_unsubscribe(comment, unsubscribed_users, checkpoint):
         unsubscribed_users.append(username_upper)
         
         try:
-            with open(UNSUBSCRIBED_FILE, "a") as f:
-                f.write(username_upper + "\n")
+            get_state_store().add_unsubscribed(username_upper)
             logger.info(f"User u/{comment.author} unsubscribed")
         except Exception as e:
             logger.error(f"Failed to save unsubscribe: {e}")
@@ -523,15 +478,15 @@ def handle_unsubscribe(comment, unsubscribed_users, checkpoint):
     # Reply to confirm
     message = f"/u/{comment.author} has unsubscribed from Werebot."
     try:
-        comment.reply(message)
+        outbox.enqueue(comment.id, message, kind='unsubscribe')
         checkpoint['total_unsubscribes'] += 1
-        time.sleep(2)
         return True
     except Exception as e:
         logger.error(f"Failed to reply to unsubscribe: {e}")
         return False
 
-def handle_subscribe(comment, unsubscribed_users, checkpoint):
+@track_api()
+def handle_subscribe(comment, unsubscribed_users, checkpoint, outbox):
     """Handle a user resubscribing to Werebot"""
     username_upper = str(comment.author).upper()
     
@@ -539,11 +494,9 @@ def handle_subscribe(comment, unsubscribed_users, checkpoint):
         # Remove from list
         unsubscribed_users.remove(username_upper)
         
-        # Rewrite the file without this user
+        # Remove the stored row for this user
         try:
-            with open(UNSUBSCRIBED_FILE, "w") as f:
-                for user in unsubscribed_users:
-                    f.write(user + "\n")
+            get_state_store().remove_unsubscribed(username_upper)
             logger.info(f"User u/{comment.author} resubscribed")
         except Exception as e:
             logger.error(f"Failed to save subscribe: {e}")
@@ -554,15 +507,15 @@ def handle_subscribe(comment, unsubscribed_users, checkpoint):
     # Reply to confirm
     message = f"/u/{comment.author} has resubscribed to Werebot."
     try:
-        comment.reply(message)
+        outbox.enqueue(comment.id, message, kind='subscribe')
         checkpoint['total_subscribes'] += 1
-        time.sleep(2)
         return True
     except Exception as e:
         logger.error(f"Failed to reply to subscribe: {e}")
         return False
 
-def handle_snooze(comment, snoozed_threads):
+@track_api()
+def handle_snooze(comment, snoozed_threads, outbox):
     """
     Handle a user snoozing a specific thread.
     User won't be tagged in any more WEREBOT comments in this thread.
@@ -570,31 +523,32 @@ def handle_snooze(comment, snoozed_threads):
     Args:
         comment: The comment containing "WEREBOT SNOOZE"
         snoozed_threads: Current snoozed threads dict
+        outbox: ReplyOutbox the confirmation is queued in
     
     Returns:
         Updated snoozed_threads dict, or None if failed
     """
     username = str(comment.author)
-    submission_id = comment.submission.id
+    submission_id = comment.submission_id
     
     # Add snooze
     snoozed_threads = add_snooze(submission_id, username, snoozed_threads)
     
-    # Save to file
-    save_snoozed_threads(snoozed_threads)
+    # Persist the snooze
+    save_snooze(submission_id, username.upper())
     
     # Reply to confirm
     message = f"/u/{username} has snoozed this thread. You won't be tagged in any more Werebot notifications here."
     try:
-        comment.reply(message)
+        outbox.enqueue(comment.id, message, kind='snooze')
         logger.info(f"User u/{username} snoozed thread {submission_id}")
-        time.sleep(2)
         return snoozed_threads
     except Exception as e:
         logger.error(f"Failed to reply to snooze: {e}")
         return None
 
-def handle_random(comment):
+@track_api()
+def handle_random(comment, command, outbox):
     """
     Handle WEREBOT RANDOM command to pick randomly from options.
     
@@ -605,23 +559,20 @@ def handle_random(comment):
     
     Args:
         comment: The comment containing "WEREBOT RANDOM"
+        command: Parsed RANDOM command (argument is the text after RANDOM)
+        outbox: ReplyOutbox the result is queued in
     
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Extract the text after RANDOM
-        comment_text = comment.body
+        # Text after RANDOM, extracted by the command parser
+        options_text = command.argument
         
-        # Find RANDOM keyword (case-insensitive)
-        match = re.search(r'(?:WEREBOT|WERE-BOT)!?\s+RANDOM\s+(.+)', comment_text, re.IGNORECASE | re.DOTALL)
-        
-        if not match:
+        if not options_text:
             logger.warning(f"RANDOM command found but couldn't parse options in comment {comment.id}")
             return False
         
-        options_text = match.group(1).strip()
-        
         # Split by pipe character
         options = [opt.strip() for opt in options_text.split('|')]
         
@@ -631,9 +582,8 @@ def handle_random(comment):
         if len(options) < 2:
             # Need at least 2 options
             message = "Please provide at least 2 options separated by `|` (e.g., `WEREBOT RANDOM option1 | option2 | option3`)"
-            comment.reply(message)
+            outbox.enqueue(comment.id, message, kind='random')
             logger.info(f"RANDOM command from u/{comment.author} had insufficient options")
-            time.sleep(2)
             return True
         
         # Pick random option
@@ -643,16 +593,16 @@ def handle_random(comment):
         message = f"Werebot randomly chose: **{chosen}**\n\n"
         message += f"*(from {len(options)} options)*"
         
-        comment.reply(message)
+        outbox.enqueue(comment.id, message, kind='random')
         logger.info(f"RANDOM command from u/{comment.author}: chose '{chosen}' from {len(options)} options")
-        time.sleep(2)
         return True
         
     except Exception as e:
         logger.error(f"Failed to process RANDOM command: {e}")
         return False
 
-def handle_vote_declaration(comment, vote_data, nickname_mapper=None):
+@track_api()
+def handle_vote_declaration(comment, command, vote_data, outbox, nickname_mapper=None):
     """
     Handle WEREBOT VOTE [username] command.
     
@@ -663,7 +613,9 @@ def handle_vote_declaration(comment, vote_data, nickname_mapper=None):
     
     Args:
         comment: The comment containing vote declaration
-        vote_data: Current vote declarations dict
+        command: Parsed VOTE command (argument is the target)
+        vote_data: Dict of submission_id -> ThreadTally
+        outbox: ReplyOutbox the confirmation is queued in
         nickname_mapper: Optional NicknameMapper for validating nicknames
     
     Returns:
@@ -671,29 +623,26 @@ def handle_vote_declaration(comment, vote_data, nickname_mapper=None):
     """
     try:
         voter = str(comment.author)
-        submission_id = comment.submission.id
+        submission_id = comment.submission_id
         
-        # Extract target from comment
-        match = re.search(r'(?:WEREBOT|WERE-BOT)!?\s+VOTE\s+(?:/u/)?([a-zA-Z0-9_-]+)', 
-                         comment.body, re.IGNORECASE)
+        # Target extracted by the command parser
+        target = command.argument
         
-        if not match:
+        if not target:
             logger.warning(f"VOTE command found but couldn't parse target in comment {comment.id}")
             return None
         
-        target = match.group(1)
-        
         # Validate target
         is_valid = False
         display_target = target
         
-        # Check if it starts with /u/ in the original comment
-        if '/u/' in comment.body.lower():
+        # Check if the target itself was written as /u/username
+        if command.explicit_user:
             is_valid = True
             display_target = target
-        # Check if it's a known nickname (use get_username method)
+        # Check if it's a known nickname, or a near miss of a nickname/username
         elif nickname_mapper:
-            resolved = nickname_mapper.get_username(target)
+            resolved = nickname_mapper.get_username(target) or nickname_mapper.find_closest(target)
             if resolved:
                 is_valid = True
                 display_target = resolved
@@ -705,21 +654,13 @@ def handle_vote_declaration(comment, vote_data, nickname_mapper=None):
             return None
         
         # Declare the vote - store permalink too
-        voter_upper = voter.upper()
-        if submission_id not in vote_data:
-            vote_data[submission_id] = {}
-        
-        vote_data[submission_id][voter_upper] = {
-            'target': display_target,
-            'permalink': comment.permalink
-        }
-        save_vote_declarations(vote_data)
+        vote_data = declare_vote(submission_id, voter, display_target, vote_data, comment.permalink)
+        save_vote_declaration(submission_id, voter.upper(), display_target, comment.permalink)
         
         # Reply to confirm
         message = f"✓ Vote recorded: /u/{voter} is voting for **{display_target}**"
-        comment.reply(message)
+        outbox.enqueue(comment.id, message, kind='vote')
         logger.info(f"Vote declaration: u/{voter} → {display_target} in thread {submission_id}")
-        time.sleep(2)
         
         return vote_data
         
@@ -727,181 +668,115 @@ def handle_vote_declaration(comment, vote_data, nickname_mapper=None):
         logger.error(f"Failed to process VOTE declaration: {e}")
         return None
 
-def handle_vote_removal(comment, vote_data):
+@track_api()
+def handle_vote_removal(comment, vote_data, outbox):
     """
     Handle WEREBOT UNVOTE command to remove a vote.
     
     Args:
         comment: The comment containing "WEREBOT UNVOTE"
-        vote_data: Current vote declarations dict
+        vote_data: Dict of submission_id -> ThreadTally
+        outbox: ReplyOutbox the confirmation is queued in
     
     Returns:
         Updated vote_data dict, or None if failed
     """
     try:
         voter = str(comment.author)
-        submission_id = comment.submission.id
+        submission_id = comment.submission_id
         
         # Remove the vote
         vote_data, was_removed = remove_vote(submission_id, voter, vote_data)
         
         if was_removed:
-            save_vote_declarations(vote_data)
+            delete_vote_declaration(submission_id, voter.upper())
             message = f"✓ Vote removed: /u/{voter} is no longer voting"
             logger.info(f"Vote removed: u/{voter} in thread {submission_id}")
         else:
             message = f"/u/{voter}, you don't have an active vote to remove in this thread."
             logger.info(f"No vote to remove for u/{voter} in thread {submission_id}")
         
-        comment.reply(message)
-        time.sleep(2)
+        outbox.enqueue(comment.id, message, kind='unvote')
         return vote_data
         
     except Exception as e:
         logger.error(f"Failed to process UNVOTE command: {e}")
         return None
 
-def handle_vote_tally(comment, vote_data, tally_comments, reddit):
+@track_api()
+def handle_vote_tally(comment, vote_data, tally_comments, reddit, outbox, tally_updater=None):
     """
     Handle WEREBOT TALLY command to show vote summary.
     
     Creates ONE tally comment per thread and edits it on subsequent requests.
     Replies with a link to the tally comment.
     
+    New tally comments are queued in the outbox as kind 'tally'; the callback
+    registered in main() records their ID in tally_comments once posted.
+    Requests arriving before that join the queued item instead of queuing a
+    second tally comment, and get their link reply once it is posted.
+    
     Args:
         comment: The comment requesting tally
-        vote_data: Current vote declarations dict
+        vote_data: Dict of submission_id -> ThreadTally
         tally_comments: Dict mapping submission_id -> tally_comment_id
         reddit: Reddit instance for fetching comments
+        outbox: ReplyOutbox replies are queued in
+        tally_updater: Optional TallyAutoUpdater told about the edit
     
     Returns:
         Updated tally_comments dict, or None if failed
     """
     try:
-        submission_id = comment.submission.id
-        
-        top_3, all_votes = get_vote_summary(submission_id, vote_data)
-        
-        if not all_votes:
-            # No votes yet, but still create a tally comment for future updates
-            message = "## Vote Tally\n\n"
-            message += "*No votes have been declared in this thread yet.*\n\n"
-            message += "Use `WEREBOT VOTE username` to declare your vote!"
-            
-            # Check if we already have a tally comment for this thread
-            if submission_id in tally_comments:
-                tally_comment_id = tally_comments[submission_id]
-                try:
-                    # Edit existing empty tally
-                    tally_comment = reddit.comment(tally_comment_id)
-                    tally_comment.edit(message)
-                    logger.info(f"Updated empty tally comment {tally_comment_id} in thread {submission_id}")
-                    
-                    reply_message = f"[View vote tally →](https://reddit.com{tally_comment.permalink})"
-                    comment.reply(reply_message)
-                    time.sleep(2)
-                    return tally_comments
-                except Exception as e:
-                    logger.warning(f"Could not edit existing tally comment {tally_comment_id}: {e}")
-                    # Fall through to create new comment
-            
-            # Create new tally comment (even with no votes)
-            tally_comment = comment.reply(message)
-            tally_comments[submission_id] = tally_comment.id
-            save_tally_comments(tally_comments)
-            
-            logger.info(f"Created empty tally comment {tally_comment.id} in thread {submission_id} (no votes yet)")
-            time.sleep(2)
-            return tally_comments
-        
-        # Build tally message
-        tally_message = "## Vote Tally\n\n"
-        
-        # Group by target to build full vote breakdown
-        votes_by_target = {}
-        for voter, vote_info in all_votes.items():
-            # Handle both old format (string) and new format (dict)
-            if isinstance(vote_info, dict):
-                target = vote_info['target']
-                permalink = vote_info.get('permalink', '')
-            else:
-                # Old format compatibility
-                target = vote_info
-                permalink = ''
-            
-            target_upper = target.upper()
-            if target_upper not in votes_by_target:
-                votes_by_target[target_upper] = {
-                    'display_name': target,
-                    'voters': []
-                }
-            votes_by_target[target_upper]['voters'].append({
-                'name': voter,
-                'permalink': permalink
-            })
-        
-        # Sort by vote count (descending), then alphabetically by name for ties
-        sorted_targets = sorted(
-            votes_by_target.items(),
-            key=lambda x: (-len(x[1]['voters']), x[1]['display_name'].lower())
-        )
-        
-        # Create table
-        tally_message += "Candidate | Votes | Voted By\n"
-        tally_message += "---|:---:|---\n"
-        
-        for target_upper, data in sorted_targets:
-            # Build voter list with links
-            voter_links = []
-            for voter_info in data['voters']:
-                voter_name = voter_info['name']
-                # Remove /u/ prefix if present
-                if voter_name.startswith('/u/'):
-                    voter_name = voter_name[3:]
-                
-                # Fix ALL CAPS names - convert to proper case
-                if voter_name.isupper() and len(voter_name) > 1:
-                    voter_name = voter_name[0].upper() + voter_name[1:].lower()
-                
-                if voter_info['permalink']:
-                    voter_link = f"[{voter_name}](https://reddit.com{voter_info['permalink']})"
-                else:
-                    voter_link = f"/u/{voter_name}"
-                voter_links.append(voter_link)
-            
-            voters_list = ", ".join(voter_links)
-            count = len(data['voters'])
-            
-            tally_message += f"**{data['display_name']}** | {count} | {voters_list}\n"
+        submission_id = comment.submission_id
         
-        tally_message += f"\n*Total: {len(all_votes)} declared vote{'s' if len(all_votes) != 1 else ''}*"
+        # Kept up to date by every VOTE/UNVOTE; only re-rendered after a change.
+        # With no votes yet we still create a tally comment for future updates.
+        top_3, tally = get_vote_summary(submission_id, vote_data)
+        tally_message = render_tally(tally)
+        link_text = "View updated vote tally →" if tally else "View vote tally →"
         
         # Check if we already have a tally comment for this thread
         if submission_id in tally_comments:
             tally_comment_id = tally_comments[submission_id]
             try:
-                # Try to fetch and edit existing comment
+                # Edit existing comment
                 tally_comment = reddit.comment(tally_comment_id)
                 tally_comment.edit(tally_message)
                 logger.info(f"Updated existing tally comment {tally_comment_id} in thread {submission_id}")
+                if tally_updater:
+                    tally_updater.record(submission_id, tally_message)
                 
-                # Reply with link to tally
-                reply_message = f"[View updated vote tally →](https://reddit.com{tally_comment.permalink})"
-                comment.reply(reply_message)
-                time.sleep(2)
+                # Reply with link to tally (built from the thread permalink;
+                # tally_comment.permalink would fetch the comment)
+                reply_message = f"[{link_text}](https://reddit.com{comment.submission_permalink}{tally_comment_id}/)"
+                outbox.enqueue(comment.id, reply_message, kind='tally_link')
                 return tally_comments
                 
             except Exception as e:
                 logger.warning(f"Could not edit existing tally comment {tally_comment_id}: {e}")
                 # Fall through to create new comment
         
+        # A tally comment for this thread is already queued: post the latest
+        # tally with it and link this request to it once it is up
+        pending = outbox.pending('tally', submission_id=submission_id)
+        if pending:
+            if pending['sent'] == 0 and not pending['posting']:
+                pending['texts'] = [tally_message]
+            pending['meta'].setdefault('permalink', comment.submission_permalink)
+            pending['meta'].setdefault('waiting', []).append([comment.id, link_text])
+            outbox.update(pending)
+            logger.info(f"Tally comment in thread {submission_id} is already queued, will link it to {comment.id}")
+            return tally_comments
+        
         # Create new tally comment
-        tally_comment = comment.reply(tally_message)
-        tally_comments[submission_id] = tally_comment.id
-        save_tally_comments(tally_comments)
+        outbox.enqueue(comment.id, tally_message, kind='tally',
+                       meta={'submission_id': submission_id, 'permalink': comment.submission_permalink})
         
-        logger.info(f"Created new tally comment {tally_comment.id} in thread {submission_id}: {len(all_votes)} votes")
-        time.sleep(2)
+        if tally:
+            logger.info(f"Queued new tally comment in thread {submission_id}: {len(tally)} votes")
+        else:
+            logger.info(f"Queued empty tally comment in thread {submission_id} (no votes yet)")
         return tally_comments
         
     except Exception as e:
@@ -1240,7 +1115,8 @@ K9_EMOJI_MAP = {
     'chill': '😌', 'relax': '😌', 'calm': '😌',
 }
 
-def handle_k9_emojify(comment):
+@track_api()
+def handle_k9_emojify(comment, command, outbox):
     """
     Handle WEREBOT K9 [message] command to emoji-fy text.
     
@@ -1253,25 +1129,20 @@ def handle_k9_emojify(comment):
     
     Args:
         comment: The comment containing K9 command
+        command: Parsed K9 command (argument is the text after K9)
+        outbox: ReplyOutbox the result is queued in
     
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Extract message after K9
-        match = re.search(r'(?:WEREBOT|WERE-BOT)!?\s+K9\s+(.+)', comment.body, re.IGNORECASE | re.DOTALL)
-        
-        if not match:
-            logger.warning(f"K9 command found but couldn't parse message in comment {comment.id}")
-            return False
-        
-        message = match.group(1).strip()
+        # Message after K9, extracted by the command parser
+        message = command.argument
         
         if not message:
             reply = "Please provide a message to emoji-fy!\n\n"
             reply += "Example: `WEREBOT K9 I love this game`"
-            comment.reply(reply)
-            time.sleep(2)
+            outbox.enqueue(comment.id, reply, kind='k9')
             return True
         
         # Emoji-fy the message K9 style - REPLACE words with emojis
@@ -1307,15 +1178,15 @@ def handle_k9_emojify(comment):
         reply += f"{emojified_message}\n\n"
         reply += f"*K9-ified by Werebot in honor of /u/K9moonmoon* 🐕🌙"
         
-        comment.reply(reply)
+        outbox.enqueue(comment.id, reply, kind='k9')
         logger.info(f"K9 emojify from u/{comment.author}: {len(words)} words processed")
-        time.sleep(2)
         return True
         
     except Exception as e:
         logger.error(f"Failed to process K9 command: {e}")
         return False
 
+@track_api()
 def handle_easter_egg(comment, reddit):
     """Handle the Frrrrk easter egg"""
     try:
@@ -1326,36 +1197,45 @@ def handle_easter_egg(comment, reddit):
         logger.error(f"Failed to add contributor to Fck__Frrrrk: {e}")
         return False
 
-def handle_text_easter_egg(comment, trigger, response):
+@track_api()
+def handle_text_easter_egg(comment, trigger, response, outbox):
     """
     Handle simple text-based easter eggs (personality responses).
     These are just fun little replies that don't do anything functional.
     """
     try:
-        comment.reply(response)
+        outbox.enqueue(comment.id, response, kind=f"egg:{trigger}")
         logger.info(f"Easter egg response to u/{comment.author}: '{trigger}' → '{response}'")
-        time.sleep(2)
         return True
     except Exception as e:
         logger.error(f"Failed to post easter egg response: {e}")
         return False
 
-def run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed_threads, vote_data, tally_comments, nickname_mapper=None):
+def run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed_threads, vote_data, tally_comments, comment_stream, outbox, nickname_mapper=None, tally_updater=None):
     """
     Main bot logic - monitors comments and handles various commands
     
     Args:
+        comment_stream: CommentStream yielding only comments newer than the saved cursor
+                        (committed only after the whole batch has been handled)
+        outbox: ReplyOutbox every handler queues its replies in
         snoozed_threads: Dict of thread_id -> list of snoozed usernames
-        vote_data: Dict of thread_id -> {voter: target}
+        vote_data: Dict of thread_id -> ThreadTally
         nickname_mapper: Optional NicknameMapper instance for resolving nicknames
+        tally_updater: Optional TallyAutoUpdater notified of vote changes
     """
-    bot_username = reddit.user.me().name
+    bot_username = get_bot_username(reddit)
     processed_count = 0
     
     try:
-        # Fetch recent comments
-        comments = list(reddit.subreddit(SUBREDDITS).comments(limit=COMMENT_LIMIT))
-        logger.debug(f"Fetched {len(comments)} recent comments")
+        # Fetch comments posted since the last cycle (oldest first)
+        with api_stats.stats.scope('comment_stream'):
+            comments, cursor = comment_stream.fetch()
+        logger.debug(f"Fetched {len(comments)} new comments")
+        
+        # Handlers only read CommentEvent fields, so dispatch should not
+        # issue any GET; anything counted here is a lazy fetch regression
+        gets_before_dispatch = api_stats.stats.count('GET')
         
         for comment in comments:
             # Skip if already processed
@@ -1363,151 +1243,147 @@ def run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed
                 continue
             
             # Skip own comments
-            if comment.author and comment.author.name == bot_username:
+            if comment.author == bot_username:
                 continue
             
+            # Parse the body once; every command below is looked up in the result
+            parsed = parse_comment(comment.body)
+            
             # Skip unsubscribed users (except if they're trying to subscribe)
-            comment_body_upper = comment.body.upper()
             author_upper = str(comment.author).upper()
             if author_upper in unsubscribed_users:
                 # Allow SUBSCRIBE command through so they can re-subscribe
-                if "WEREBOT!SUBSCRIBE" not in comment_body_upper and "WERE-BOT!SUBSCRIBE" not in comment_body_upper:
+                if not parsed.has(command_parser.SUBSCRIBE):
                     logger.debug(f"Skipping comment from unsubscribed user u/{comment.author}")
                     continue
             
             # CRITICAL: Mark comment as replied IMMEDIATELY to prevent infinite loops
             # This must happen BEFORE any processing that might fail
-            comments_replied_to.append(comment.id)
-            save_comment_id(comment.id)
+            # (written to disk once per cycle by comments_replied_to.flush())
+            comments_replied_to.add(comment.id)
             processed_count += 1
             
-            # Handle WEREBOT K9 (emojify) - must check before general commands
-            if ("WEREBOT K9" in comment_body_upper or "WERE-BOT K9" in comment_body_upper or
-                "WEREBOT! K9" in comment_body_upper or "WERE-BOT! K9" in comment_body_upper):
+            # Handle WEREBOT K9 (emojify)
+            if parsed.has(command_parser.K9):
                 logger.info(f"Processing K9 emojify from u/{comment.author}")
-                handle_k9_emojify(comment)
+                handle_k9_emojify(comment, parsed.get(command_parser.K9), outbox)
             
             # Handle WEREBOT VOTE [username]
-            if ("WEREBOT VOTE" in comment_body_upper or "WERE-BOT VOTE" in comment_body_upper or
-                  "WEREBOT! VOTE" in comment_body_upper or "WERE-BOT! VOTE" in comment_body_upper):
+            if parsed.has(command_parser.VOTE):
                 logger.info(f"Processing vote declaration from u/{comment.author}")
                 
-                result = handle_vote_declaration(comment, vote_data, nickname_mapper)
+                result = handle_vote_declaration(comment, parsed.get(command_parser.VOTE), vote_data, outbox, nickname_mapper)
                 if result is not None:
                     vote_data = result
+                    if tally_updater:
+                        tally_updater.mark_dirty(comment.submission_id)
             
             # Handle WEREBOT UNVOTE
-            if ("WEREBOT UNVOTE" in comment_body_upper or "WERE-BOT UNVOTE" in comment_body_upper or
-                  "WEREBOT! UNVOTE" in comment_body_upper or "WERE-BOT! UNVOTE" in comment_body_upper):
+            if parsed.has(command_parser.UNVOTE):
                 logger.info(f"Processing vote removal from u/{comment.author}")
                 
-                result = handle_vote_removal(comment, vote_data)
+                result = handle_vote_removal(comment, vote_data, outbox)
                 if result is not None:
                     vote_data = result
+                    if tally_updater:
+                        tally_updater.mark_dirty(comment.submission_id)
             
             # Handle WEREBOT TALLY
-            if ("WEREBOT TALLY" in comment_body_upper or "WERE-BOT TALLY" in comment_body_upper or
-                  "WEREBOT! TALLY" in comment_body_upper or "WERE-BOT! TALLY" in comment_body_upper):
+            if parsed.has(command_parser.TALLY):
                 logger.info(f"Processing vote tally request from u/{comment.author}")
                 
-                result = handle_vote_tally(comment, vote_data, tally_comments, reddit)
+                result = handle_vote_tally(comment, vote_data, tally_comments, reddit, outbox, tally_updater)
                 if result is not None:
                     tally_comments = result
             
-            # Handle WEREBOT RANDOM (must check before regular WEREBOT)
-            if ("WEREBOT RANDOM" in comment_body_upper or "WERE-BOT RANDOM" in comment_body_upper or 
-                "WEREBOT! RANDOM" in comment_body_upper or "WERE-BOT! RANDOM" in comment_body_upper):
+            # Handle WEREBOT RANDOM
+            if parsed.has(command_parser.RANDOM):
                 logger.info(f"Processing random choice from u/{comment.author}")
-                handle_random(comment)
+                handle_random(comment, parsed.get(command_parser.RANDOM), outbox)
             
-            # Handle WEREBOT SNOOZE (must check before regular WEREBOT)
-            if ("WEREBOT SNOOZE" in comment_body_upper or "WERE-BOT SNOOZE" in comment_body_upper):
-                logger.info(f"Processing snooze from u/{comment.author} for thread {comment.submission.id}")
+            # Handle WEREBOT SNOOZE
+            if parsed.has(command_parser.SNOOZE):
+                logger.info(f"Processing snooze from u/{comment.author} for thread {comment.submission_id}")
                 
-                result = handle_snooze(comment, snoozed_threads)
+                result = handle_snooze(comment, snoozed_threads, outbox)
                 if result is not None:
                     snoozed_threads = result
             
-            # Handle WEREBOT tagging (check this LAST since it's the most general)
-            if ("WEREBOT" in comment_body_upper or "WERE-BOT" in comment_body_upper):
-                # Skip if this was already handled by a specific command above
-                # Check if any specific command was detected
-                has_specific_command = any([
-                    "K9" in comment_body_upper,
-                    "VOTE" in comment_body_upper,
-                    "UNVOTE" in comment_body_upper,
-                    "TALLY" in comment_body_upper,
-                    "RANDOM" in comment_body_upper,
-                    "SNOOZE" in comment_body_upper,
-                    "SUBSCRIBE" in comment_body_upper,
-                    "UNSUBSCRIBE" in comment_body_upper
-                ])
-                
-                if not has_specific_command:
-                    # Resolve nicknames if mapper is available
-                    if nickname_mapper:
-                        try:
-                            comment_body_resolved = nickname_mapper.resolve_mentions(comment.body)
-                            if comment_body_resolved != comment.body:
-                                logger.info(f"Resolved nicknames in comment {comment.id}")
-                                logger.debug(f"Original: {comment.body[:100]}...")
-                                logger.debug(f"Resolved: {comment_body_resolved[:100]}...")
-                        except Exception as e:
-                            logger.warning(f"Failed to resolve nicknames: {e}")
-                            comment_body_resolved = comment.body
-                    else:
+            # Handle WEREBOT tagging (a bare mention without any specific command)
+            if parsed.is_tag_request:
+                # Resolve nicknames if mapper is available
+                if nickname_mapper:
+                    try:
+                        comment_body_resolved = nickname_mapper.resolve_mentions(comment.body)
+                        if comment_body_resolved != comment.body:
+                            logger.info(f"Resolved nicknames in comment {comment.id}")
+                            logger.debug(f"Original: {comment.body[:100]}...")
+                            logger.debug(f"Resolved: {comment_body_resolved[:100]}...")
+                    except Exception as e:
+                        logger.warning(f"Failed to resolve nicknames: {e}")
                         comment_body_resolved = comment.body
-                    
-                    # Extract usernames (from resolved text if nicknames were used)
-                    usernames = extract_usernames(comment_body_resolved)
-                    
-                    # Filter out unsubscribed users
-                    subscribed_usernames = filter_subscribed_users(usernames, unsubscribed_users)
-                    
-                    # Filter out users who have snoozed this thread
-                    submission_id = comment.submission.id
-                    active_usernames = filter_snoozed_users(subscribed_usernames, submission_id, snoozed_threads)
-                    
-                    # Only tag if there are 4 or more users (>3 as per original logic)
-                    if len(active_usernames) > 3:
-                        logger.info(f"Processing tag request from u/{comment.author} with {len(active_usernames)} users")
-                        send_tags(comment, active_usernames, checkpoint)
-                    else:
-                        logger.debug(f"Skipping tag request with only {len(active_usernames)} active users")
+                else:
+                    comment_body_resolved = comment.body
+                
+                # Extract usernames (from resolved text if nicknames were used)
+                usernames = extract_usernames(comment_body_resolved)
+                
+                # Filter out unsubscribed users
+                subscribed_usernames = filter_subscribed_users(usernames, unsubscribed_users)
+                
+                # Filter out users who have snoozed this thread
+                submission_id = comment.submission_id
+                active_usernames = filter_snoozed_users(subscribed_usernames, submission_id, snoozed_threads)
+                
+                # Only tag if there are 4 or more users (>3 as per original logic)
+                if len(active_usernames) > 3:
+                    logger.info(f"Processing tag request from u/{comment.author} with {len(active_usernames)} users")
+                    send_tags(comment, active_usernames, outbox)
+                else:
+                    logger.debug(f"Skipping tag request with only {len(active_usernames)} active users")
             
             # Handle unsubscribe
-            if "WEREBOT!UNSUBSCRIBE" in comment_body_upper or "WERE-BOT!UNSUBSCRIBE" in comment_body_upper:
+            if parsed.has(command_parser.UNSUBSCRIBE):
                 logger.info(f"Processing unsubscribe from u/{comment.author}")
-                handle_unsubscribe(comment, unsubscribed_users, checkpoint)
+                handle_unsubscribe(comment, unsubscribed_users, checkpoint, outbox)
             
             # Handle subscribe
-            if "WEREBOT!SUBSCRIBE" in comment_body_upper or "WERE-BOT!SUBSCRIBE" in comment_body_upper:
+            if parsed.has(command_parser.SUBSCRIBE):
                 logger.info(f"Processing subscribe from u/{comment.author}")
-                handle_subscribe(comment, unsubscribed_users, checkpoint)
+                handle_subscribe(comment, unsubscribed_users, checkpoint, outbox)
             
             # Handle Frrrrk easter egg (functional - adds to subreddit)
-            if "I HATE FRRRRK" in comment_body_upper:
+            if parsed.has(command_parser.EGG_FRRRRK):
                 logger.info(f"Processing Frrrrk easter egg for u/{comment.author}")
                 handle_easter_egg(comment, reddit)
             
             # Handle text-based easter eggs (just fun personality responses)
-            if "FUCK WEREBOT" in comment_body_upper or "FUCK WERE-BOT" in comment_body_upper:
+            if parsed.has(command_parser.EGG_RUDE):
                 logger.info(f"Processing 'rude' easter egg for u/{comment.author}")
-                handle_text_easter_egg(comment, "fuck werebot", "wow rude 😔")
+                handle_text_easter_egg(comment, "fuck werebot", "wow rude 😔", outbox)
             
-            if "THANKS WEREBOT" in comment_body_upper or "THANKS WERE-BOT" in comment_body_upper or \
-                 "THANK YOU WEREBOT" in comment_body_upper or "THANK YOU WERE-BOT" in comment_body_upper:
+            if parsed.has(command_parser.EGG_THANKS):
                 logger.info(f"Processing 'thanks' easter egg for u/{comment.author}")
-                handle_text_easter_egg(comment, "thanks", "😊")
+                handle_text_easter_egg(comment, "thanks", "😊", outbox)
             
-            if "GOOD BOT" in comment_body_upper:
-                # Only respond if it seems directed at Werebot
-                if "WEREBOT" in comment_body_upper or "WERE-BOT" in comment_body_upper:
-                    logger.info(f"Processing 'good bot' easter egg for u/{comment.author}")
-                    handle_text_easter_egg(comment, "good bot", "😊")
+            # Only parsed when the comment also mentions Werebot
+            if parsed.has(command_parser.EGG_GOOD_BOT):
+                logger.info(f"Processing 'good bot' easter egg for u/{comment.author}")
+                handle_text_easter_egg(comment, "good bot", "😊", outbox)
+        
+        # Every comment of the batch was handled; don't fetch them again
+        comment_stream.commit(cursor)
+        
+        lazy_fetches = api_stats.stats.count('GET') - gets_before_dispatch
+        if lazy_fetches:
+            logger.warning(f"{lazy_fetches} extra GET request(s) while handling {len(comments)} comments "
+                           f"({lazy_fetches / max(len(comments), 1):.2f} per comment)")
+            checkpoint['lazy_fetches'] = checkpoint.get('lazy_fetches', 0) + lazy_fetches
         
         if processed_count > 0:
-            logger.info(f"Processed {processed_count} new comments this cycle")
+            logger.info(f"Processed {processed_count} new comments this cycle ({lazy_fetches} extra fetches)")
+            save_checkpoint(checkpoint)
+        elif comment_stream.cursor_moved:
             save_checkpoint(checkpoint)
         else:
             logger.debug("No new comments to process this cycle")
@@ -1517,6 +1393,10 @@ def run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed
     except Exception as e:
         logger.error(f"Error in run_bot: {e}", exc_info=True)
         raise
+    
+    finally:
+        # Group commit of every comment marked this cycle
+        comments_replied_to.flush()
 
 def main():
     """Main execution loop with error recovery"""
@@ -1529,6 +1409,7 @@ def main():
     if checkpoint['last_run']:
         logger.info(f"Last successful run: {checkpoint['last_run']}")
         logger.info(f"Stats - Tags: {checkpoint['total_tags']}, Unsubs: {checkpoint['total_unsubscribes']}, Subs: {checkpoint['total_subscribes']}")
+    api_stats.stats.load_totals(checkpoint.get('api_calls'))
     
     # Initialize
     try:
@@ -1538,20 +1419,79 @@ def main():
         snoozed_threads = get_snoozed_threads()
         vote_data = get_vote_declarations()
         tally_comments = get_tally_comments()
+        comment_stream = CommentStream(
+            reddit,
+            SUBREDDITS,
+            checkpoint,
+            page_size=COMMENT_PAGE_SIZE,
+            max_pages=COMMENT_MAX_PAGES,
+            initial_limit=COMMENT_LIMIT
+        )
+        
+        # Replies are queued by handlers and posted between polling cycles
+        outbox = ReplyOutbox(reddit, get_state_store())
+        
+        # Optional live tallies, edited at most once per interval per thread
+        tally_updater = None
+        if AUTO_TALLY:
+            tally_updater = TallyAutoUpdater(reddit, interval=AUTO_TALLY_INTERVAL)
+            logger.info(f"Auto-updating tally comments every {AUTO_TALLY_INTERVAL}s")
+        
+        def record_tally_comment(item, reply):
+            submission_id = item['meta']['submission_id']
+            tally_comments[submission_id] = reply.id
+            save_tally_comment(submission_id, reply.id)
+            if tally_updater:
+                tally_updater.record(submission_id, item['texts'][-1])
+            logger.info(f"Created tally comment {reply.id} in thread {submission_id}")
+            
+            # TALLY requests that came in while the comment was queued get a link to it
+            for comment_id, link_text in item['meta'].get('waiting', []):
+                link = f"[{link_text}](https://reddit.com{item['meta']['permalink']}{reply.id}/)"
+                outbox.enqueue(comment_id, link, kind='tally_link')
+        
+        def tally_failed(item, reason):
+            # Hand the tally to the next request waiting for it, which links the rest
+            waiting = item['meta'].get('waiting', [])
+            if not waiting:
+                logger.error(f"Tally comment in thread {item['meta']['submission_id']} was not posted")
+                return
+            meta = dict(item['meta'], waiting=waiting[1:])
+            outbox.enqueue(waiting[0][0], item['texts'][-1], kind='tally', meta=meta)
+            logger.info(f"Re-queued tally comment in thread {meta['submission_id']} as a reply to {waiting[0][0]}")
+        
+        def count_tags(item, reply):
+            checkpoint['total_tags'] += item['meta']['count']
+        
+        def count_partial_tags(item, reason):
+            # Batches posted before the chain was dropped did tag their users
+            tagged = min(item['sent'] * MAX_USERS_PER_COMMENT, item['meta']['count'])
+            checkpoint['total_tags'] += tagged
+            logger.error(f"Tag chain dropped after {item['sent']}/{len(item['texts'])} comments "
+                         f"({tagged}/{item['meta']['count']} users tagged)")
+        
+        outbox.register('tally', record_tally_comment, on_failure=tally_failed)
+        outbox.register('tags', count_tags, on_failure=count_partial_tags)
         
         # Initialize nickname mapper if configured
         nickname_mapper = None
-        if NICKNAME_MAPPER_AVAILABLE and NICKNAME_SPREADSHEET_URL:
+        if NICKNAME_MAPPER_AVAILABLE and (NICKNAME_SPREADSHEET_URL or NICKNAME_SHEET_FILE):
             try:
                 logger.info("Initializing nickname mapper...")
                 nickname_mapper = NicknameMapper(
                     spreadsheet_url=NICKNAME_SPREADSHEET_URL,
                     credentials_file=NICKNAME_CREDENTIALS,
-                    cache_duration=300  # Refresh every 5 minutes
+                    cache_duration=300,  # Refresh every 5 minutes
+                    snapshot_file=NICKNAME_SNAPSHOT_FILE,
+                    backend=LocalSheetBackend(NICKNAME_SHEET_FILE) if NICKNAME_SHEET_FILE else None
                 )
-                if nickname_mapper.load_nicknames():
+                # Start from the saved snapshot if there is one; only a cold
+                # start waits for the sheet
+                if nickname_mapper.load_snapshot() or nickname_mapper.load_nicknames():
                     nickname_count = len(nickname_mapper.get_all_nicknames())
                     logger.info(f"Nickname mapper enabled with {nickname_count} nicknames")
+                    # Later refreshes never block comment processing
+                    nickname_mapper.start_background_refresh()
                 else:
                     logger.warning("Failed to load nicknames, mapper disabled")
                     nickname_mapper = None
@@ -1575,6 +1515,7 @@ def main():
     logger.info(f"Currently {len(snoozed_threads)} threads with snoozed users")
     logger.info(f"Currently {len(vote_data)} threads with declared votes")
     logger.info(f"Currently {len(tally_comments)} threads with tally comments")
+    logger.info(f"Currently {len(outbox)} replies pending in outbox")
     logger.info("Starting main loop...")
     
     consecutive_errors = 0
@@ -1582,9 +1523,26 @@ def main():
     
     while True:
         try:
-            checkpoint, snoozed_threads, vote_data, tally_comments = run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed_threads, vote_data, tally_comments, nickname_mapper)
+            checkpoint, snoozed_threads, vote_data, tally_comments = run_bot(reddit, comments_replied_to, unsubscribed_users, checkpoint, snoozed_threads, vote_data, tally_comments, comment_stream, outbox, nickname_mapper, tally_updater)
             consecutive_errors = 0  # Reset error counter on success
-            time.sleep(10)
+            
+            # One coalesced edit per changed thread, once its interval has passed
+            if tally_updater:
+                with api_stats.stats.scope('tally_auto'):
+                    tally_updater.flush(vote_data, tally_comments)
+            
+            # Post queued replies until the next polling cycle is due. This
+            # stays on the main thread on purpose: the outbox callbacks and
+            # handle_vote_tally share tally_comments, the checkpoint and the
+            # queued items with run_bot. The drain is bounded by the old 10s
+            # sleep and items take turns one post at a time, so a long tag
+            # chain spreads over several cycles instead of delaying polling.
+            with api_stats.stats.scope('outbox'):
+                outbox.run_until(time.time() + 10)
+            
+            # One summary line per cycle; totals are saved with the checkpoint
+            api_stats.stats.end_cycle()
+            checkpoint['api_calls'] = api_stats.stats.totals_dict()
             
         except KeyboardInterrupt:
             logger.info("Received shutdown signal. Saving checkpoint and exiting...")